@@ -0,0 +1 @@
+"""Benchmarks for onhax hot paths."""
@@ -0,0 +1,116 @@
+"""Run the benchmark suite and save the results as JSON.
+
+All benchmarks run offline: API requests go to a local mock server.
+Results are written to benchmarks/results/<timestamp>-<commit>.json (or
+--output) together with a description of the environment, and --compare
+prints the change of every timing against an earlier results file.
+
+Usage:
+    python -m benchmarks [--quick] [--only stream,client] [--output PATH]
+    python -m benchmarks --compare BASELINE.json [CURRENT.json]
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from benchmarks import bench_client, bench_edits, bench_history, bench_render, bench_startup, bench_stream
+from benchmarks.common import ROOT, environment
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def startup(runs: int) -> Dict[str, Any]:
+    reports = [bench_startup.best_of(module, runs) for module in bench_startup.DEFAULT_MODULES]
+    return {"benchmark": "startup", "runs": runs, "results": [
+        {"module": r.module, "seconds": round(r.seconds, 6), "lazy_loaded": r.lazy_loaded} for r in reports
+    ]}
+
+# name -> (full run, quick run)
+SUITE: Dict[str, Tuple[Callable[[], Dict[str, Any]], Callable[[], Dict[str, Any]]]] = {
+    "startup": (lambda: startup(5), lambda: startup(1)),
+    "render": (lambda: bench_render.benchmark(20000, 200.0), lambda: bench_render.benchmark(1000, 200.0)),
+    "stream": (lambda: bench_stream.run([0, 200, 1000]), lambda: bench_stream.run([0], words=50, turns=2)),
+    "client": (lambda: bench_client.run([1, 4, 16]), lambda: bench_client.run([1, 4], requests=8, latency=0.01)),
+    "edits": (lambda: bench_edits.run([1000, 10000, 100000]), lambda: bench_edits.run([1000], repeat=2)),
+    "history": (lambda: bench_history.run([10, 100, 1000]), lambda: bench_history.run([10], files=3, repeat=2)),
+}
+
+# Keys of numbers worth comparing between runs (the rest are parameters)
+TIMING_KEYS = ("p50", "p90", "mean", "seconds")
+RATE_KEYS = ("_per_second", "_per_second_p50")
+
+def flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (path, number) for the numbers in a results document.
+
+    List entries are labelled by their first field, e.g. ``concurrency=4``.
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = str(index)
+            if isinstance(item, dict) and item:
+                key, first = next(iter(item.items()))
+                label = f"{key}={first}"
+            yield from flatten(item, f"{prefix}[{label}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Print the change of every timing and rate between two results documents."""
+    before = dict(flatten(baseline.get("benchmarks", {})))
+    print(f"{'metric':<80} {'baseline':>12} {'current':>12} {'change':>8}")
+    for path, value in flatten(current.get("benchmarks", {})):
+        key = path.rsplit(".", 1)[-1]
+        higher_is_better = key.endswith(RATE_KEYS)
+        if path not in before or not (higher_is_better or key.endswith(TIMING_KEYS)):
+            continue
+        old = before[path]
+        change = (value - old) / old if old else 0.0
+        if higher_is_better:
+            change = -change  # positive means slower either way
+        print(f"{path:<80} {old:>12.6g} {value:>12.6g} {change:>+8.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke test")
+    parser.add_argument("--only", help=f"comma-separated benchmarks out of: {', '.join(SUITE)}")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="compare a baseline with a results file (default: run the suite now)")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline and at most one results file")
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            compare(json.load(f), json.load(g))
+        return
+
+    names = args.only.split(",") if args.only else list(SUITE)
+    unknown = [name for name in names if name not in SUITE]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    document = {"environment": environment(), "quick": args.quick, "benchmarks": {}}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        document["benchmarks"][name] = SUITE[name][1 if args.quick else 0]()
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = document["environment"]["timestamp"][:19].replace(":", "")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{document['environment']['commit'] or 'unknown'}.json")
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            compare(json.load(f), document)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark DeepSeekClient.query latency under concurrency.
+
+Sends a fixed number of queries through one client from a growing number
+of threads against the local mock server, and reports the latency
+percentiles, the throughput and the number of connections opened. With a
+large enough connection pool, latency stays close to the server latency
+as concurrency grows.
+
+Usage: python -m benchmarks.bench_client [--concurrency 1,4,16] [--requests 64] [--latency 0.05]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.common import latency_summary, parse_sizes
+from benchmarks.mock_server import MockDeepSeekServer
+
+def run(levels: List[int], requests: int = 64, latency: float = 0.05, words: int = 100) -> Dict[str, Any]:
+    """Run the benchmark and return its results."""
+    from onhax.client import DeepSeekClient
+    from onhax.config import Config
+
+    results = []
+    with MockDeepSeekServer(latency=latency, words=words) as server:
+        os.environ["DEEPSEEK_API_KEY"] = os.getenv("DEEPSEEK_API_KEY") or "benchmark"
+        os.environ["DEEPSEEK_BASE_URL"] = server.url
+        for concurrency in levels:
+            client = DeepSeekClient(Config(), pool_size=concurrency)
+            client.query("warm up", use_cache=False)
+
+            def timed_query(i: int) -> float:
+                started = time.perf_counter()
+                client.query(f"Benchmark request {i}", use_cache=False)
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = list(executor.map(timed_query, range(requests)))
+            elapsed = time.perf_counter() - started
+            client.close()
+            results.append({
+                "concurrency": concurrency,
+                "latency_seconds": latency_summary(latencies),
+                "requests_per_second": round(requests / elapsed, 2),
+                "overhead_p50": round(latency_summary(latencies)["p50"] - latency, 6),
+            })
+    return {"benchmark": "client", "requests": requests, "server_latency": latency, "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=parse_sizes, default=[1, 4, 16],
+                        help="threads sending requests (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=64, help="requests per level (default: 64)")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency in seconds")
+    parser.add_argument("--words", type=int, default=100, help="words per reply (default: 100)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.concurrency, args.requests, args.latency, args.words), indent=2))
+
+if __name__ == "__main__":
+    main()
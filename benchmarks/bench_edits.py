@@ -0,0 +1,83 @@
+"""Benchmark main.apply_diff_edit on large files.
+
+Edits a line near the end of generated Python files of growing size,
+once with a snippet that matches exactly and once with one that differs
+in indentation (the whitespace-tolerant path). Each edit goes through
+the whole assistant path: read, locate, atomic write and the new context
+snapshot. ``apply_file_edits`` alone is timed too, to separate the edit
+from the bookkeeping around it.
+
+Usage: python -m benchmarks.bench_edits [--lines 1000,10000,100000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import import_main, latency_summary, parse_sizes, quiet
+
+def make_source(lines: int) -> str:
+    """Return Python source of about ``lines`` lines."""
+    blocks = []
+    for i in range(lines // 4):
+        blocks.append(f"def function_{i}(value):\n    result = value * {i}\n    return result + {i}\n\n")
+    return "".join(blocks)
+
+def time_edit(apply, path: str, source: str, original: str, new: str, repeat: int) -> List[float]:
+    """Reset the file and time one edit, ``repeat`` times."""
+    samples = []
+    for _ in range(repeat):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        started = time.perf_counter()
+        apply(path, original, new)
+        samples.append(time.perf_counter() - started)
+        with open(path, encoding="utf-8") as f:
+            if new not in f.read():
+                raise RuntimeError(f"Edit was not applied to {path}")
+    return samples
+
+def run(sizes: List[int], repeat: int = 5) -> Dict[str, Any]:
+    """Run the benchmark and return its results."""
+    from onhax.edits import Edit, apply_file_edits
+
+    main = import_main()
+    main.EDIT_WHITESPACE_TOLERANT = True  # opt-in; timed by the whitespace case
+    import onhax.schema  # noqa: F401  (loaded lazily by main; keep it out of the timings)
+
+    def direct(path: str, original: str, new: str) -> None:
+        apply_file_edits(path, [Edit(original, new)], whitespace_tolerant=True)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in sizes:
+            source = make_source(lines)
+            path = os.path.join(directory, f"module_{lines}.py")
+            last = lines // 4 - 1
+            exact = f"    result = value * {last}\n"
+            loose = f"    result  =  value * {last}\n"
+            replacement = f"    result = value * {last} + 1\n"
+            entry: Dict[str, Any] = {"lines": source.count("\n"), "bytes": len(source.encode("utf-8"))}
+            with quiet():
+                entry["apply_diff_edit_exact"] = latency_summary(
+                    time_edit(main.apply_diff_edit, path, source, exact, replacement, repeat))
+                entry["apply_diff_edit_whitespace"] = latency_summary(
+                    time_edit(main.apply_diff_edit, path, source, loose, replacement, repeat))
+                entry["apply_file_edits_exact"] = latency_summary(
+                    time_edit(direct, path, source, exact, replacement, repeat))
+            main.file_registry.discard(path)
+            results.append(entry)
+    return {"benchmark": "edits", "repeat": repeat, "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=parse_sizes, default=[1000, 10000, 100000],
+                        help="file sizes in lines (default: 1000,10000,100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="edits per measurement (default: 5)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.lines, args.repeat), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark the per-turn cost of scanning the history as a session grows.
+
+Before every request, main.py refreshes the file snapshots, lays out the
+messages, counts their tokens and trims them to the budget
+(``build_messages``), and files mentioned in a reply are looked up with
+``ensure_file_in_context``. This benchmark fills the session with a
+growing number of turns and files and times both, with a budget large
+enough that nothing is evicted, so the numbers are the pure scan cost.
+
+Usage: python -m benchmarks.bench_history [--turns 10,100,1000] [--files 20] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import import_main, latency_summary, parse_sizes, quiet
+
+def run(sizes: List[int], files: int = 20, repeat: int = 20) -> Dict[str, Any]:
+    """Run the benchmark and return its results."""
+    from onhax.context import ContextWindow, PrefixAssembler
+
+    main = import_main()
+    main.context_window = ContextWindow(budget_tokens=10 ** 9)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(files):
+            path = os.path.join(directory, f"module_{i}.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("".join(f"def f{j}():\n    return {i} * {j}\n" for j in range(40)))
+            paths.append(path)
+
+        for turns in sizes:
+            main.conversation_history[1:] = []
+            main.prefix_assembler = PrefixAssembler()
+            for snapshot in list(main.file_registry):
+                main.file_registry.discard(snapshot.path)
+            for path in paths:
+                main.file_registry.add(path)
+            for turn in range(turns):
+                main.conversation_history.append({"role": "user", "content": f"Question {turn}: " + "why " * 40})
+                main.conversation_history.append({"role": "assistant", "content": f"Answer {turn}: " + "because " * 40})
+
+            build: List[float] = []
+            lookup: List[float] = []
+            with quiet():
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    messages, stats, _ = main.build_messages()
+                    build.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    for path in paths:
+                        main.ensure_file_in_context(path)
+                    lookup.append((time.perf_counter() - started) / len(paths))
+            results.append({
+                "turns": turns,
+                "files": files,
+                "messages": len(messages),
+                "prompt_tokens": stats.tokens,
+                "build_messages_seconds": latency_summary(build),
+                "ensure_file_seconds": latency_summary(lookup),
+            })
+    return {"benchmark": "history", "repeat": repeat, "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=parse_sizes, default=[10, 100, 1000],
+                        help="conversation turns (default: 10,100,1000)")
+    parser.add_argument("--files", type=int, default=20, help="files in the context (default: 20)")
+    parser.add_argument("--repeat", type=int, default=20, help="measurements per size (default: 20)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.turns, args.files, args.repeat), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark CPU time spent rendering streamed tokens versus receiving them.
+
+Simulates a model streaming a JSON response at a given token rate and
+compares printing every delta through Rich (the old behaviour) with the
+frame-rate-limited RenderBuffer in both output modes. Output goes to the
+null device, so the numbers are in-process CPU cost only.
+
+Usage: python -m benchmarks.bench_render [--tokens N] [--rate TOKENS_PER_SEC]
+"""
+import argparse
+import json
+import os
+import time
+
+from rich.console import Console
+
+from onhax.render import RenderBuffer
+from onhax.streaming import StreamingResponseParser
+
+def make_deltas(tokens):
+    """Split a JSON response into token-sized deltas."""
+    words = " ".join(f"word{i % 50}" for i in range(tokens))
+    text = json.dumps({"assistant_reply": words})
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+def run(deltas, rate, strategy, sink):
+    """Stream deltas through the parser and render them with a strategy."""
+    console = Console(file=sink, force_terminal=True, width=120)
+    virtual_time = [0.0]
+    renderer = None
+    if strategy != "per_delta_rich":
+        mode = strategy.split("_", 1)[1]
+        renderer = RenderBuffer(console, mode=mode, stream=sink, clock=lambda: virtual_time[0])
+
+    parser = StreamingResponseParser()
+    receive_seconds = 0.0
+    render_seconds = 0.0
+    writes = 0
+    for delta in deltas:
+        virtual_time[0] += 1.0 / rate
+        started = time.process_time()
+        events = parser.feed(delta)
+        receive_seconds += time.process_time() - started
+
+        started = time.process_time()
+        for event in events:
+            if renderer is None:
+                console.print(event.value, end="")
+                writes += 1
+            else:
+                renderer.write(event.value)
+        render_seconds += time.process_time() - started
+    if renderer is not None:
+        started = time.process_time()
+        renderer.close()
+        render_seconds += time.process_time() - started
+        writes = renderer.flushes
+    return {
+        "strategy": strategy,
+        "deltas": len(deltas),
+        "writes": writes,
+        "receive_cpu_seconds": round(receive_seconds, 6),
+        "render_cpu_seconds": round(render_seconds, 6),
+    }
+
+def benchmark(tokens, rate):
+    """Compare all rendering strategies and return the results."""
+    deltas = make_deltas(tokens)
+    results = []
+    with open(os.devnull, "w") as sink:
+        for strategy in ("per_delta_rich", "buffered_rich", "buffered_plain"):
+            results.append(run(deltas, rate, strategy, sink))
+    return {"benchmark": "render", "rate": rate, "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=200.0, help="simulated tokens per second")
+    args = parser.parse_args()
+
+    print(json.dumps(benchmark(args.tokens, args.rate), indent=2))
+
+if __name__ == "__main__":
+    main()
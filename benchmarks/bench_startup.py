@@ -0,0 +1,113 @@
+"""Benchmark the import time of the entry points.
+
+Each module is imported in a fresh interpreter with ``-X importtime``,
+several times, and the fastest run is reported: the cumulative import
+time of the module itself, the heaviest modules it pulled in, and
+whether any of the dependencies that are meant to load lazily were
+imported. The test suite runs the same measurement against a budget.
+
+Usage: python -m benchmarks.bench_startup [--runs N] [--top N] [--json] [MODULE ...]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ("main", "onhax.__main__")
+
+# Dependencies that the entry points must not import at startup
+LAZY_MODULES = ("openai", "pydantic", "numpy", "requests", "rich.table")
+
+class ImportTiming(NamedTuple):
+    """One line of ``-X importtime`` output, in seconds."""
+
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+class StartupReport(NamedTuple):
+    """Import cost of one module."""
+
+    module: str
+    seconds: float
+    timings: List[ImportTiming]
+    lazy_loaded: List[str]
+
+    def heaviest(self, count: int) -> List[ImportTiming]:
+        """Return the modules with the largest own import time."""
+        return sorted(self.timings, key=lambda t: t.self_seconds, reverse=True)[:count]
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """Parse the ``-X importtime`` lines of an interpreter's stderr."""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append(ImportTiming(module, int(own) / 1e6, int(cumulative) / 1e6, depth))
+    return timings
+
+def measure(module: str, env: Optional[Dict[str, str]] = None) -> StartupReport:
+    """Import a module in a fresh interpreter and report its cost.
+
+    The interpreter runs in an empty directory, so that a project .env file
+    or workspace does not influence the measurement.
+
+    Args:
+        module: Module to import
+        env: Extra environment variables
+    """
+    code = (
+        "import sys; sys.path.insert(0, {root!r}); import {module}; "
+        "print(','.join(m for m in {lazy!r} if m in sys.modules))"
+    ).format(root=ROOT, module=module, lazy=LAZY_MODULES)
+    run_env = dict(os.environ, DEEPSEEK_API_KEY="benchmark", PYTHONDONTWRITEBYTECODE="1")
+    run_env.update(env or {})
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=cwd, env=run_env, capture_output=True, text=True, check=True,
+        )
+    timings = parse_importtime(result.stderr)
+    seconds = next((t.cumulative_seconds for t in timings if t.module == module and t.depth == 0), 0.0)
+    lazy_loaded = [name for name in result.stdout.strip().split(",") if name]
+    return StartupReport(module, seconds, timings, lazy_loaded)
+
+def best_of(module: str, runs: int) -> StartupReport:
+    """Return the fastest of several measurements (the least noisy one)."""
+    return min((measure(module) for _ in range(runs)), key=lambda report: report.seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--runs", type=int, default=5, help="measurements per module (default: 5)")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list (default: 8)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    reports = [best_of(module, args.runs) for module in args.modules]
+    if args.json:
+        print(json.dumps([{
+            "module": report.module,
+            "seconds": report.seconds,
+            "lazy_loaded": report.lazy_loaded,
+            "heaviest": [timing._asdict() for timing in report.heaviest(args.top)],
+        } for report in reports], indent=2))
+        return
+    for report in reports:
+        print(f"{report.module}: {report.seconds * 1000:.1f} ms (best of {args.runs})")
+        if report.lazy_loaded:
+            print(f"  imported at startup: {', '.join(report.lazy_loaded)}")
+        for timing in report.heaviest(args.top):
+            print(f"  {timing.self_seconds * 1000:8.1f} ms  {timing.module}")
+
+if __name__ == "__main__":
+    main()
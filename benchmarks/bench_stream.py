@@ -0,0 +1,71 @@
+"""Benchmark the streaming throughput of main.stream_openai_response.
+
+Runs whole assistant turns (prompt assembly, the streamed request through
+the OpenAI client, incremental parsing, rendering to the null device and
+validation) against the local mock server at several token rates. Rate 0
+streams as fast as possible and shows the client-side ceiling; the CPU
+time of the calling thread shows the per-token overhead at any rate.
+
+Usage: python -m benchmarks.bench_stream [--rates 0,200,1000] [--words 500] [--turns 5]
+"""
+import argparse
+import json
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import chdir, import_main, latency_summary, parse_sizes, quiet
+from benchmarks.mock_server import MockDeepSeekServer, reply_tokens
+
+def run(rates: List[int], words: int = 500, turns: int = 5, latency: float = 0.05) -> Dict[str, Any]:
+    """Run the benchmark and return its results."""
+    from onhax.context import PrefixAssembler
+    from onhax.telemetry import Telemetry
+
+    main = import_main()
+    tokens = len(reply_tokens(words))
+    results = []
+    with tempfile.TemporaryDirectory() as cwd, chdir(cwd):
+        for rate in rates:
+            with MockDeepSeekServer(rate=rate, latency=latency, words=words) as server:
+                import_main(server.url)
+                main.telemetry = Telemetry()
+                main.conversation_history[1:] = []
+                main.prefix_assembler = PrefixAssembler()
+                main.get_client()  # import openai and pydantic outside the timings
+                import onhax.schema  # noqa: F401
+                wall: List[float] = []
+                cpu: List[float] = []
+                for turn in range(turns):
+                    started, cpu_started = time.perf_counter(), time.thread_time()
+                    with quiet():
+                        response = main.stream_openai_response(f"Benchmark turn {turn}")
+                    cpu.append(time.thread_time() - cpu_started)
+                    wall.append(time.perf_counter() - started)
+                    if not response.assistant_reply.startswith("word0"):
+                        raise RuntimeError(f"Unexpected reply: {response.assistant_reply[:200]}")
+                stats = main.telemetry.summary()["assistant"]
+            results.append({
+                "served_rate": rate,
+                "tokens": tokens,
+                "turn_seconds": latency_summary(wall),
+                "ttft_p50": round(stats["ttft"]["p50"], 6),
+                "tokens_per_second_p50": round(stats["tokens_per_second"]["p50"], 1),
+                "postprocess_p50": round(stats["postprocess"]["p50"], 6),
+                "cpu_seconds_per_turn": round(sum(cpu) / len(cpu), 6),
+                "cpu_microseconds_per_token": round(sum(cpu) / len(cpu) / tokens * 1e6, 2),
+            })
+    return {"benchmark": "stream", "words": words, "turns": turns, "latency": latency, "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=parse_sizes, default=[0, 200, 1000],
+                        help="served tokens per second, 0 for unthrottled (default: 0,200,1000)")
+    parser.add_argument("--words", type=int, default=500, help="words per reply (default: 500)")
+    parser.add_argument("--turns", type=int, default=5, help="turns per rate (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency in seconds")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rates, args.words, args.turns, args.latency), indent=2))
+
+if __name__ == "__main__":
+    main()
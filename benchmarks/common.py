@@ -0,0 +1,84 @@
+"""Helpers shared by the benchmarks."""
+import contextlib
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Return a percentile (nearest rank) of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """Return the count, mean and p50/p90/p99 of latency samples, in seconds."""
+    return {
+        "count": len(samples),
+        "mean": round(sum(samples) / len(samples), 6) if samples else 0.0,
+        "p50": round(percentile(samples, 0.5), 6),
+        "p90": round(percentile(samples, 0.9), 6),
+        "p99": round(percentile(samples, 0.99), 6),
+    }
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and revision the benchmarks ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+@contextlib.contextmanager
+def quiet() -> Iterator[None]:
+    """Send stdout to the null device while benchmarked code prints."""
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+@contextlib.contextmanager
+def chdir(path: str) -> Iterator[None]:
+    """Run a block in another working directory."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def import_main(base_url: str = "http://127.0.0.1:9") -> Any:
+    """Import main.py with output silenced and the API pointed at a local URL.
+
+    Returns:
+        The main module
+    """
+    os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+    os.environ["DEEPSEEK_BASE_URL"] = base_url
+    os.environ.setdefault("DEEPSEEK_PREWARM", "0")
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import main
+    from rich.console import Console
+
+    main.console = Console(file=open(os.devnull, "w"), force_terminal=False, width=120)
+    main.client = None  # created against the new base URL on first use
+    return main
+
+def parse_sizes(text: str) -> List[int]:
+    """Parse a comma-separated list of sizes, e.g. "10,100,1000"."""
+    return [int(part) for part in text.split(",") if part.strip()]
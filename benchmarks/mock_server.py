@@ -0,0 +1,164 @@
+"""Local OpenAI-compatible chat completions server for offline benchmarks.
+
+Answers ``POST /chat/completions`` (with or without a ``/v1`` prefix) with a
+JSON ``{"assistant_reply": ...}`` document of a configurable number of
+words, after a configurable latency. Streaming requests receive it in
+four-character tokens as server-sent events at a configurable rate,
+followed by a usage event when ``stream_options.include_usage`` is set.
+``GET /models`` answers the connection warm-up.
+
+Usage: python -m benchmarks.mock_server [--port 8000] [--rate 200] [--latency 0.05] [--words 500]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+def reply_tokens(words: int) -> List[str]:
+    """Split a JSON assistant reply of ``words`` words into token-sized pieces."""
+    text = json.dumps({"assistant_reply": " ".join(f"word{i % 50}" for i in range(words))})
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY the body
+    # waits for the client's delayed ACK and every response gains ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "deepseek-chat", "object": "model"}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        server: MockDeepSeekServer = self.server  # type: ignore[assignment]
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server.count_request()
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", []))
+        tokens = reply_tokens(server.words)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        time.sleep(server.latency)
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            self._stream(server, tokens, usage if include_usage else None)
+            return
+        self._send_json({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "deepseek-chat"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "".join(tokens)}}],
+            "usage": usage,
+        })
+
+    def _send_json(self, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, server: "MockDeepSeekServer", tokens: List[str], usage: Optional[Dict[str, int]]) -> None:
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        interval = 1.0 / server.rate if server.rate > 0 else 0.0
+        started = time.monotonic()
+        for i, token in enumerate(tokens):
+            if interval:
+                # Pace against the start time so sleep overhead does not accumulate
+                delay = started + i * interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            event = {
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(started),
+                "model": "deepseek-chat",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+        if usage is not None:
+            event = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(started),
+                     "model": "deepseek-chat", "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+class MockDeepSeekServer(ThreadingHTTPServer):
+    """Mock API server running on a background thread.
+
+    Use as a context manager; ``url`` is the base URL to configure.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, rate: float = 200.0, latency: float = 0.05, words: int = 500):
+        """Initialize the server.
+
+        Args:
+            port: Port to listen on, 0 for any free port
+            rate: Streamed tokens per second, 0 for as fast as possible
+            latency: Seconds before the first byte of every response
+            words: Words in every reply
+        """
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.rate = rate
+        self.latency = latency
+        self.words = words
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "MockDeepSeekServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-deepseek", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockDeepSeekServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--rate", type=float, default=200.0, help="streamed tokens per second")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the first byte")
+    parser.add_argument("--words", type=int, default=500, help="words per reply")
+    args = parser.parse_args()
+    server = MockDeepSeekServer(args.port, args.rate, args.latency, args.words)
+    print(f"Serving on {server.url} (DEEPSEEK_BASE_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
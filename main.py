@@ -1,18 +1,42 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import os
 import sys
+import argparse
+import glob
+import importlib.util
+import threading
+import time
 import json
 from pathlib import Path
 from textwrap import dedent
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
-from pydantic import BaseModel
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable
+from functools import partial
 from dotenv import load_dotenv
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.style import Style
+
+from onhax.context import ContextWindow, PrefixAssembler, cache_usage, file_snapshot_path
+from onhax.edits import Edit, apply_file_edits, group_edits
+from onhax.ingest import FileIngestor, IngestError, IngestResult
+from onhax.logging import setup_logging
+from onhax.prefetch import Prefetcher
+from onhax.registry import FileContextRegistry
+from onhax.render import RenderBuffer
+from onhax.session import SessionJournal, SessionStore
+from onhax.streaming import StreamingResponseParser
+from onhax.telemetry import Telemetry
+from onhax.workspace import WorkspaceIndex, is_glob
+
+# Heavy dependencies (openai, pydantic, numpy, rich.table) are imported where
+# they are first needed, so that startup and --help stay fast
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from onhax.schema import AssistantResponse, FileToEdit
+
+# NumPy is optional (pip install onhax[retrieval])
+RETRIEVAL_AVAILABLE = importlib.util.find_spec("numpy") is not None
 
 # Initialize Rich console
 console = Console()
@@ -21,29 +45,38 @@ console = Console()
 # 1. Configure OpenAI client and load environment variables
 # --------------------------------------------------------------------------------
 load_dotenv()  # Load environment variables from .env file
-client = OpenAI(
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    base_url="https://api.deepseek.com"
-)  # Configure for DeepSeek API
+client: Optional[OpenAI] = None  # created on first use by get_client()
+_client_lock = threading.Lock()
+
+def get_client() -> OpenAI:
+    """Return the API client, importing openai and creating it on first use."""
+    global client
+    with _client_lock:
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+                base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+            )  # Configure for DeepSeek API
+        return client
+
+def preload_modules():
+    """Import the heavy dependencies and create the client in the background,
+    while the user types the first message."""
+    def load():
+        try:
+            get_client()
+            import onhax.schema  # noqa: F401
+            if retrieval_enabled(wait=False):
+                import onhax.retrieval  # noqa: F401
+        except Exception:
+            pass  # the same import fails again, visibly, where it is needed
+    threading.Thread(target=load, name="preload", daemon=True).start()
 
 # --------------------------------------------------------------------------------
 # 2. Define our schema using Pydantic for type safety
 # --------------------------------------------------------------------------------
-class FileToCreate(BaseModel):
-    path: str
-    content: str
-
-# NEW: Diff editing structure
-class FileToEdit(BaseModel):
-    path: str
-    original_snippet: str
-    new_snippet: str
-
-class AssistantResponse(BaseModel):
-    assistant_reply: str
-    files_to_create: Optional[List[FileToCreate]] = None
-    # NEW: optionally hold diff edits
-    files_to_edit: Optional[List[FileToEdit]] = None
+# The response models live in onhax/schema.py and are imported on first use.
 
 # --------------------------------------------------------------------------------
 # 3. system prompt
@@ -78,17 +111,27 @@ def create_file(path: str, content: str):
         "content": f"✓ Created/updated file at '{file_path}'"
     })
     
-    # NEW: Add the actual content to conversation context
-    normalized_path = normalize_path(str(file_path))
-    conversation_history.append({
-        "role": "system",
-        "content": f"Content of file '{normalized_path}':\n\n{content}"
-    })
+    # Replace the file's snapshot in the conversation context
+    register_written_file(str(file_path), content)
+
+def register_written_file(path: str, content: str):
+    """
+    Replace a file's snapshot after writing it. A file that does not fit the
+    context budget is left out with a warning; the write itself has succeeded,
+    and an older snapshot would no longer match the file, so it is dropped.
+    """
+    try:
+        file_registry.add(path, content)
+    except IngestError as e:
+        file_registry.discard(path)
+        file_ingestor.release(normalize_path(path))
+        console.print(f"[yellow]⚠[/yellow] {e}", style="yellow")
 
 # NEW: Show the user a table of proposed edits and confirm
 def show_diff_table(files_to_edit: List[FileToEdit]) -> None:
     if not files_to_edit:
         return
+    from rich.table import Table
     
     # Enable multi-line rows by setting show_lines=True
     table = Table(title="Proposed Edits", show_header=True, header_style="bold magenta", show_lines=True)
@@ -101,28 +144,44 @@ def show_diff_table(files_to_edit: List[FileToEdit]) -> None:
     
     console.print(table)
 
-# NEW: Apply diff edits
-def apply_diff_edit(path: str, original_snippet: str, new_snippet: str):
-    """Reads the file at 'path', replaces the first occurrence of 'original_snippet' with 'new_snippet', then overwrites."""
-    try:
-        content = read_local_file(path)
-        if original_snippet in content:
-            updated_content = content.replace(original_snippet, new_snippet, 1)
-            create_file(path, updated_content)  # This will now also update conversation context
-            console.print(f"[green]✓[/green] Applied diff edit to '[cyan]{path}[/cyan]'")
+def apply_diff_edits(files_to_edit: List[FileToEdit]):
+    """
+    Applies all edits with one read, one atomic write and one new context
+    snapshot per file. Edits are located against the original content, so
+    they cannot interfere with each other; overlapping edits are rejected.
+    """
+    grouped = group_edits(
+        (edit.path, Edit(edit.original_snippet, edit.new_snippet)) for edit in files_to_edit
+    )
+    for path, edits in grouped.items():
+        try:
+            result = apply_file_edits(path, edits, whitespace_tolerant=EDIT_WHITESPACE_TOLERANT)
+        except FileNotFoundError:
+            console.print(f"[red]✗[/red] File not found for diff editing: '[cyan]{path}[/cyan]'", style="red")
+            continue
+        except OSError as e:
+            console.print(f"[red]✗[/red] Could not edit '[cyan]{path}[/cyan]': {e}", style="red")
+            continue
+
+        if result.changed:
+            register_written_file(path, result.content)
+            console.print(f"[green]✓[/green] Applied {result.applied} diff edit(s) to '[cyan]{path}[/cyan]'")
             conversation_history.append({
                 "role": "assistant",
-                "content": f"✓ Applied diff edit to '{path}'"
+                "content": f"✓ Applied {result.applied} diff edit(s) to '{path}'"
             })
-        else:
-            # NEW: Add debug info about the mismatch
-            console.print(f"[yellow]⚠[/yellow] Original snippet not found in '[cyan]{path}[/cyan]'. No changes made.", style="yellow")
-            console.print("\nExpected snippet:", style="yellow")
-            console.print(Panel(original_snippet, title="Expected", border_style="yellow"))
-            console.print("\nActual file content:", style="yellow")
-            console.print(Panel(content, title="Actual", border_style="yellow"))
-    except FileNotFoundError:
-        console.print(f"[red]✗[/red] File not found for diff editing: '[cyan]{path}[/cyan]'", style="red")
+        for failure in result.failures:
+            console.print(
+                f"[yellow]⚠[/yellow] Edit {failure.index + 1} for '[cyan]{path}[/cyan]' not applied: {failure.reason}.",
+                style="yellow"
+            )
+            from rich.panel import Panel
+            console.print(Panel(failure.edit.original, title="Expected", border_style="yellow"))
+
+def apply_diff_edit(path: str, original_snippet: str, new_snippet: str):
+    """Replaces the first occurrence of 'original_snippet' in the file at 'path' with 'new_snippet'."""
+    from onhax.schema import FileToEdit
+    apply_diff_edits([FileToEdit(path=path, original_snippet=original_snippet, new_snippet=new_snippet)])
 
 def try_handle_add_command(user_input: str) -> bool:
     """
@@ -132,32 +191,45 @@ def try_handle_add_command(user_input: str) -> bool:
     prefix = "/add "
     if user_input.strip().lower().startswith(prefix):
         file_path = user_input[len(prefix):].strip()
+        if is_glob(file_path):
+            add_matching_files(file_path)
+            return True
         try:
-            content = read_local_file(file_path)
-            conversation_history.append({
-                "role": "system",
-                "content": f"Content of file '{file_path}':\n\n{content}"
-            })
+            file_registry.add(file_path)
             console.print(f"[green]✓[/green] Added file '[cyan]{file_path}[/cyan]' to conversation.\n")
         except OSError as e:
             console.print(f"[red]✗[/red] Could not add file '[cyan]{file_path}[/cyan]': {e}\n", style="red")
         return True
     return False
 
+def expand_add_pattern(pattern: str) -> List[str]:
+    """Expand a /add glob from the workspace index rather than walking the tree."""
+    if not workspace.ready.is_set():
+        workspace.build()
+    if os.path.isabs(pattern) and workspace.relative(pattern).startswith("../"):
+        return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return workspace.glob(pattern)
+
+def add_matching_files(pattern: str):
+    """Add every file matching a glob such as 'src/**/*.py' to the conversation."""
+    paths = expand_add_pattern(pattern)
+    if not paths:
+        console.print(f"[yellow]⚠[/yellow] No files match '[cyan]{pattern}[/cyan]'.\n", style="yellow")
+        return
+    result = file_prefetcher.run(paths)
+    for path, error in result.errors.items():
+        console.print(f"[red]✗[/red] Could not add file '[cyan]{path}[/cyan]': {error}", style="red")
+    console.print(
+        f"[green]✓[/green] Added {len(result.loaded)} file(s) matching '[cyan]{pattern}[/cyan]' to conversation.\n"
+    )
+
 def ensure_file_in_context(file_path: str) -> bool:
     """
     Ensures the file content is in the conversation context.
     Returns True if successful, False if file not found.
     """
     try:
-        normalized_path = normalize_path(file_path)
-        content = read_local_file(normalized_path)
-        file_marker = f"Content of file '{normalized_path}'"
-        if not any(file_marker in msg["content"] for msg in conversation_history):
-            conversation_history.append({
-                "role": "system",
-                "content": f"{file_marker}:\n\n{content}"
-            })
+        file_registry.ensure(file_path)
         return True
     except OSError:
         console.print(f"[red]✗[/red] Could not read file '[cyan]{file_path}[/cyan]' for editing context", style="red")
@@ -174,20 +246,292 @@ conversation_history = [
     {"role": "system", "content": system_PROMPT}
 ]
 
+def report_truncation(result: IngestResult):
+    """Tell the user that only part of a large file went into the context."""
+    console.print(
+        f"[yellow]⚠[/yellow] '[cyan]{result.path}[/cyan]' is {result.size} bytes; "
+        f"only its beginning and end were added (~{result.omitted} bytes omitted).",
+        style="yellow"
+    )
+
+# Bound how much file content enters the context, per file and per session
+file_ingestor = FileIngestor(
+    max_file_bytes=int(os.getenv("DEEPSEEK_MAX_FILE_BYTES", str(256 * 1024))),
+    max_session_bytes=int(os.getenv("DEEPSEEK_MAX_CONTEXT_BYTES", str(2 * 1024 * 1024))),
+    on_truncate=report_truncation,
+)
+
+# Index of the project tree, built in the background once the session starts;
+# capped, since the session may be started from a huge directory such as $HOME
+workspace = WorkspaceIndex(
+    os.getcwd(),
+    poll_interval=float(os.getenv("DEEPSEEK_WORKSPACE_POLL", "2")),
+    max_files=int(os.getenv("DEEPSEEK_WORKSPACE_MAX_FILES", "20000")),
+    max_depth=int(os.getenv("DEEPSEEK_WORKSPACE_MAX_DEPTH", "16")),
+)
+
+# A mentioned name that matches more files than this is treated as ambiguous
+WORKSPACE_MAX_MATCHES = 3
+
+# Send the best-matching chunks of workspace files, up to this many tokens,
+# instead of whole files (0 disables; needs NumPy)
+RETRIEVAL_TOKENS = int(os.getenv("DEEPSEEK_RETRIEVAL_TOKENS", "8000"))
+RETRIEVAL_MAX_CHUNKS = int(os.getenv("DEEPSEEK_RETRIEVAL_CHUNKS", "20"))
+chunk_index = None  # built in the background by start_chunk_index()
+chunk_index_ready = threading.Event()
+chunk_index_generation = 0  # workspace changes up to here are in chunk_index
+
+def retrieval_enabled(wait: bool = True) -> bool:
+    """Whether chunk retrieval can be used for this turn (with wait=False,
+    whether it can be used at all, even before the chunk index is built)."""
+    return RETRIEVAL_AVAILABLE and RETRIEVAL_TOKENS > 0 and (not wait or chunk_index_ready.is_set())
+
+def start_chunk_index():
+    """Load and update the chunk index in the background once the workspace is
+    indexed. Until it is ready, referenced files are read whole instead."""
+    def build():
+        global chunk_index, chunk_index_generation
+        try:
+            from onhax.retrieval import ChunkIndex, default_index_dir
+            workspace.wait()
+            generation = workspace.generation
+            index_dir = os.getenv("DEEPSEEK_RETRIEVAL_INDEX_DIR") or default_index_dir(workspace.root)
+            index = ChunkIndex(workspace.root, index_dir)
+            index.update(entry.path for entry in workspace)
+            index.save()
+        except Exception:
+            return  # retrieval stays off; files are read whole
+        chunk_index, chunk_index_generation = index, generation
+        chunk_index_ready.set()
+    threading.Thread(target=build, name="chunk-index", daemon=True).start()
+
+def retrieve_chunks(user_message: str, referenced: List[str], budget_tokens: int):
+    """Bring the chunk index up to date and select chunks for a message.
+    Only files the workspace index reports as changed, and the files named in
+    the message, are re-checked. Files named in the message are ranked higher."""
+    global chunk_index_generation
+    generation = workspace.generation
+    changed = workspace.changes_since(chunk_index_generation)
+    if changed is None:
+        chunk_index.update(entry.path for entry in workspace)  # the workspace was rebuilt
+    else:
+        chunk_index.refresh(changed | {workspace.relative(path) for path in referenced})
+    chunk_index_generation = generation
+    boost = {workspace.relative(path): 3.0 for path in referenced}
+    selection = chunk_index.select(user_message, budget_tokens, k=RETRIEVAL_MAX_CHUNKS, boost=boost)
+    # A file rewritten in place leaves its directory's mtime alone
+    if chunk_index.refresh({chunk.path for chunk, _ in selection.chunks}):
+        selection = chunk_index.select(user_message, budget_tokens, k=RETRIEVAL_MAX_CHUNKS, boost=boost)
+    chunk_index.save()
+    return selection
+
+# One live snapshot per file; merged into the messages at request time
+file_registry = FileContextRegistry(reader=file_ingestor.read)
+
+# Files referenced in a message are read concurrently, while the connection
+# for the completion request is opened (disable with DEEPSEEK_PREWARM=0)
+file_prefetcher = Prefetcher(file_registry.ensure)
+PREWARM_CONNECTION = os.getenv("DEEPSEEK_PREWARM", "1") != "0"
+
+def warm_connection():
+    """Open (or refresh) the pooled connection to the API with a cheap request."""
+    get_client().models.list(timeout=5.0)
+
+# Streamed reply text is written at most this many times per second,
+# either through Rich ("rich") or straight to stdout ("plain")
+RENDER_MODE = os.getenv("DEEPSEEK_RENDER", "rich")
+RENDER_FPS = float(os.getenv("DEEPSEEK_RENDER_FPS", "30"))
+# 0 or less turns the frame limit off and writes every delta
+RENDER_INTERVAL = 1 / RENDER_FPS if RENDER_FPS > 0 else 0.0
+
+# Opt-in: let edit snippets match whole lines that differ only in whitespace
+EDIT_WHITESPACE_TOLERANT = os.getenv("DEEPSEEK_EDIT_WHITESPACE", "exact") == "tolerant"
+
+# Trim the history to a token budget before each request
+context_window = ContextWindow(
+    budget_tokens=int(os.getenv("DEEPSEEK_CONTEXT_TOKENS", "56000")),
+    policy=os.getenv("DEEPSEEK_CONTEXT_POLICY", "evict"),
+    low_watermark=float(os.getenv("DEEPSEEK_CONTEXT_LOW_WATERMARK", "0.75")),
+)
+
+# Keep already-sent messages in place so DeepSeek's prefix cache can reuse them
+prefix_assembler = PrefixAssembler()
+
 # --------------------------------------------------------------------------------
 # 6. OpenAI API interaction with streaming
 # --------------------------------------------------------------------------------
 
+# Sessions are journaled to ~/.onhax (or DEEPSEEK_SESSION_DIR) after every turn;
+# at startup only the most recent ones are kept, within a size limit
+session_store = SessionStore(os.getenv("DEEPSEEK_SESSION_DIR") or None)
+session_journal: Optional[SessionJournal] = None
+SESSION_KEEP = int(os.getenv("DEEPSEEK_SESSION_KEEP", "50"))
+SESSION_MAX_BYTES = int(float(os.getenv("DEEPSEEK_SESSION_MAX_MB", "500")) * 1024 * 1024)
+
+def resume_session(session_id: str) -> SessionJournal:
+    """
+    Restore the history and file snapshots of a saved session. Files that did
+    not change on disk are not read again; their saved content is loaded from
+    the blob store when first needed.
+    """
+    if session_id == "latest":
+        session_id = session_store.latest()
+        if session_id is None:
+            raise FileNotFoundError("No saved sessions")
+    journal = session_store.resume(session_id)
+    state = journal.state
+    if state.messages:
+        conversation_history[:] = state.messages
+    for record in state.files.values():
+        snapshot = file_registry.restore(
+            record.path, record.digest, record.mtime_ns, record.size,
+            partial(session_store.blobs.get, record.digest)
+        )
+        if snapshot is not None and snapshot.digest == record.digest:
+            file_ingestor.charge(snapshot.path, record.nbytes)
+    return journal
+
+def save_session():
+    """Append this turn's changes to the session journal."""
+    if session_journal is None:
+        return
+    try:
+        session_journal.sync(conversation_history, file_registry)
+    except OSError as e:
+        console.print(f"[yellow]⚠[/yellow] Could not save the session: {e}", style="yellow")
+
+def prune_sessions():
+    """Delete old sessions and the stored contents only they referred to."""
+    try:
+        session_store.prune(
+            SESSION_KEEP, SESSION_MAX_BYTES,
+            protect=[session_journal.session_id] if session_journal is not None else [],
+        )
+    except OSError as e:
+        console.print(f"[yellow]⚠[/yellow] Could not prune saved sessions: {e}", style="yellow")
+
+# Prompt tokens served from / missing DeepSeek's context cache this session
+session_cache = {"hit": 0, "miss": 0}
+
+def report_cache_usage(usage):
+    """Print the prompt cache hits reported in a response's usage data."""
+    cache = cache_usage(usage) if usage is not None else None
+    if cache is None:
+        return
+    session_cache["hit"] += cache.hit_tokens
+    session_cache["miss"] += cache.miss_tokens
+    session_total = session_cache["hit"] + session_cache["miss"]
+    console.print(
+        f"[dim]Cache: {cache.hit_tokens} of {cache.prompt_tokens} prompt tokens hit"
+        f" ({cache.hit_ratio:.0%}; session {session_cache['hit'] / session_total:.0%})[/dim]"
+    )
+
+# Per-request latency and token metrics; ONHAX_METRICS_FILE exports them
+# after every request (.prom for a Prometheus textfile collector, else JSON)
+telemetry = Telemetry(export_path=os.getenv("ONHAX_METRICS_FILE") or None)
+
+def format_seconds(value: Optional[float]) -> str:
+    """Format a duration for the stats table."""
+    return "-" if value is None else f"{value * 1000:.0f} ms" if value < 1 else f"{value:.2f} s"
+
+def show_stats():
+    """Print the request metrics collected in this session."""
+    summary = telemetry.summary()
+    if not summary:
+        console.print("[yellow]ℹ[/yellow] No requests made yet.\n", style="yellow")
+        return
+    from rich.table import Table
+    table = Table(title="Requests", show_header=True, header_style="bold magenta", show_lines=True)
+    table.add_column("Metric", style="cyan")
+    for source in summary:
+        table.add_column(source, justify="right")
+
+    def row(label, render):
+        table.add_row(label, *(render(entry) for entry in summary.values()))
+
+    def timing(name, quantile, render=format_seconds):
+        return lambda entry: render(entry[name][quantile])
+
+    row("Requests (errors)", lambda e: f"{e['requests']} ({e['errors']})")
+    row("Time to first token p50 / p90",
+        lambda e: f"{format_seconds(e['ttft']['p50'])} / {format_seconds(e['ttft']['p90'])}")
+    row("Duration p50 / p90",
+        lambda e: f"{format_seconds(e['duration']['p50'])} / {format_seconds(e['duration']['p90'])}")
+    row("Tokens/s p50", timing("tokens_per_second", "p50", lambda v: "-" if v is None else f"{v:.1f}"))
+    row("Post-processing p50", timing("postprocess", "p50"))
+    row("Prompt / completion tokens", lambda e: f"{e['prompt_tokens']} / {e['completion_tokens']}")
+    row("Prompt cache hit", lambda e: (
+        f"{e['cache_hit_tokens'] / (e['cache_hit_tokens'] + e['cache_miss_tokens']):.0%}"
+        if e["cache_hit_tokens"] + e["cache_miss_tokens"] else "-"
+    ))
+    row("Sent", lambda e: f"{e['request_bytes'] / 1024:.1f} KiB")
+    console.print(table)
+    console.print()
+
+def try_handle_stats_command(user_input: str) -> bool:
+    """Handle '/stats'. Returns True if handled; else False."""
+    if user_input.strip().lower() == "/stats":
+        show_stats()
+        return True
+    return False
+
+def build_messages(excerpt: Optional[Dict[str, str]] = None):
+    """
+    Assemble the request messages from the system prompt, the registered file
+    snapshots and the conversation turns, trimmed to the token budget.
+    Messages sent before keep their order and new ones are appended, so
+    consecutive requests share a cacheable prefix.
+    Evicted turns and snapshots are forgotten so the session stays bounded.
+    An excerpt message (retrieved chunks) counts against the same budget but
+    is never kept in the history. It changes every turn, so it goes last,
+    after the pending user message: the next request then still shares
+    everything up to that message with this one.
+    """
+    file_registry.refresh()
+    messages = prefix_assembler.assemble(
+        conversation_history[:1], file_registry.messages(), conversation_history[1:]
+    )
+    reserve = context_window.count_message(excerpt) if excerpt is not None else 0
+    trimmed, stats = context_window.prepare(messages, reserve_tokens=reserve)
+
+    kept_paths = {file_snapshot_path(msg) for msg in trimmed}
+    for snapshot in file_registry:
+        if snapshot.path not in kept_paths:
+            file_registry.discard(snapshot.path)
+    file_ingestor.retain(snapshot.path for snapshot in file_registry)
+    conversation_history[:] = [msg for msg in trimmed if file_snapshot_path(msg) is None]
+
+    if excerpt is not None:
+        trimmed = trimmed + [excerpt]
+        stats = stats._replace(
+            messages=stats.messages + 1,
+            tokens=stats.tokens + reserve,
+            original_tokens=stats.original_tokens + reserve,
+        )
+    prefix_tokens = context_window.count(trimmed[:prefix_assembler.shared_prefix(trimmed)])
+    prefix_assembler.record(trimmed)
+    return trimmed, stats, prefix_tokens
+
 def guess_files_in_message(user_message: str) -> List[str]:
     """
-    Attempt to guess which files the user might be referencing.
+    Attempt to guess which files the user might be referencing. Once the
+    workspace index is built, names of project files resolve through it;
+    other words that look like paths are kept as before.
     Returns normalized absolute paths.
     """
     recognized_extensions = [".css", ".html", ".js", ".py", ".json", ".md"]
     potential_paths = []
     for word in user_message.split():
+        path = word.strip("',\"`()")
+        if workspace.ready.is_set():
+            # Names of files in the project, e.g. "client.py", resolve through the index
+            matches = workspace.resolve(path.rstrip(".,:;!?"))
+            if 0 < len(matches) <= WORKSPACE_MAX_MATCHES:
+                potential_paths.extend(matches)
+                continue
+            if matches:
+                continue
         if any(ext in word for ext in recognized_extensions) or "/" in word:
-            path = word.strip("',\"")
             try:
                 normalized_path = normalize_path(path)
                 potential_paths.append(normalized_path)
@@ -195,119 +539,209 @@ def guess_files_in_message(user_message: str) -> List[str]:
                 continue
     return potential_paths
 
-def stream_openai_response(user_message: str):
+def stream_openai_response(user_message: str, on_entry: Optional[Callable[[str, Dict[str, Any]], None]] = None):
     """
     Streams the DeepSeek chat completion response and handles structured output.
+    The assistant_reply text is printed as it arrives, and each completed
+    files_to_create / files_to_edit entry is passed to on_entry(kind, entry)
+    before the rest of the answer has streamed.
     Returns the final AssistantResponse.
     """
     # Attempt to guess which file(s) user references
     potential_paths = guess_files_in_message(user_message)
     
-    valid_files = {}
-
-    # Try to read all potential files before the API call
-    for path in potential_paths:
-        try:
-            content = read_local_file(path)
-            valid_files[path] = content  # path is already normalized
-            file_marker = f"Content of file '{path}'"
-            # Add to conversation if we haven't already
-            if not any(file_marker in msg["content"] for msg in conversation_history):
-                conversation_history.append({
-                    "role": "system",
-                    "content": f"{file_marker}:\n\n{content}"
-                })
-        except OSError:
+    # Files in the workspace index are covered by chunk retrieval; any other
+    # referenced files are read whole, concurrently, skipping non-file words
+    use_retrieval = retrieval_enabled()
+    indexed = [path for path in potential_paths if use_retrieval and path in workspace]
+    prefetched = file_prefetcher.run(
+        [path for path in potential_paths if path not in indexed],
+        warmup=warm_connection if PREWARM_CONNECTION and potential_paths else None
+    )
+    valid_files = {path: snapshot.content for path, snapshot in prefetched.loaded.items()}
+    for path, error in prefetched.errors.items():
+        if isinstance(error, IngestError):
+            console.print(f"[yellow]⚠[/yellow] {error}", style="yellow")
+        else:
             error_msg = f"Cannot proceed: File '{path}' does not exist or is not accessible"
             console.print(f"[red]✗[/red] {error_msg}", style="red")
-            continue
+    if potential_paths:
+        console.print(
+            f"[dim]Context: {len(valid_files)} file(s) read, {len(prefetched.skipped)} non-file"
+            f" word(s) skipped in {prefetched.seconds * 1000:.0f} ms[/dim]"
+        )
+
+    selection = None
+    if use_retrieval:
+        started = time.perf_counter()
+        # At most half the context, so the conversation itself keeps room
+        budget = min(RETRIEVAL_TOKENS, context_window.budget_tokens // 2)
+        selection = retrieve_chunks(user_message, indexed, budget)
+        valid_files.update(dict.fromkeys(indexed))
+        console.print(
+            f"[dim]Retrieval: {len(selection.chunks)} chunk(s), ~{selection.tokens} tokens"
+            f" (saved ~{selection.saved_tokens} vs whole files) in"
+            f" {(time.perf_counter() - started) * 1000:.0f} ms[/dim]"
+        )
 
     # Now proceed with the API call
     conversation_history.append({"role": "user", "content": user_message})
 
+    # Fit the conversation into the token budget and report the prompt size
+    # Excerpts are rebuilt every turn, so they are never kept in the history
+    excerpt = selection.message() if selection is not None and selection.chunks else None
+    messages, context_stats, prefix_tokens = build_messages(excerpt)
+    console.print(
+        f"[dim]Prompt: ~{context_stats.tokens} tokens in {context_stats.messages} messages"
+        f" (saved ~{context_stats.saved_tokens}: {context_stats.dropped_snapshots} stale snapshots,"
+        f" {context_stats.evicted} evicted, {context_stats.compacted} compacted;"
+        f" ~{prefix_tokens} unchanged since the last request)[/dim]"
+    )
+
+    from onhax.schema import AssistantResponse
+
+    span = telemetry.start("assistant", "deepseek-chat", len(json.dumps(messages).encode("utf-8")))
     try:
-        stream = client.chat.completions.create(
+        stream = get_client().chat.completions.create(
             model="deepseek-chat",
-            messages=conversation_history,
+            messages=messages,
             response_format={"type": "json_object"},
             max_completion_tokens=8000,
-            stream=True
+            stream=True,
+            stream_options={"include_usage": True}
         )
 
         console.print("\nAssistant> ", style="bold blue", end="")
-        full_content = ""
-
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
-                content_chunk = chunk.choices[0].delta.content
-                full_content += content_chunk
-                console.print(content_chunk, end="")
-
+        parser = StreamingResponseParser()
+
+        with RenderBuffer(console, mode=RENDER_MODE, interval=RENDER_INTERVAL) as renderer:
+            usage = None
+            for chunk in stream:
+                # Show the end of the reply while the file payload streams in
+                renderer.tick()
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage  # sent with the final chunk
+                if not chunk.choices:
+                    continue
+                if chunk.choices[0].delta.content:
+                    span.first_token()
+                    for event in parser.feed(chunk.choices[0].delta.content):
+                        if event.kind == "reply":
+                            renderer.write(event.value)
+                        elif on_entry:
+                            renderer.flush()
+                            on_entry(event.kind, event.value)
+
+        span.response_done()
+        span.set_usage(usage)
         console.print()
+        report_cache_usage(usage)
 
-        try:
-            parsed_response = json.loads(full_content)
+        with span.postprocess():
+            try:
+                parsed_response = parser.result()
             
-            # [NEW] Ensure assistant_reply is present
-            if "assistant_reply" not in parsed_response:
-                parsed_response["assistant_reply"] = ""
-
-            # If assistant tries to edit files not in valid_files, remove them
-            if "files_to_edit" in parsed_response and parsed_response["files_to_edit"]:
-                new_files_to_edit = []
-                for edit in parsed_response["files_to_edit"]:
-                    try:
-                        edit_abs_path = normalize_path(edit["path"])
-                        # If we have the file in context or can read it now
-                        if edit_abs_path in valid_files or ensure_file_in_context(edit_abs_path):
-                            edit["path"] = edit_abs_path  # Use normalized path
-                            new_files_to_edit.append(edit)
-                    except (OSError, ValueError):
-                        console.print(f"[yellow]⚠[/yellow] Skipping invalid path: '{edit['path']}'", style="yellow")
-                        continue
-                parsed_response["files_to_edit"] = new_files_to_edit
-
-            response_obj = AssistantResponse(**parsed_response)
-
-            # Save the assistant's textual reply to conversation
-            conversation_history.append({
-                "role": "assistant",
-                "content": response_obj.assistant_reply
-            })
+                # [NEW] Ensure assistant_reply is present
+                if "assistant_reply" not in parsed_response:
+                    parsed_response["assistant_reply"] = ""
+
+                # If assistant tries to edit files not in valid_files, remove them
+                if "files_to_edit" in parsed_response and parsed_response["files_to_edit"]:
+                    new_files_to_edit = []
+                    for edit in parsed_response["files_to_edit"]:
+                        try:
+                            edit_abs_path = normalize_path(edit["path"])
+                            # If we have the file in context or can read it now
+                            if edit_abs_path in valid_files or ensure_file_in_context(edit_abs_path):
+                                edit["path"] = edit_abs_path  # Use normalized path
+                                new_files_to_edit.append(edit)
+                        except (OSError, ValueError):
+                            console.print(f"[yellow]⚠[/yellow] Skipping invalid path: '{edit['path']}'", style="yellow")
+                            continue
+                    parsed_response["files_to_edit"] = new_files_to_edit
+
+                response_obj = AssistantResponse(**parsed_response)
+
+                # Save the assistant's textual reply to conversation
+                conversation_history.append({
+                    "role": "assistant",
+                    "content": response_obj.assistant_reply
+                })
 
-            return response_obj
+                return response_obj
 
-        except json.JSONDecodeError:
-            error_msg = "Failed to parse JSON response from assistant"
-            console.print(f"[red]✗[/red] {error_msg}", style="red")
-            return AssistantResponse(
-                assistant_reply=error_msg,
-                files_to_create=[]
-            )
+            except json.JSONDecodeError:
+                error_msg = "Failed to parse JSON response from assistant"
+                console.print(f"[red]✗[/red] {error_msg}", style="red")
+                return AssistantResponse(
+                    assistant_reply=error_msg,
+                    files_to_create=[]
+                )
 
     except Exception as e:
+        span.finish("error", e)
         error_msg = f"DeepSeek API error: {str(e)}"
         console.print(f"\n[red]✗[/red] {error_msg}", style="red")
         return AssistantResponse(
             assistant_reply=error_msg,
             files_to_create=[]
         )
+    finally:
+        span.finish()
 
 # --------------------------------------------------------------------------------
 # 7. Main interactive loop
 # --------------------------------------------------------------------------------
 
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="DeepSeek Engineer interactive session")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="SESSION_ID",
+                        help="continue a saved session (the latest one if no id is given)")
+    parser.add_argument("--no-save", dest="save", action="store_false",
+                        help="do not save this session")
+    return parser.parse_args(argv)
+
 def main():
+    global session_journal
+    args = parse_args()
+    from rich.panel import Panel
     console.print(Panel.fit(
         "[bold blue]Welcome to Deep Seek Engineer with Structured Output[/bold blue] [green](and streaming)[/green]!🐋",
         border_style="blue"
     ))
+    # Warnings only by default; ONHAX_LOG_LEVEL=INFO adds the per-request records
+    setup_logging(os.getenv("ONHAX_LOG_LEVEL") or "WARNING")
+    workspace.start()
+    if retrieval_enabled(wait=False):
+        start_chunk_index()
+    preload_modules()
+    if args.resume:
+        try:
+            session_journal = resume_session(args.resume)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]✗[/red] Could not resume session '{args.resume}': {e}", style="red")
+            sys.exit(1)
+        console.print(
+            f"[green]✓[/green] Resumed session [cyan]{session_journal.session_id}[/cyan]"
+            f" ({len(conversation_history) - 1} messages, {len(file_registry)} files).\n"
+        )
+        if not args.save:
+            session_journal.close()
+            session_journal = None
+    elif args.save:
+        session_journal = session_store.create()
+    if session_journal is not None:
+        prune_sessions()
     console.print(
-        "To include a file in the conversation, use '[bold magenta]/add path/to/file[/bold magenta]'.\n"
+        "To include a file in the conversation, use '[bold magenta]/add path/to/file[/bold magenta]'"
+        " or a glob such as '[bold magenta]/add src/**/*.py[/bold magenta]'.\n"
+        "Type '[bold magenta]/stats[/bold magenta]' for request latency and token statistics.\n"
         "Type '[bold red]exit[/bold red]' or '[bold red]quit[/bold red]' to end.\n"
     )
 
     while True:
+        save_session()
         try:
             user_input = console.input("[bold green]You>[/bold green] ").strip()
         except (EOFError, KeyboardInterrupt):
@@ -325,26 +759,52 @@ def main():
         if try_handle_add_command(user_input):
             continue
 
+        if try_handle_stats_command(user_input):
+            continue
+
+        # Files are created and edits previewed as soon as each entry has streamed
+        streamed = {"files_to_create": 0, "files_to_edit": 0}
+
+        from onhax.schema import FileToCreate, FileToEdit, ValidationError
+
+        def handle_entry(kind: str, entry: Dict[str, Any]) -> None:
+            try:
+                if kind == "files_to_create":
+                    file_info = FileToCreate(**entry)
+                    console.print()
+                    create_file(file_info.path, file_info.content)
+                else:
+                    edit_info = FileToEdit(**entry)
+                    console.print()
+                    show_diff_table([edit_info])
+            except ValidationError:
+                return
+            streamed[kind] += 1
+
         # Get streaming response from OpenAI (DeepSeek)
-        response_data = stream_openai_response(user_input)
+        response_data = stream_openai_response(user_input, on_entry=handle_entry)
 
-        # Create any files if requested
+        # Create any files that were not already created while streaming
         if response_data.files_to_create:
-            for file_info in response_data.files_to_create:
+            for file_info in response_data.files_to_create[streamed["files_to_create"]:]:
                 create_file(file_info.path, file_info.content)
 
         # Show and confirm diff edits if requested
         if response_data.files_to_edit:
-            show_diff_table(response_data.files_to_edit)
+            if streamed["files_to_edit"] != len(response_data.files_to_edit):
+                show_diff_table(response_data.files_to_edit)
             confirm = console.input(
                 "\nDo you want to apply these changes? ([green]y[/green]/[red]n[/red]): "
             ).strip().lower()
             if confirm == 'y':
-                for edit_info in response_data.files_to_edit:
-                    apply_diff_edit(edit_info.path, edit_info.original_snippet, edit_info.new_snippet)
+                apply_diff_edits(response_data.files_to_edit)
             else:
                 console.print("[yellow]ℹ[/yellow] Skipped applying diff edits.", style="yellow")
 
+    save_session()
+    if session_journal is not None:
+        session_journal.close()
+        console.print(f"[dim]Resume with: python3 main.py --resume {session_journal.session_id}[/dim]")
     console.print("[blue]Session finished.[/blue]")
 
 if __name__ == "__main__":
@@ -1,24 +1,63 @@
 """Entry point for onhax project."""
+import argparse
+import os
 import sys
-from .app import OnHaxApp
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m onhax",
+        usage="python -m onhax <prompt> <output_file>\n"
+              "       python -m onhax --batch prompts.jsonl [--concurrency N] [--manifest PATH]",
+    )
+    parser.add_argument("prompt", nargs="?", help="description of the code to generate")
+    parser.add_argument("output_file", nargs="?", help="file to save the generated code to")
+    parser.add_argument("--batch", metavar="PROMPTS_JSONL",
+                        help="generate every {\"prompt\", \"output\"} record of a JSONL file")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="requests in flight in batch mode (default: 8)")
+    parser.add_argument("--manifest", help="results manifest (default: <batch>.manifest.jsonl)")
+    parser.add_argument("--timeout", type=float, default=None, help="per-request deadline in seconds")
+    parser.add_argument("--no-stream", dest="stream", action="store_false",
+                        help="wait for the whole response instead of streaming it to the file "
+                             "(implied when ONHAX_CACHE_DIR is set)")
+    args = parser.parse_args(argv)
+    if not args.batch and not (args.prompt and args.output_file):
+        parser.print_usage(sys.stderr)
+        sys.exit(1)
+    return args
 
 def main():
     """Main entry point for the application."""
-    if len(sys.argv) < 3:
-        print("Usage: python -m onhax <prompt> <output_file>")
-        sys.exit(1)
-    
-    prompt = sys.argv[1]
-    output_file = sys.argv[2]
-    
+    args = parse_args()
+    # Imported after parsing so that usage errors and --help stay fast
+    from .app import OnHaxApp
+    from .logging import setup_logging
+
+    # Only warnings by default: request records would mix with the output
+    setup_logging(os.getenv("ONHAX_LOG_LEVEL") or "WARNING")
+
     try:
         app = OnHaxApp()
-        code = app.generate_code(prompt)
-        app.save_generated_code(code, output_file)
-        print(f"Generated code saved to {output_file}")
+        if args.batch:
+            from .batch import run_batch
+            summary = run_batch(app, args.batch, args.manifest, args.concurrency, args.timeout)
+            print(f"Batch finished: {summary.succeeded} succeeded, "
+                  f"{summary.failed} failed, {summary.skipped} skipped")
+            if summary.failed:
+                sys.exit(1)
+            return
+        # Streams bypass the response cache, so a configured cache means no streaming
+        if args.stream and app.cache is None:
+            chunks = app.generate_code_stream(args.prompt, timeout=args.timeout)
+            app.save_generated_code_stream(chunks, args.output_file)
+        else:
+            code = app.generate_code(args.prompt, timeout=args.timeout)
+            app.save_generated_code(code, args.output_file)
+        print(f"Generated code saved to {args.output_file}")
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,19 @@
 """Main application module for onhax project."""
-from typing import Optional
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
+from .cache import ResponseCache
 from .config import Config
-from .client import DeepSeekClient
+from .client import AsyncDeepSeekClient, DeepSeekClient
+from .retry import Deadline
+from .telemetry import Telemetry
+
+def extract_content(response: Dict[str, Any]) -> str:
+    """Return the generated text from a chat completion response."""
+    return response.get("choices", [{}])[0].get("message", {}).get("content", "")
 
 class OnHaxApp:
     """Main application class for onhax project."""
@@ -10,21 +21,81 @@ class OnHaxApp:
     def __init__(self):
         """Initialize the OnHax application."""
         self.config = Config()
-        self.client = DeepSeekClient(self.config)
+        self.cache: Optional[ResponseCache] = None
+        if self.config.cache_dir:
+            self.cache = ResponseCache(
+                self.config.cache_dir,
+                max_disk_bytes=self.config.cache_max_bytes,
+                ttl=self.config.cache_ttl,
+            )
+        self.telemetry = Telemetry(export_path=self.config.metrics_file or None)
+        self.client = DeepSeekClient(self.config, cache=self.cache, telemetry=self.telemetry)
     
-    def generate_code(self, prompt: str) -> str:
+    def generate_code(
+        self, prompt: str, use_cache: bool = True, timeout: Optional[float] = None
+    ) -> str:
         """Generate code based on the given prompt.
         
         Args:
             prompt: The prompt describing the code to generate
+            use_cache: Set to False to bypass the response cache
+            timeout: Overall deadline in seconds, shared by all retries
+                and hedged requests; defaults to the configured timeout
             
         Returns:
             The generated code as a string
         """
-        response = self.client.query(prompt)
-        # Extract the actual code from the response
-        # This might need adjustment based on the actual API response structure
-        return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        deadline = Deadline(timeout if timeout is not None else self.config.timeout)
+        response = self.client.query(prompt, use_cache=use_cache, deadline=deadline)
+        return extract_content(response)
+
+    def generate_code_stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Generate code based on the given prompt, yielding it as it arrives.
+
+        Args:
+            prompt: The prompt describing the code to generate
+            timeout: Optional deadline in seconds for establishing the stream
+
+        Yields:
+            Pieces of the generated code
+        """
+        return self.client.stream(prompt, timeout=timeout)
+
+    def generate_many(
+        self,
+        prompts: List[str],
+        concurrency: int = 8,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+    ) -> List[str]:
+        """Generate code for several prompts concurrently.
+
+        Args:
+            prompts: The prompts describing the code to generate
+            concurrency: Maximum number of requests in flight
+            timeout: Optional per-request deadline in seconds
+            use_cache: Set to False to bypass the response cache
+
+        Returns:
+            The generated code for each prompt, in prompt order
+        """
+        return asyncio.run(self.agenerate_many(prompts, concurrency, timeout, use_cache))
+
+    async def agenerate_many(
+        self,
+        prompts: List[str],
+        concurrency: int = 8,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+    ) -> List[str]:
+        """Async variant of generate_many for use inside an event loop."""
+        async with AsyncDeepSeekClient(
+            self.config, max_connections=concurrency, cache=self.cache, telemetry=self.telemetry
+        ) as client:
+            responses = await asyncio.gather(
+                *(client.query(prompt, timeout, use_cache) for prompt in prompts)
+            )
+        return [extract_content(response) for response in responses]
     
     def save_generated_code(self, code: str, filename: str) -> None:
         """Save generated code to a file.
@@ -34,4 +105,40 @@ class OnHaxApp:
             filename: The name of the file to save the code to
         """
         with open(filename, 'w') as f:
-            f.write(code)
\ No newline at end of file
+            f.write(code)
+
+    def save_generated_code_stream(self, chunks: Iterable[str], filename: str) -> int:
+        """Save streamed code to a file as it arrives.
+
+        Chunks are written to a temporary file next to ``filename``, which
+        is renamed over it only once the stream has completed, so readers
+        never see a partial file and a failed stream leaves any existing
+        file untouched. An existing file keeps its permission bits; a new
+        one gets the usual umask-based mode.
+
+        Args:
+            chunks: Pieces of generated code
+            filename: The name of the file to save the code to
+
+        Returns:
+            The number of characters written
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".onhax-", suffix=".tmp")
+        written = 0
+        try:
+            with os.fdopen(fd, 'w') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmp_path)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, filename)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return written
@@ -0,0 +1,161 @@
+"""Batch generation driven by JSONL prompt files."""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Set
+
+from .app import OnHaxApp, extract_content
+from .client import AsyncDeepSeekClient
+from .edits import write_atomic
+from .session import terminate_last_line
+
+class BatchSummary(NamedTuple):
+    """Counts of what a batch run did."""
+
+    succeeded: int
+    failed: int
+    skipped: int
+
+def record_id(record: Dict[str, Any]) -> str:
+    """Return the identifier of a batch record.
+
+    Records may carry an explicit ``id``; otherwise the output path, which
+    has to be unique within a batch anyway, identifies them.
+    """
+    return str(record.get("id") or record["output"])
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield batch records from a JSONL file one line at a time.
+
+    Each record needs a ``prompt`` and an ``output`` path. Blank lines are
+    skipped.
+
+    Raises:
+        ValueError: If a line is not a valid record
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}") from e
+            if not isinstance(record, dict) or "prompt" not in record or "output" not in record:
+                raise ValueError(f"{path}:{line_number}: record needs 'prompt' and 'output'")
+            yield record
+
+def completed_ids(manifest_path: str) -> Set[str]:
+    """Return the ids whose latest manifest entry succeeded.
+
+    A partially written last line from a crashed run is ignored.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("status") == "ok":
+                done.add(entry["id"])
+            else:
+                done.discard(entry.get("id"))
+    return done
+
+def write_output(path: str, content: str) -> None:
+    """Write generated code atomically, creating its directory if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    write_atomic(path, content)
+
+async def run_batch_async(
+    app: OnHaxApp,
+    path: str,
+    manifest_path: Optional[str] = None,
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+) -> BatchSummary:
+    """Generate code for every record of a JSONL file.
+
+    Records are read lazily and at most ``concurrency`` requests are in
+    flight. Each result is written to its output file as soon as it
+    arrives and recorded in the manifest (status, latency, token counts).
+    Records already marked successful in the manifest are skipped, so a
+    crashed run can simply be restarted.
+
+    Args:
+        app: Application providing the configuration and response cache
+        path: JSONL file of prompt records
+        manifest_path: Results manifest, defaults to ``<path>.manifest.jsonl``
+        concurrency: Maximum number of requests in flight
+        timeout: Optional per-request deadline in seconds
+
+    Returns:
+        Counts of succeeded, failed and skipped records
+    """
+    manifest_path = manifest_path or f"{path}.manifest.jsonl"
+    done = completed_ids(manifest_path)
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    loop = asyncio.get_running_loop()
+
+    terminate_last_line(manifest_path)
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+
+        def record_result(entry: Dict[str, Any]) -> None:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+
+        async def worker(client: AsyncDeepSeekClient) -> None:
+            while True:
+                record = await queue.get()
+                if record is None:
+                    return
+                entry: Dict[str, Any] = {"id": record_id(record), "output": record["output"]}
+                started = time.monotonic()
+                try:
+                    response = await client.query(record["prompt"], timeout)
+                    await loop.run_in_executor(
+                        None, write_output, record["output"], extract_content(response)
+                    )
+                    usage = response.get("usage", {})
+                    entry.update(
+                        status="ok",
+                        prompt_tokens=usage.get("prompt_tokens"),
+                        completion_tokens=usage.get("completion_tokens"),
+                    )
+                except Exception as e:
+                    entry.update(status="error", error=str(e) or type(e).__name__)
+                entry["latency"] = round(time.monotonic() - started, 3)
+                record_result(entry)
+                counts[entry["status"]] += 1
+
+        async with AsyncDeepSeekClient(
+            app.config, max_connections=concurrency, cache=app.cache, telemetry=app.telemetry
+        ) as client:
+            workers = [asyncio.ensure_future(worker(client)) for _ in range(concurrency)]
+            try:
+                for record in read_records(path):
+                    if record_id(record) in done:
+                        counts["skipped"] += 1
+                        continue
+                    await queue.put(record)
+            finally:
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+
+    return BatchSummary(counts["ok"], counts["error"], counts["skipped"])
+
+def run_batch(
+    app: OnHaxApp,
+    path: str,
+    manifest_path: Optional[str] = None,
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+) -> BatchSummary:
+    """Synchronous wrapper around run_batch_async."""
+    return asyncio.run(run_batch_async(app, path, manifest_path, concurrency, timeout))
@@ -0,0 +1,199 @@
+"""Persistent response cache for DeepSeek API calls."""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+class ResponseCache:
+    """Two-tier cache of API responses keyed by the canonical request body.
+
+    A bounded in-memory LRU sits in front of an on-disk store holding one
+    JSON file per entry. Disk writes go through a temporary file and an
+    atomic rename, and readers treat missing or unreadable entries as
+    misses, so several processes can share the same directory. Entries
+    expire after ``ttl`` seconds; when the store grows beyond
+    ``max_disk_bytes`` the least recently used files are removed.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_memory_entries: int = 256,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 7 * 24 * 3600,
+    ):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory holding the on-disk store
+            max_memory_entries: Number of entries kept in memory
+            max_disk_bytes: Size the on-disk store is trimmed to
+            ttl: Seconds after which an entry is no longer served
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any], endpoint: str = "") -> str:
+        """Return the cache key for a request body.
+
+        The key covers the endpoint and everything sent to it (model,
+        messages and any sampling parameters), serialized with sorted keys
+        so that equal requests always hash the same.
+
+        Args:
+            payload: The JSON request body
+            endpoint: URL the request is sent to, so that different APIs
+                sharing a cache directory don't answer for each other
+        """
+        canonical = json.dumps([endpoint, payload], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @property
+    def hits(self) -> int:
+        """Total number of lookups served from either tier."""
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit and miss counters."""
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, created: float, value: Dict[str, Any]) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a key, or None on a miss.
+
+        The caller gets its own copy, which it is free to modify.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return copy.deepcopy(entry[1])
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            created = float(record["created"])
+            value = record["response"]
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if now - created >= self.ttl:
+            self._unlink(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # recency for disk eviction
+        except OSError:
+            pass
+        with self._lock:
+            self._remember(key, created, copy.deepcopy(value))
+            self.disk_hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response in both tiers."""
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, copy.deepcopy(value))
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"created": created, "response": value}).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            self._unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._scan():
+                self._unlink(path)
+            self._disk_bytes = 0
+
+    def _scan(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self) -> None:
+        # Trim to 90% of the limit so eviction does not run on every write
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            self._unlink(path)
+            total -= size
+        self._disk_bytes = total
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
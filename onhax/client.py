@@ -1,43 +1,546 @@
 """Client module for interacting with DeepSeek API."""
-from typing import Any, Dict, Optional
+import asyncio
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
 import requests
+from requests.adapters import HTTPAdapter
 
+from .cache import ResponseCache
 from .config import Config
+from .logging import get_logger
+from .retry import Deadline, HedgePolicy, RetryPolicy
+from .telemetry import RequestSpan, Telemetry
+
+logger = get_logger(__name__)
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the data payloads of a server-sent event stream.
+
+    Multi-line ``data:`` fields are joined with newlines; comments and
+    other fields are ignored. The stream ends at a ``[DONE]`` payload.
+
+    Args:
+        lines: Decoded lines of the response body, without line endings
+
+    Raises:
+        requests.exceptions.ChunkedEncodingError: If the lines run out
+            before ``[DONE]``, i.e. the stream was cut short
+    """
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                payload = "\n".join(data)
+                data = []
+                if payload == "[DONE]":
+                    return
+                yield payload
+            continue
+        if line.startswith("data:"):
+            value = line[5:]
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        payload = "\n".join(data)
+        if payload == "[DONE]":
+            return
+        yield payload
+    raise requests.exceptions.ChunkedEncodingError("Stream ended without [DONE]")
 
 class DeepSeekClient:
-    """Client for interacting with DeepSeek API."""
-    
-    def __init__(self, config: Config):
+    """Client for interacting with DeepSeek API.
+
+    Every request runs against an overall deadline. Failed attempts that
+    are worth repeating (connection errors, timeouts, 429 and 5xx) are
+    retried with jittered backoff while time remains, and with a hedge
+    policy a duplicate request is sent when the first one is slower than
+    the configured latency percentile; whichever answers first wins.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        pool_size: int = 10,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        telemetry: Optional[Telemetry] = None,
+    ):
         """Initialize the DeepSeek client.
-        
+
         Args:
             config: Configuration instance with API credentials
+            pool_size: Maximum number of pooled keep-alive connections
+            cache: Optional response cache consulted before each request
+            retry: Retry policy, defaults to the configured number of attempts
+            hedge: Hedge policy, defaults to the configured percentile if any
+            telemetry: Optional collector of per-request latency and token metrics
         """
         self.config = config
+        self.cache = cache
+        self.telemetry = telemetry
         if not config.is_configured:
             raise ValueError("DeepSeek API key not configured")
-        
+
+        self.retry = retry or RetryPolicy(max_attempts=config.max_attempts)
+        if hedge is None and config.hedge_percentile > 0:
+            hedge = HedgePolicy(percentile=config.hedge_percentile)
+        self.hedge = hedge
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
         self.session = requests.Session()
         self.session.headers.update({
             "Authorization": f"Bearer {config.deepseek_api_key}",
             "Content-Type": "application/json"
         })
-        
-    def query(self, prompt: str) -> Dict[str, Any]:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def url(self) -> str:
+        """The chat completions endpoint."""
+        return f"{self.config.base_url}/v1/chat/completions"
+
+    def build_payload(self, prompt: str) -> Dict[str, Any]:
+        """Build the request body for a prompt.
+
+        Args:
+            prompt: The prompt to send to the API
+
+        Returns:
+            The JSON request body
+        """
+        return {
+            "model": self.config.model,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+
+    def start_span(self, payload: Dict[str, Any], source: str = "client") -> Optional[RequestSpan]:
+        """Start measuring a request, if telemetry is enabled."""
+        if self.telemetry is None:
+            return None
+        return self.telemetry.start(source, payload.get("model"))
+
+    def send(
+        self, payload: Dict[str, Any], timeout: float, span: Optional[RequestSpan] = None
+    ) -> Dict[str, Any]:
+        """Make a single request attempt, recording its latency.
+
+        Args:
+            payload: The JSON request body
+            timeout: Seconds to wait for the connection and for each read
+            span: Telemetry span of the request, if measured
+
+        Returns:
+            The API response as a dictionary
+        """
+        body = json.dumps(payload).encode("utf-8")
+        started = time.monotonic()
+        response = self.session.post(self.url, data=body, timeout=timeout)
+        response.raise_for_status()
+        if span is None:
+            result = response.json()
+        else:
+            span.record.request_bytes = len(body)
+            # The whole body has arrived: no time to first token to measure
+            span.response_done()
+            with span.postprocess():
+                result = response.json()
+        if self.hedge is not None:
+            self.hedge.latencies.record(time.monotonic() - started)
+        return result
+
+    def post(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """Send a request body to the chat completions endpoint.
+
+        Args:
+            payload: The JSON request body
+            timeout: Overall time budget in seconds for all attempts,
+                defaults to the configured timeout
+            use_cache: Set to False to bypass the response cache for this call
+            deadline: Deadline shared with the caller; takes precedence over timeout
+
+        Returns:
+            The API response as a dictionary
+
+        Raises:
+            requests.Timeout: If the deadline passes before an answer arrives
+        """
+        span = self.start_span(payload)
+        key = None
+        if self.cache is not None and use_cache:
+            key = self.cache.make_key(payload, self.url)
+            cached = self.cache_get(key)
+            if cached is not None:
+                if span is not None:
+                    span.finish("cached")
+                return cached
+
+        if deadline is None:
+            deadline = Deadline(timeout if timeout is not None else self.config.timeout)
+        attempt = 1
+        while True:
+            try:
+                result = self._attempt(payload, deadline, span)
+                break
+            except requests.RequestException as e:
+                if attempt >= self.retry.max_attempts or not self.retry.is_retryable(e):
+                    if span is not None:
+                        span.finish("error", e)
+                    raise
+                delay = self.retry.backoff(attempt)
+                if delay >= deadline.remaining():
+                    if span is not None:
+                        span.finish("error", e)
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+        if span is not None:
+            span.set_usage(result.get("usage"))
+            span.finish()
+        if key is not None:
+            self.cache_set(key, result)
+        return result
+
+    def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response, treating cache errors as a miss."""
+        try:
+            return self.cache.get(key)
+        except OSError as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+
+    def cache_set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a response; the cache is best-effort, so errors are only logged."""
+        try:
+            self.cache.set(key, result)
+        except OSError as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    def _attempt(
+        self, payload: Dict[str, Any], deadline: Deadline, span: Optional[RequestSpan] = None
+    ) -> Dict[str, Any]:
+        if deadline.expired:
+            raise requests.Timeout("Request deadline exceeded")
+        if self.hedge is None:
+            return self.send(payload, deadline.remaining(), span)
+
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(thread_name_prefix="deepseek-hedge")
+        executor = self._hedge_executor
+        primary = executor.submit(self.send, payload, deadline.remaining(), span)
+        done, _ = wait({primary}, timeout=min(self.hedge.delay(), deadline.remaining()))
+        futures: Set[Future] = {primary}
+        if not done and not deadline.expired:
+            futures.add(executor.submit(self.send, payload, deadline.remaining(), span))
+
+        error: Optional[BaseException] = None
+        while futures:
+            done, futures = wait(futures, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in futures:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        if error is not None and not futures:
+            raise error
+        raise requests.Timeout("Request deadline exceeded")
+
+    def query(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
         """Send a query to the DeepSeek API.
-        
+
         Args:
             prompt: The prompt to send to the API
-            
+            timeout: Optional overall time budget in seconds
+            use_cache: Set to False to bypass the response cache for this call
+            deadline: Optional deadline shared with the caller
+
         Returns:
             The API response as a dictionary
         """
-        response = self.session.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            json={
-                "model": "deepseek-chat",
-                "messages": [{"role": "user", "content": prompt}]
-            }
+        return self.post(self.build_payload(prompt), timeout, use_cache, deadline)
+
+    def stream(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[str]:
+        """Stream the generated text for a prompt as it is produced.
+
+        The response is read as server-sent events and only the text deltas
+        are yielded, so memory use does not grow with the output size.
+        Establishing the stream is retried like ``query``; once text has
+        been yielded, errors are raised to the caller. Streams bypass the
+        response cache and hedging. Token usage is requested in the final
+        event so that telemetry can count the completion tokens.
+
+        Args:
+            prompt: The prompt to send to the API
+            timeout: Optional overall time budget in seconds for connecting;
+                each read then waits at most the configured timeout
+            deadline: Optional deadline shared with the caller
+
+        Yields:
+            Pieces of the generated text
+        """
+        payload = self.build_payload(prompt)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        body = json.dumps(payload).encode("utf-8")
+        if deadline is None:
+            deadline = Deadline(timeout if timeout is not None else self.config.timeout)
+        span = self.start_span(payload, "stream")
+        if span is not None:
+            span.record.request_bytes = len(body)
+
+        try:
+            attempt = 1
+            while True:
+                try:
+                    if deadline.expired:
+                        raise requests.Timeout("Request deadline exceeded")
+                    response = self.session.post(
+                        self.url, data=body, stream=True,
+                        timeout=(deadline.remaining(), self.config.timeout)
+                    )
+                    response.raise_for_status()
+                    break
+                except requests.RequestException as e:
+                    if attempt >= self.retry.max_attempts or not self.retry.is_retryable(e):
+                        raise
+                    delay = self.retry.backoff(attempt)
+                    if delay >= deadline.remaining():
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+
+            with response:
+                response.encoding = "utf-8"
+                for data in iter_sse_data(response.iter_lines(decode_unicode=True)):
+                    event = json.loads(data)
+                    if span is not None and event.get("usage"):
+                        span.set_usage(event["usage"])
+                    for choice in event.get("choices", []):
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            if span is not None:
+                                span.first_token()
+                            yield content
+        except BaseException as e:
+            if span is not None:
+                # GeneratorExit: the caller stopped reading early
+                span.finish("error" if isinstance(e, Exception) else "cancelled", e)
+            raise
+        if span is not None:
+            span.finish()
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+class AsyncDeepSeekClient:
+    """asyncio client for the DeepSeek API.
+
+    Requests run on a bounded worker pool sharing one keep-alive
+    connection pool, so at most ``max_connections`` requests are in
+    flight and connections are reused between them. Retries and hedging
+    follow the same policies as ``DeepSeekClient``.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        max_connections: int = 10,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        telemetry: Optional[Telemetry] = None,
+    ):
+        """Initialize the async client.
+
+        Args:
+            config: Configuration instance with API credentials
+            max_connections: Maximum number of concurrent requests and pooled connections
+            cache: Optional response cache consulted before each request
+            retry: Retry policy, defaults to the configured number of attempts
+            hedge: Hedge policy, defaults to the configured percentile if any
+            telemetry: Optional collector of per-request latency and token metrics
+        """
+        self.config = config
+        self.max_connections = max_connections
+        self.client = DeepSeekClient(
+            config, pool_size=max_connections, cache=cache, retry=retry, hedge=hedge,
+            telemetry=telemetry,
         )
-        response.raise_for_status()
-        return response.json()
\ No newline at end of file
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="deepseek"
+        )
+
+    async def post(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """Send a request body without blocking the event loop.
+
+        Args:
+            payload: The JSON request body
+            timeout: Overall time budget in seconds for all attempts,
+                including time spent waiting for a free connection
+            use_cache: Set to False to bypass the response cache for this call
+            deadline: Deadline shared with the caller; takes precedence over timeout
+
+        Returns:
+            The API response as a dictionary
+
+        Raises:
+            asyncio.TimeoutError: If the deadline passes first
+        """
+        loop = asyncio.get_running_loop()
+        span = self.client.start_span(payload)
+        cache = self.client.cache if use_cache else None
+        key = None
+        if cache is not None:
+            key = cache.make_key(payload, self.client.url)
+            cached = await loop.run_in_executor(self._executor, self.client.cache_get, key)
+            if cached is not None:
+                if span is not None:
+                    span.finish("cached")
+                return cached
+
+        if deadline is None:
+            deadline = Deadline(timeout if timeout is not None else self.config.timeout)
+        retry = self.client.retry
+        attempt = 1
+        while True:
+            try:
+                result = await self._attempt(payload, deadline, span)
+                break
+            except (requests.RequestException, asyncio.TimeoutError) as e:
+                retryable = isinstance(e, asyncio.TimeoutError) or retry.is_retryable(e)
+                if attempt >= retry.max_attempts or not retryable:
+                    if span is not None:
+                        span.finish("error", e)
+                    raise
+                delay = retry.backoff(attempt)
+                if delay >= deadline.remaining():
+                    if span is not None:
+                        span.finish("error", e)
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        if span is not None:
+            span.set_usage(result.get("usage"))
+            span.finish()
+        if key is not None:
+            await loop.run_in_executor(self._executor, self.client.cache_set, key, result)
+        return result
+
+    async def _attempt(
+        self, payload: Dict[str, Any], deadline: Deadline, span: Optional[RequestSpan] = None
+    ) -> Dict[str, Any]:
+        if deadline.expired:
+            raise asyncio.TimeoutError()
+        loop = asyncio.get_running_loop()
+
+        def start() -> "asyncio.Future[Dict[str, Any]]":
+            return loop.run_in_executor(
+                self._executor, self.client.send, payload, deadline.remaining(), span
+            )
+
+        hedge = self.client.hedge
+        if hedge is None:
+            return await asyncio.wait_for(start(), deadline.remaining())
+
+        primary = start()
+        done, _ = await asyncio.wait({primary}, timeout=min(hedge.delay(), deadline.remaining()))
+        tasks = {primary}
+        if not done and not deadline.expired:
+            tasks.add(start())
+
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(
+                tasks, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    for other in tasks:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        for task in tasks:
+            task.cancel()
+        if error is not None and not tasks:
+            raise error
+        raise asyncio.TimeoutError()
+
+    async def query(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """Send a query to the DeepSeek API.
+
+        Args:
+            prompt: The prompt to send to the API
+            timeout: Optional overall time budget in seconds
+            use_cache: Set to False to bypass the response cache for this call
+            deadline: Optional deadline shared with the caller
+
+        Returns:
+            The API response as a dictionary
+        """
+        return await self.post(self.client.build_payload(prompt), timeout, use_cache, deadline)
+
+    def close(self) -> None:
+        """Stop the worker pool and close pooled connections.
+
+        Queued requests are cancelled. Requests already running on a worker
+        (including ones whose caller gave up after a timeout) are waited
+        for, so that the session is not closed under them; each is bounded
+        by the timeout it was sent with.
+        """
+        try:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        except TypeError:  # Python 3.8 has no cancel_futures
+            self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def aclose(self) -> None:
+        """Close the client without blocking the event loop while requests finish."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self) -> "AsyncDeepSeekClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
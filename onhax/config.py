@@ -8,8 +8,20 @@ class Config:
     def __init__(self):
         """Initialize configuration with environment variables."""
         self.deepseek_api_key: str = os.getenv('DEEPSEEK_API_KEY', '')
+        self.base_url: str = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com').rstrip('/')
+        self.model: str = os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
+        self.timeout: float = float(os.getenv('DEEPSEEK_TIMEOUT', '60'))
+        self.max_attempts: int = int(os.getenv('DEEPSEEK_MAX_ATTEMPTS', '3'))
+        # Hedging is off unless a latency percentile (0-1) is given
+        self.hedge_percentile: float = float(os.getenv('DEEPSEEK_HEDGE_PERCENTILE', '0'))
+        # Response caching is opt-in: set ONHAX_CACHE_DIR to enable it
+        self.cache_dir: str = os.getenv('ONHAX_CACHE_DIR', '')
+        self.cache_ttl: float = float(os.getenv('ONHAX_CACHE_TTL', str(7 * 24 * 3600)))
+        self.cache_max_bytes: int = int(os.getenv('ONHAX_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        # Request metrics are exported here when set (.prom for Prometheus, else JSON)
+        self.metrics_file: str = os.getenv('ONHAX_METRICS_FILE', '')
         
     @property
     def is_configured(self) -> bool:
         """Check if all required configuration is set."""
-        return bool(self.deepseek_api_key)
\ No newline at end of file
+        return bool(self.deepseek_api_key)
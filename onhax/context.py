@@ -0,0 +1,296 @@
+"""Token-budgeted context window management for chat conversations."""
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+Message = Dict[str, str]
+
+# The path runs to the closing "':" of the first line, so it may contain quotes
+FILE_MARKER_RE = re.compile(r"^Content of file '(?P<path>.+?)':$", re.MULTILINE)
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text.
+
+    Uses the common ~4 characters per token approximation, which is close
+    enough for budgeting without pulling in a tokenizer dependency.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        The estimated token count
+    """
+    return (len(text) + 3) // 4
+
+def file_snapshot_path(message: Message) -> Optional[str]:
+    """Return the file path a system message holds a snapshot of, if any.
+
+    Args:
+        message: A chat message dictionary
+
+    Returns:
+        The path from the "Content of file '...'" marker, or None
+    """
+    if message.get("role") != "system":
+        return None
+    match = FILE_MARKER_RE.match(message.get("content", ""))
+    return match.group("path") if match else None
+
+class ContextStats(NamedTuple):
+    """Summary of how a message list was fitted into the token budget."""
+
+    messages: int
+    tokens: int
+    original_tokens: int
+    dropped_snapshots: int
+    evicted: int
+    compacted: int
+
+    @property
+    def saved_tokens(self) -> int:
+        """Tokens removed from the prompt by trimming."""
+        return self.original_tokens - self.tokens
+
+class ContextWindow:
+    """Fit a conversation into a token budget before each request.
+
+    Superseded file snapshots are always dropped. When the remaining
+    messages still exceed the budget, the oldest turns are either evicted
+    outright or, with the ``compact`` policy, first shortened to a short
+    excerpt and only evicted if that is not enough.
+    """
+
+    POLICIES = ("evict", "compact")
+
+    def __init__(
+        self,
+        budget_tokens: int = 56000,
+        policy: str = "evict",
+        counter: Callable[[str], int] = estimate_tokens,
+        compact_chars: int = 400,
+        message_overhead: int = 4,
+        low_watermark: float = 1.0,
+    ):
+        """Initialize the context window.
+
+        Args:
+            budget_tokens: Maximum number of prompt tokens to send
+            policy: Either "evict" or "compact"
+            counter: Function returning the token count of a string
+            compact_chars: Characters kept from a turn when compacting it
+            message_overhead: Tokens charged per message for role/framing
+            low_watermark: Once over budget, trim down to this fraction of
+                it, so that the following requests can grow for a while
+                without trimming again (and keep sharing a prefix)
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown context policy: {policy!r}")
+        if budget_tokens <= 0:
+            raise ValueError("Context budget must be positive")
+        if not 0 < low_watermark <= 1:
+            raise ValueError("Low watermark must be in (0, 1]")
+        self.budget_tokens = budget_tokens
+        self.policy = policy
+        self.counter = counter
+        self.compact_chars = compact_chars
+        self.message_overhead = message_overhead
+        self.low_watermark = low_watermark
+
+    def count_message(self, message: Message) -> int:
+        """Return the token cost of a single message."""
+        return self.counter(message.get("content", "")) + self.message_overhead
+
+    def count(self, messages: List[Message]) -> int:
+        """Return the total token cost of a list of messages."""
+        return sum(self.count_message(msg) for msg in messages)
+
+    def prepare(self, messages: List[Message], reserve_tokens: int = 0) -> Tuple[List[Message], ContextStats]:
+        """Return a copy of messages trimmed to fit the token budget.
+
+        Leading system messages (the system prompt) and the final message
+        (the pending user turn) are never removed.
+
+        Args:
+            messages: The full conversation history
+            reserve_tokens: Part of the budget kept free for content added
+                after trimming, such as retrieved excerpts
+
+        Returns:
+            A tuple of the trimmed message list and statistics about it
+        """
+        original_tokens = self.count(messages)
+
+        pinned = 0
+        while (
+            pinned < len(messages)
+            and messages[pinned].get("role") == "system"
+            and file_snapshot_path(messages[pinned]) is None
+        ):
+            pinned += 1
+
+        # Keep only the latest snapshot of each file
+        seen_paths = set()
+        kept: List[Message] = []
+        dropped = 0
+        for msg in reversed(messages[pinned:]):
+            path = file_snapshot_path(msg)
+            if path is not None:
+                if path in seen_paths:
+                    dropped += 1
+                    continue
+                seen_paths.add(path)
+            kept.append(msg)
+        kept.reverse()
+
+        head = list(messages[:pinned])
+        tail = kept[-1:]
+        body = kept[:-1]
+        costs = [self.count_message(msg) for msg in body]
+        total = self.count(head) + self.count(tail) + sum(costs)
+        budget = max(0, self.budget_tokens - reserve_tokens)
+        target = budget
+        if total > budget:
+            target = int(budget * self.low_watermark)
+
+        compacted = 0
+        if total > target and self.policy == "compact":
+            for i, msg in enumerate(body):
+                if total <= target:
+                    break
+                if file_snapshot_path(msg) is not None:
+                    continue
+                content = msg.get("content", "")
+                if len(content) <= self.compact_chars:
+                    continue
+                short = dict(msg)
+                short["content"] = (
+                    f"{content[:self.compact_chars]}\n"
+                    f"[... {len(content) - self.compact_chars} characters compacted ...]"
+                )
+                new_cost = self.count_message(short)
+                total -= costs[i] - new_cost
+                body[i], costs[i] = short, new_cost
+                compacted += 1
+
+        evicted = 0
+        if total > target:
+            # Evict conversation turns first, oldest first; file snapshots
+            # only go once there are no turns left to drop.
+            order = [i for i, msg in enumerate(body) if file_snapshot_path(msg) is None]
+            order += [i for i, msg in enumerate(body) if file_snapshot_path(msg) is not None]
+            removed = set()
+            for i in order:
+                if total <= target:
+                    break
+                removed.add(i)
+                total -= costs[i]
+                evicted += 1
+            body = [msg for i, msg in enumerate(body) if i not in removed]
+
+        result = head + body + tail
+        stats = ContextStats(
+            messages=len(result),
+            tokens=total,
+            original_tokens=original_tokens,
+            dropped_snapshots=dropped,
+            evicted=evicted,
+            compacted=compacted,
+        )
+        return result, stats
+
+class PrefixAssembler:
+    """Lay out request messages so that consecutive requests share a prefix.
+
+    Providers that cache prompts by prefix (DeepSeek's context caching)
+    only reuse work up to the first message that differs from an earlier
+    request. Messages already sent therefore keep their relative order,
+    and new turns and new or changed file snapshots are appended after
+    them, just before the pending user message. Only removing a message
+    (an evicted turn, or a snapshot replaced by a newer version)
+    shortens the shared prefix.
+
+    Messages are tracked by identity, so callers must pass the same dict
+    objects for unchanged messages on every call.
+    """
+
+    def __init__(self):
+        """Initialize the assembler with no previous request."""
+        self._sent: List[Message] = []
+
+    def assemble(
+        self, pinned: List[Message], snapshots: List[Message], turns: List[Message]
+    ) -> List[Message]:
+        """Return the messages for the next request.
+
+        Args:
+            pinned: Leading messages such as the system prompt
+            snapshots: Current file snapshot messages
+            turns: Conversation turns, ending with the pending user message
+
+        Returns:
+            The previously sent messages that are still current, followed by
+            the new turns, the new snapshots and the pending message
+        """
+        pending = turns[-1:]
+        earlier = turns[:-1]
+        current = {id(msg) for msg in pinned + snapshots + earlier}
+        kept = [msg for msg in self._sent if id(msg) in current]
+        placed = {id(msg) for msg in kept}
+        new = [msg for msg in pinned + earlier + snapshots if id(msg) not in placed]
+        return kept + new + pending
+
+    def record(self, messages: List[Message]) -> None:
+        """Remember the messages actually sent (after trimming)."""
+        self._sent = list(messages)
+
+    def shared_prefix(self, messages: List[Message]) -> int:
+        """Return how many leading messages match the last recorded request."""
+        count = 0
+        for previous, msg in zip(self._sent, messages):
+            if previous is not msg:
+                break
+            count += 1
+        return count
+
+class CacheUsage(NamedTuple):
+    """Prompt tokens served from and missing the provider's prefix cache."""
+
+    hit_tokens: int
+    miss_tokens: int
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Total prompt tokens."""
+        return self.hit_tokens + self.miss_tokens
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of prompt tokens that were cache hits."""
+        return self.hit_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+def cache_usage(usage: Any) -> Optional[CacheUsage]:
+    """Read prompt cache counters from a response's usage data.
+
+    Understands DeepSeek's ``prompt_cache_hit_tokens`` and
+    ``prompt_cache_miss_tokens`` as well as the OpenAI-style
+    ``prompt_tokens_details.cached_tokens``.
+
+    Args:
+        usage: The usage dictionary or object of a response
+
+    Returns:
+        The counters, or None if the usage does not report them
+    """
+    def field(obj: Any, name: str) -> Any:
+        if obj is None:
+            return None
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    hit = field(usage, "prompt_cache_hit_tokens")
+    miss = field(usage, "prompt_cache_miss_tokens")
+    if hit is not None or miss is not None:
+        return CacheUsage(hit or 0, miss or 0)
+    cached = field(field(usage, "prompt_tokens_details"), "cached_tokens")
+    prompt = field(usage, "prompt_tokens")
+    if cached is None or prompt is None:
+        return None
+    return CacheUsage(cached, prompt - cached)
@@ -0,0 +1,236 @@
+"""Snippet-based file editing applied in a single pass."""
+import bisect
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+Span = Tuple[int, int]
+
+class Edit(NamedTuple):
+    """Replace the first free occurrence of ``original`` with ``new``."""
+
+    original: str
+    new: str
+
+class EditFailure(NamedTuple):
+    """An edit that could not be applied."""
+
+    index: int
+    edit: Edit
+    reason: str
+
+class EditResult(NamedTuple):
+    """Outcome of applying a group of edits to one file."""
+
+    path: str
+    content: str
+    applied: int
+    failures: List[EditFailure]
+
+    @property
+    def changed(self) -> bool:
+        """Whether any edit was applied."""
+        return self.applied > 0
+
+def _split_indent(line: str) -> Tuple[str, str]:
+    body = line.lstrip(" \t")
+    return line[: len(line) - len(body)], body
+
+def _indent_shift(pairs: Iterable[Tuple[str, str]]) -> Optional[Tuple[str, str]]:
+    """Find the one prefix that turns every snippet indent into the file's.
+
+    Takes (snippet indent, file indent) pairs and returns a (removed, added)
+    prefix pair, at most one of them non-empty, or None when the lines do
+    not agree on a single shift (e.g. tabs in the snippet, spaces in the file).
+    """
+    shift = None
+    for snippet_indent, file_indent in pairs:
+        if shift is None:
+            if file_indent.endswith(snippet_indent):
+                shift = ("", file_indent[: len(file_indent) - len(snippet_indent)])
+            elif snippet_indent.endswith(file_indent):
+                shift = (snippet_indent[: len(snippet_indent) - len(file_indent)], "")
+            else:
+                return None
+        removed, added = shift
+        if not snippet_indent.startswith(removed):
+            return None
+        if added + snippet_indent[len(removed):] != file_indent:
+            return None
+    return shift or ("", "")
+
+def _reindent(text: str, shift: Tuple[str, str]) -> Optional[str]:
+    removed, added = shift
+    lines = []
+    for line in text.split("\n"):
+        indent, body = _split_indent(line)
+        if body:
+            if not indent.startswith(removed):
+                return None
+            line = added + line[len(removed):]
+        lines.append(line)
+    return "\n".join(lines)
+
+def _occurrences(
+    content: str, original: str, new: str, whitespace_tolerant: bool
+) -> Iterator[Tuple[Span, str]]:
+    start = content.find(original)
+    found = False
+    while start != -1:
+        found = True
+        yield (start, start + len(original)), new
+        start = content.find(original, start + 1)
+    if found or not whitespace_tolerant:
+        return
+
+    # Whole lines only: tokens must match line by line, and the indentation
+    # may differ only by one prefix shared by all lines, which is then
+    # applied to the replacement as well
+    wanted = original.split("\n")
+    keep_newline = len(wanted) > 1 and wanted[-1] == ""
+    if keep_newline:
+        wanted.pop()
+    wanted_tokens = [line.split() for line in wanted]
+    if not any(wanted_tokens):
+        return
+    lines = content.split("\n")
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+    count = len(wanted)
+    probe = wanted_tokens[0][0] if wanted_tokens[0] else ""
+    for first in range(len(lines) - count + 1):
+        if probe not in lines[first]:
+            continue  # cheap rejection before tokenizing
+        if any(lines[first + i].split() != wanted_tokens[i] for i in range(count)):
+            continue
+        shift = _indent_shift(
+            (_split_indent(wanted[i])[0], _split_indent(lines[first + i])[0])
+            for i in range(count)
+            if wanted_tokens[i]
+        )
+        if shift is None:
+            continue
+        replacement = _reindent(new, shift)
+        if replacement is None:
+            continue
+        last = first + count - 1
+        end = offsets[last] + len(lines[last])
+        if keep_newline and last < len(lines) - 1:
+            end += 1
+        yield (offsets[first], end), replacement
+
+def locate_edits(
+    content: str, edits: Sequence[Edit], whitespace_tolerant: bool = False
+) -> Tuple[List[Tuple[Span, int, str]], List[EditFailure]]:
+    """Find where each edit applies in the original content.
+
+    Every edit is matched against the unmodified content. An edit takes
+    the first occurrence of its snippet that does not overlap a span
+    already claimed by an earlier edit, so repeated identical snippets map
+    to successive occurrences. In whitespace-tolerant mode a snippet that
+    has no exact match may match whole lines that differ only in the
+    whitespace between tokens and in one indentation prefix common to all
+    of them; the replacement is re-indented by that prefix, and the edit
+    is refused when the indentation does not shift consistently.
+
+    Args:
+        content: The original file content
+        edits: The edits to place
+        whitespace_tolerant: Fall back to whitespace-insensitive matching
+
+    Returns:
+        The claimed spans with the index of their edit and the replacement
+        text, sorted by position, and the edits that could not be placed
+    """
+    starts: List[int] = []
+    claimed: List[Tuple[Span, int, str]] = []
+    failures: List[EditFailure] = []
+    for index, edit in enumerate(edits):
+        if not edit.original:
+            failures.append(EditFailure(index, edit, "empty snippet"))
+            continue
+        reason = "snippet not found"
+        matches = _occurrences(content, edit.original, edit.new, whitespace_tolerant)
+        for span, replacement in matches:
+            pos = bisect.bisect_right(starts, span[0])
+            overlaps_prev = pos > 0 and claimed[pos - 1][0][1] > span[0]
+            overlaps_next = pos < len(claimed) and claimed[pos][0][0] < span[1]
+            if overlaps_prev or overlaps_next:
+                reason = "overlaps another edit"
+                continue
+            starts.insert(pos, span[0])
+            claimed.insert(pos, (span, index, replacement))
+            break
+        else:
+            failures.append(EditFailure(index, edit, reason))
+    return claimed, failures
+
+def apply_edits(
+    content: str, edits: Sequence[Edit], whitespace_tolerant: bool = False
+) -> Tuple[str, int, List[EditFailure]]:
+    """Apply edits to a string in one pass over the original.
+
+    Returns:
+        The new content, the number of applied edits and the failures
+    """
+    claimed, failures = locate_edits(content, edits, whitespace_tolerant)
+    parts = []
+    pos = 0
+    for (start, end), _, replacement in claimed:
+        parts.append(content[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(content[pos:])
+    return "".join(parts), len(claimed), failures
+
+# Read once at import: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def write_atomic(path: str, content: str) -> None:
+    """Replace a file's content through a temporary file and a rename.
+
+    The file's permission bits are preserved; a new file gets the default
+    mode for the process umask rather than mkstemp's 0600.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".onhax-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def apply_file_edits(
+    path: str, edits: Sequence[Edit], whitespace_tolerant: bool = False
+) -> EditResult:
+    """Read a file once, apply all its edits and write it back once.
+
+    Nothing is written when no edit applies.
+
+    Raises:
+        OSError: If the file cannot be read or written
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        original = f.read()
+    content, applied, failures = apply_edits(original, edits, whitespace_tolerant)
+    if applied:
+        write_atomic(path, content)
+    return EditResult(path, content, applied, failures)
+
+def group_edits(edits: Iterable[Tuple[str, Edit]]) -> Dict[str, List[Edit]]:
+    """Group (path, edit) pairs by path, keeping first-seen order."""
+    grouped: Dict[str, List[Edit]] = OrderedDict()
+    for path, edit in edits:
+        grouped.setdefault(path, []).append(edit)
+    return grouped
@@ -0,0 +1,185 @@
+"""Size-aware ingestion of local files into the conversation context."""
+import mmap
+import os
+import threading
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+SNIFF_BYTES = 8192
+
+class IngestError(OSError):
+    """A file was not added to the context (binary, or over budget)."""
+
+class IngestResult(NamedTuple):
+    """What was taken from a file."""
+
+    path: str
+    content: str
+    size: int
+    truncated: bool
+
+    @property
+    def omitted(self) -> int:
+        """Approximate number of bytes left out of the excerpt."""
+        return max(0, self.size - len(self.content.encode("utf-8")))
+
+def is_binary(sample: bytes) -> bool:
+    """Guess whether a file is binary from its first bytes."""
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        return e.start < len(sample) - 3
+    return False
+
+def _head(data: bytes) -> str:
+    text = data.decode("utf-8", errors="ignore")
+    cut = text.rfind("\n")
+    return text[:cut + 1] if cut > 0 else text
+
+def _tail(data: bytes) -> str:
+    text = data.decode("utf-8", errors="ignore")
+    cut = text.find("\n")
+    return text[cut + 1:] if 0 <= cut < len(text) - 1 else text
+
+def excerpt(head: str, tail: str, omitted: int) -> str:
+    """Join the head and tail of a file around an omission marker."""
+    return f"{head}\n[... {omitted} bytes omitted ...]\n\n{tail}"
+
+class FileIngestor:
+    """Read files for the conversation within per-file and per-session byte budgets.
+
+    Files that fit are read whole. Larger files are memory-mapped and only
+    their head and tail are decoded, so memory use is bounded by the
+    budget rather than by the file size. Binary files are refused. The
+    session budget is the sum of what is currently held for every path;
+    re-reading a path replaces its previous share. Files may be ingested
+    from several threads: each one reserves its share of the budget
+    before it is read.
+    """
+
+    def __init__(
+        self,
+        max_file_bytes: int = 256 * 1024,
+        max_session_bytes: int = 2 * 1024 * 1024,
+        min_excerpt_bytes: int = 1024,
+        on_truncate: Optional[Callable[[IngestResult], None]] = None,
+    ):
+        """Initialize the ingestor.
+
+        Args:
+            max_file_bytes: Most bytes taken from any single file
+            max_session_bytes: Most bytes held across all files
+            min_excerpt_bytes: Smallest excerpt worth including; files that
+                would get less are refused
+            on_truncate: Called with the result whenever a file is shortened
+        """
+        self.max_file_bytes = max_file_bytes
+        self.max_session_bytes = max_session_bytes
+        self.min_excerpt_bytes = min_excerpt_bytes
+        self.on_truncate = on_truncate
+        self._usage: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def used_bytes(self) -> int:
+        """Bytes currently held across all files."""
+        return sum(self._usage.values())
+
+    def allowance(self, path: str) -> int:
+        """Bytes that may be taken from a path right now."""
+        others = self.used_bytes - self._usage.get(path, 0)
+        return min(self.max_file_bytes, self.max_session_bytes - others)
+
+    def ingest(self, path: str, content: Optional[str] = None) -> IngestResult:
+        """Take as much of a file as the budgets allow.
+
+        Args:
+            path: Path of the file
+            content: Text already in memory (e.g. just written); read from
+                disk if omitted
+
+        Returns:
+            The content to use and whether it was shortened
+
+        Raises:
+            IngestError: If the file is binary or the session budget is spent
+            OSError: If the file cannot be read
+        """
+        data = content.encode("utf-8") if content is not None else None
+        size = len(data) if data is not None else os.path.getsize(path)
+        with self._lock:
+            previous = self._usage.get(path)
+            allowance = self.allowance(path)
+            if size > allowance and allowance < self.min_excerpt_bytes:
+                raise self._budget_error(path, size)
+            self._usage[path] = min(size, allowance)
+        try:
+            if data is not None:
+                if size <= allowance:
+                    result = IngestResult(path, content, size, False)
+                else:
+                    result = self._excerpt(path, size, allowance, data)
+            else:
+                result = self._read(path, size, allowance)
+        except BaseException:
+            with self._lock:
+                if previous is None:
+                    self._usage.pop(path, None)
+                else:
+                    self._usage[path] = previous
+            raise
+
+        with self._lock:
+            self._usage[path] = len(result.content.encode("utf-8"))
+        if result.truncated and self.on_truncate is not None:
+            self.on_truncate(result)
+        return result
+
+    def read(self, path: str, content: Optional[str] = None) -> str:
+        """Return the content to keep for a path; see ``ingest``."""
+        return self.ingest(path, content).content
+
+    def charge(self, path: str, nbytes: int) -> None:
+        """Count content obtained elsewhere (e.g. a restored session) against the budget."""
+        with self._lock:
+            self._usage[path] = nbytes
+
+    def release(self, path: str) -> None:
+        """Stop counting a path against the session budget."""
+        with self._lock:
+            self._usage.pop(path, None)
+
+    def retain(self, paths: Iterable[str]) -> None:
+        """Stop counting every path not in ``paths``."""
+        keep = set(paths)
+        with self._lock:
+            for path in list(self._usage):
+                if path not in keep:
+                    del self._usage[path]
+
+    def _read(self, path: str, size: int, allowance: int) -> IngestResult:
+        with open(path, "rb") as f:
+            if is_binary(f.read(SNIFF_BYTES)):
+                raise IngestError(f"{path} looks like a binary file ({size} bytes); not added")
+            if size <= allowance:
+                f.seek(0)
+                text = f.read().decode("utf-8", errors="replace")
+                return IngestResult(path, text, size, False)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self._excerpt(path, size, allowance, mapped)
+
+    def _excerpt(self, path: str, size: int, allowance: int, data) -> IngestResult:
+        head_bytes = allowance // 2
+        tail_bytes = allowance - head_bytes
+        head = _head(data[:head_bytes])
+        tail = _tail(data[size - tail_bytes:])
+        omitted = size - len(head.encode("utf-8")) - len(tail.encode("utf-8"))
+        return IngestResult(path, excerpt(head, tail, omitted), size, True)
+
+    def _budget_error(self, path: str, size: int) -> IngestError:
+        return IngestError(
+            f"{path} ({size} bytes) not added: context budget of "
+            f"{self.max_session_bytes} bytes is used up ({self.used_bytes} bytes held)"
+        )
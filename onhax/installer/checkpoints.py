@@ -0,0 +1,124 @@
+"""
+Persistent journal of completed installation steps.
+
+Each completed step is recorded with a fingerprint of its inputs
+(requirement file hashes, config values, the repository commit, ...).
+On the next run, a step whose fingerprint is unchanged is skipped, so an
+installation that failed halfway resumes at the first stale or failed
+step instead of starting over.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are atomic but not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def fingerprint(*parts: Any) -> str:
+    """Return a stable hash of JSON-serializable values."""
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def file_digest(path: str) -> Optional[str]:
+    """Return the SHA-256 of a file's content, or None if it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+class Checkpoints:
+    """Completed steps and their fingerprints, saved to a JSON file.
+
+    One file can hold the journals of several installations; ``scope``
+    (normally the installation path) selects one of them.
+    """
+
+    def __init__(self, path: str, scope: str):
+        """Initialize the journal.
+
+        Args:
+            path: The JSON file, e.g. ~/.dify/checkpoints.json
+            scope: Key of this installation's entries in the file
+        """
+        self.path = path
+        self.scope = scope
+        self._lock = threading.Lock()
+        self.steps: Dict[str, Dict[str, Any]] = self._read().get(scope, {})
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint file {self.path}: {e}")
+            return {}
+
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold an exclusive lock shared by every process using the file."""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _save(self) -> None:
+        # Other installations may save their scopes at the same time
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._file_lock():
+            data = self._read()
+            data[self.scope] = self.steps
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoints-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    def is_fresh(self, name: str, value: str) -> bool:
+        """Whether ``name`` completed before with the fingerprint ``value``."""
+        with self._lock:
+            entry = self.steps.get(name)
+            return entry is not None and entry.get("fingerprint") == value
+
+    def record(self, name: str, value: str, seconds: float = 0.0) -> None:
+        """Record that ``name`` completed with the fingerprint ``value``."""
+        with self._lock:
+            self.steps[name] = {"fingerprint": value, "completed_at": time.time(), "seconds": round(seconds, 3)}
+            self._save()
+
+    def discard(self, *names: str) -> None:
+        """Forget the given steps, so that they run again."""
+        with self._lock:
+            removed = [name for name in names if self.steps.pop(name, None) is not None]
+            if removed:
+                self._save()
+
+    def clear(self) -> None:
+        """Forget every step of this installation."""
+        with self._lock:
+            self.steps = {}
+            self._save()
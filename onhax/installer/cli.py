@@ -6,8 +6,8 @@ import sys
 import logging
 from .setup import DifyInstaller
 from .integration import create_installer
+from ..logging import setup_logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def print_step(msg):
@@ -30,8 +30,16 @@ def cli():
 @cli.command()
 @click.option('--path', default=None, help='Installation path for Dify')
 @click.option('--web/--no-web', default=False, help='Start web interface for installation')
-def install(path, web):
-    """Install Dify with interactive progress tracking."""
+@click.option('--from-step', default=None, metavar='STEP',
+              help='Re-run this step and everything after it, even if up to date')
+@click.option('--force-step', multiple=True, metavar='STEP',
+              help='Re-run this step even if up to date (can be repeated)')
+def install(path, web, from_step, force_step):
+    """Install Dify with interactive progress tracking.
+
+    Steps that completed in an earlier run with the same inputs are
+    skipped, so a failed installation resumes where it stopped.
+    """
     if web:
         from .web import main as web_main
         web_main()
@@ -44,7 +52,7 @@ def install(path, web):
             print_step(f"{step}: {message}")
     dify_installer.set_progress_callback(progress_callback)
     try:
-        dify_installer.run_installation()
+        dify_installer.run_installation(from_step=from_step, force_steps=force_step)
         print_success("Dify installation completed successfully! 🎉")
         
         print_success("Dify installation completed successfully! 🎉")
@@ -72,6 +80,7 @@ def verify():
 
 def main():
     """Main entry point for the CLI."""
+    setup_logging()
     cli()
 
 if __name__ == '__main__':
@@ -7,6 +7,15 @@ from pathlib import Path
 
 DEFAULT_CONFIG = {
     "installation_path": "~/dify",
+    "max_parallel_steps": 4,
+    "cache_dir": "~/.cache/onhax/installer",
+    "repository": {
+        "url": "https://github.com/langgenius/dify.git",
+        "ref": None,
+        "depth": 1,
+        "filter": None,
+        "mirror_dir": None
+    },
     "backend": {
         "host": "localhost",
         "port": 5001,
@@ -27,12 +36,14 @@ DEFAULT_CONFIG = {
         "password": "password"
     },
     "redis": {
+        "image": "redis:6",
         "host": "localhost",
         "port": 6379
     },
     "docker": {
         "compose_file": "docker-compose.yml",
-        "network": "dify_network"
+        "network": "dify_network",
+        "max_parallel_pulls": 4
     }
 }
 
@@ -69,6 +80,20 @@ class Config:
         self.config.update(updates)
         self.save()
     
+    def images(self):
+        """Docker images the services run on.
+
+        ``docker.images`` in the config file replaces the default list,
+        which follows the database version and the Redis image.
+        """
+        images = self.config['docker'].get('images')
+        if images:
+            return list(images)
+        return [
+            f"postgres:{self.config['database']['version']}",
+            self.config['redis'].get('image', 'redis:6'),
+        ]
+
     def generate_env_file(self, path, type='backend'):
         """Generate environment file for backend or frontend."""
         env_vars = []
@@ -108,7 +133,7 @@ class Config:
                     'volumes': ['postgres_data:/var/lib/postgresql/data']
                 },
                 'redis': {
-                    'image': 'redis:6',
+                    'image': self.config['redis'].get('image', 'redis:6'),
                     'ports': [f"{self.config['redis']['port']}:6379"],
                     'volumes': ['redis_data:/data']
                 }
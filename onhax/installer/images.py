@@ -0,0 +1,187 @@
+"""
+Concurrent Docker image pulls with aggregated progress.
+
+Images are pulled in parallel through the Docker SDK's streaming pull
+API. The per-layer byte counts of all pulls are summed into a single
+progress figure. Images that are already present locally with the digest
+the registry (or the pinned reference) expects are not pulled again.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from docker.errors import NotFound
+
+logger = logging.getLogger(__name__)
+
+PULLED = "pulled"
+SKIPPED = "skipped"
+
+class PullStatus(NamedTuple):
+    """Progress of all pulls together."""
+
+    done_bytes: int
+    total_bytes: int
+    images_done: int
+    images_total: int
+
+    @property
+    def fraction(self):
+        if not self.images_total:
+            return 1.0
+        if self.images_done == self.images_total:
+            return 1.0
+        return self.done_bytes / self.total_bytes if self.total_bytes else 0.0
+
+ProgressCallback = Callable[[PullStatus], None]
+
+def split_reference(ref: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """Split an image reference into repository, tag and digest.
+
+    ``postgres:14`` -> ("postgres", "14", None);
+    ``postgres@sha256:...`` -> ("postgres", None, "sha256:...");
+    ``localhost:5000/app`` keeps the registry port in the repository.
+    """
+    name, _, digest = ref.partition("@")
+    repository, tag = name, None
+    colon = name.rfind(":")
+    if colon > name.rfind("/"):
+        repository, tag = name[:colon], name[colon + 1:]
+    return repository, tag, digest or None
+
+def local_digests(client, ref: str) -> Optional[List[str]]:
+    """Return the registry digests of a local image, or None if it is absent."""
+    try:
+        image = client.images.get(ref)
+    except NotFound:
+        return None
+    return [entry.partition("@")[2] for entry in image.attrs.get("RepoDigests") or []]
+
+def is_up_to_date(client, ref: str) -> bool:
+    """Whether ``ref`` is present locally with the expected digest.
+
+    A pinned reference (``name@sha256:...``) is compared locally. For a
+    tag the registry is asked for the digest it currently points to; if
+    the registry cannot be reached, a local copy is considered current.
+    """
+    digests = local_digests(client, ref)
+    if digests is None:
+        return False
+    _, _, pinned = split_reference(ref)
+    if pinned:
+        return pinned in digests
+    try:
+        remote = client.images.get_registry_data(ref).id
+    except Exception as e:
+        logger.warning(f"Could not check {ref} against the registry, using the local image: {e}")
+        return True
+    return remote in digests
+
+class ImagePuller:
+    """Pull a set of images concurrently, reporting combined progress."""
+
+    def __init__(self, client, max_workers: int = 4,
+                 on_progress: Optional[ProgressCallback] = None, interval: float = 0.2):
+        """Initialize the puller.
+
+        Args:
+            client: A docker.DockerClient, or anything with the same
+                ``images`` and ``api.pull`` interface
+            max_workers: Maximum number of pulls at once
+            on_progress: Called with a PullStatus as layers download, at
+                most every ``interval`` seconds and whenever an image
+                finishes. It is called from the pulling threads, one
+                call at a time.
+            interval: Minimum seconds between progress calls
+        """
+        self.client = client
+        self.max_workers = max(1, max_workers)
+        self.on_progress = on_progress
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._layers: Dict[Tuple[str, str], List[int]] = {}
+        self._images_done = 0
+        self._images_total = 0
+        self._last_report = 0.0
+
+    def pull(self, images: Iterable[str]) -> Dict[str, str]:
+        """Pull every image that is missing or out of date.
+
+        Args:
+            images: Image references, e.g. ``postgres:14``
+
+        Returns:
+            PULLED or SKIPPED for every image
+
+        Raises:
+            RuntimeError: If a pull failed; the other pulls are completed first
+        """
+        images = list(dict.fromkeys(images))
+        self._layers = {}
+        self._images_done = 0
+        self._images_total = len(images)
+        results: Dict[str, str] = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-pull") as executor:
+            futures = {ref: executor.submit(self._pull_one, ref) for ref in images}
+            for ref, future in futures.items():
+                try:
+                    results[ref] = future.result()
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+        return results
+
+    def _pull_one(self, ref: str) -> str:
+        if is_up_to_date(self.client, ref):
+            logger.info(f"Image {ref} is up to date")
+            self._finish_image()
+            return SKIPPED
+
+        repository, tag, digest = split_reference(ref)
+        started = time.monotonic()
+        events = self.client.api.pull(repository, tag=digest or tag or "latest", stream=True, decode=True)
+        for event in events:
+            if "error" in event:
+                raise RuntimeError(f"Failed to pull {ref}: {event['error']}")
+            self._update_layer(ref, event)
+        logger.info(f"Pulled {ref} in {time.monotonic() - started:.1f}s")
+        self._finish_image()
+        return PULLED
+
+    def _update_layer(self, ref: str, event: dict) -> None:
+        layer = event.get("id")
+        status = event.get("status", "")
+        detail = event.get("progressDetail") or {}
+        with self._lock:
+            if status == "Downloading" and detail.get("total"):
+                self._layers[(ref, layer)] = [detail.get("current", 0), detail["total"]]
+            elif status in ("Download complete", "Pull complete") and (ref, layer) in self._layers:
+                entry = self._layers[(ref, layer)]
+                entry[0] = entry[1]
+            else:
+                return
+            self._report()
+
+    def _finish_image(self) -> None:
+        with self._lock:
+            self._images_done += 1
+            self._report(force=True)
+
+    def _report(self, force: bool = False) -> None:
+        # Called with the lock held, so that reports arrive in order
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        self.on_progress(PullStatus(
+            sum(current for current, _ in self._layers.values()),
+            sum(total for _, total in self._layers.values()),
+            self._images_done,
+            self._images_total,
+        ))
@@ -2,20 +2,38 @@
 Integration module for Dify installer components.
 """
 import os
+import sys
+import shutil
 import logging
+import threading
+from functools import partial
 from .setup import DifyInstaller
 from .config import Config
+from .checkpoints import Checkpoints, file_digest
+from .pyenv import read_marker
+from .scheduler import CANCELLED, DONE, RUNNING, SKIPPED, Scheduler, Step, StepFailed, downstream
 
 logger = logging.getLogger(__name__)
 
 class InstallerIntegration:
-    def __init__(self, installation_path=None, config_path=None):
+    def __init__(self, installation_path=None, config_path=None, docker_client=None):
         """Initialize the installer integration."""
         self.config = Config(config_path)
         if installation_path:
             self.config.set('installation_path', installation_path)
-        self.installer = DifyInstaller(self.config.get('installation_path'))
+        self.installer = DifyInstaller(
+            os.path.expanduser(self.config.get('installation_path')), docker_client, self.config.get('repository'),
+        )
+        self.checkpoints = Checkpoints(
+            os.path.join(os.path.dirname(self.config.config_path), 'checkpoints.json'),
+            os.path.abspath(self.installer.installation_path),
+        )
         self.progress_callback = None
+        self.progress = 0
+        self._step_shares = {}
+        self._step_starts = {}
+        self._progress_lock = threading.Lock()
+        self.step_results = {}
 
     def set_progress_callback(self, callback):
         """Set callback for progress updates."""
@@ -23,66 +41,168 @@ class InstallerIntegration:
 
     def update_progress(self, step, progress, message):
         """Update installation progress."""
-        if self.progress_callback:
-            self.progress_callback(step, progress, message)
-        else:
-            logger.info(f"{step} ({progress}%): {message}")
+        with self._progress_lock:
+            if progress >= 0:
+                self.progress = progress
+            if self.progress_callback:
+                self.progress_callback(step, progress, message)
+            else:
+                logger.info(f"{step} ({progress}%): {message}")
 
-    def run_installation(self):
-        """Run the complete installation process."""
+    def build_steps(self):
+        """Return the installation steps and the steps each one needs first.
+
+        Steps with ``inputs`` are checkpointed: they are skipped when those
+        inputs, and the fingerprints of the steps they require, are the
+        same as when they last completed. Checks have no inputs and always
+        run.
+        """
+        installer = self.installer
+        path = installer.installation_path
+        images = self.config.images()
+        return [
+            Step('prerequisites', installer.check_prerequisites, (),
+                 "Checking prerequisites"),
+            Step('nodejs', installer.install_nodejs, ('prerequisites',),
+                 "Installing Node.js", weight=2,
+                 inputs=lambda: {'node': shutil.which('node'), 'npm': shutil.which('npm')}),
+            Step('docker', installer.setup_docker, ('prerequisites',),
+                 "Setting up Docker", weight=2,
+                 inputs=lambda: {'docker': shutil.which('docker')}),
+            Step('images', partial(installer.pull_images, images, self._on_pull_progress,
+                                   self.config.get('docker', {}).get('max_parallel_pulls', 4)),
+                 ('docker',),
+                 "Pulling images", weight=3,
+                 inputs=lambda: {'images': images}),
+            Step('clone', installer.clone_repository, ('prerequisites',),
+                 "Cloning Repository", weight=3,
+                 inputs=self._clone_inputs),
+            # The virtualenv lives inside the clone, and clone_repository
+            # skips an existing directory, so it has to wait for the clone
+            Step('python', partial(installer.setup_python_environment, self.config.get('cache_dir')), ('clone',),
+                 "Setting up Python", weight=3,
+                 inputs=lambda: {
+                     'python': sys.version,
+                     'requirements': file_digest(installer.requirements_file),
+                     'venv': read_marker(installer.venv_path),
+                 }),
+            Step('configure', self.configure_environment, ('clone',),
+                 "Configuring Environment",
+                 inputs=lambda: {key: self.config.get(key) for key in ('backend', 'frontend', 'database', 'redis', 'docker')}),
+            Step('compose', installer.check_compose_file, ('configure',),
+                 "Checking Docker Compose file"),
+            Step('backend', installer.setup_backend, ('python', 'configure'),
+                 "Setting up Backend", weight=4,
+                 # Everything it uses comes from the clone, python and configure steps
+                 inputs=lambda: {}),
+            Step('frontend', installer.setup_frontend, ('nodejs', 'configure'),
+                 "Setting up Frontend", weight=4,
+                 inputs=lambda: {
+                     'package': file_digest(os.path.join(path, 'web', 'package.json')),
+                     'package_lock': file_digest(os.path.join(path, 'web', 'package-lock.json')),
+                 }),
+            Step('verify', self.verify_installation, ('backend', 'frontend', 'images', 'compose'),
+                 "Verifying Installation"),
+        ]
+
+    def _clone_inputs(self):
+        sync = self.installer.repo_sync()
+        head = sync.head()
+        # Offline, the current checkout counts as up to date
+        return dict(self.installer.repository, path=sync.path, commit=head, target=sync.remote_commit() or head)
+
+    def configure_environment(self):
+        """Generate the environment files and the Docker Compose file."""
+        self.config.generate_env_file(
+            os.path.join(self.installer.installation_path, 'api', '.env'),
+            'backend'
+        )
+        self.config.generate_env_file(
+            os.path.join(self.installer.installation_path, 'web', '.env'),
+            'frontend'
+        )
+        self.config.generate_docker_compose(
+            os.path.join(self.installer.installation_path, 'docker-compose.yml')
+        )
+
+    def verify_installation(self):
+        """Check the installed services, raising if they are not working."""
+        if not self.installer.verify_installation():
+            raise Exception("Installation verification failed")
+
+    def _on_pull_progress(self, status):
+        # Move through the share of the progress bar that the step has
+        share = self._step_shares.get('images', 0)
+        progress = max(self.progress, int(self._step_starts.get('images', 0) + status.fraction * share))
+        megabytes = f"{status.done_bytes / 1e6:.1f}/{status.total_bytes / 1e6:.1f} MB"
+        self.update_progress("Pulling images", progress,
+                             f"{megabytes}, {status.images_done}/{status.images_total} images ready")
+
+    def _on_step_event(self, step, state, fraction):
+        # Keep 95-100% for the final "Complete" update, and never go back
+        progress = max(self.progress, int(fraction * 95))
+        if state == RUNNING:
+            self._step_starts[step.name] = progress
+            self.update_progress(step.label, progress, f"{step.label}...")
+        elif state == DONE:
+            self.update_progress(step.label, progress, f"{step.label} done")
+        elif state == SKIPPED:
+            self.update_progress(step.label, progress, f"{step.label}: already done, skipping")
+        elif state == CANCELLED:
+            logger.info(f"Skipped {step.label}")
+
+    def run_installation(self, from_step=None, force_steps=()):
+        """Run the complete installation process.
+
+        Independent steps run in parallel, up to the ``max_parallel_steps``
+        setting; each starts once the steps it needs are done. Steps that
+        completed in an earlier run with the same inputs are skipped.
+
+        Args:
+            from_step: Re-run this step and every step that depends on it
+            force_steps: Re-run these steps even if they are up to date
+
+        Raises:
+            ValueError: If ``from_step`` or ``force_steps`` names an unknown step
+        """
+        steps = self.build_steps()
+        force = set(force_steps)
+        if from_step:
+            force |= downstream(steps, from_step)
+        scheduler = Scheduler(
+            steps,
+            max_workers=self.config.get('max_parallel_steps', 4),
+            on_event=self._on_step_event,
+            checkpoints=self.checkpoints,
+            force=force,
+        )
+        total = sum(step.weight for step in steps)
+        self._step_shares = {step.name: step.weight / total * 95 for step in steps}
+        self._step_starts = {}
         try:
-            self.update_progress("Checking prerequisites", 5, "Checking system requirements...")
-            self.installer.check_prerequisites()
-            
-            self.update_progress("Installing Node.js", 15, "Installing Node.js...")
-            self.installer.install_nodejs()
-            
-            self.update_progress("Setting up Python", 30, "Configuring Python environment...")
-            self.installer.setup_python_environment()
-            
-            self.update_progress("Setting up Docker", 45, "Configuring Docker...")
-            self.installer.setup_docker()
-            
-            self.update_progress("Cloning Repository", 60, "Cloning Dify repository...")
-            self.installer.clone_repository()
-            
-            self.update_progress("Configuring Environment", 70, "Setting up environment files...")
-            # Generate configuration files
-            self.config.generate_env_file(
-                os.path.join(self.installer.installation_path, 'api', '.env'),
-                'backend'
-            )
-            self.config.generate_env_file(
-                os.path.join(self.installer.installation_path, 'web', '.env'),
-                'frontend'
-            )
-            self.config.generate_docker_compose(
-                os.path.join(self.installer.installation_path, 'docker-compose.yml')
-            )
-            
-            self.update_progress("Setting up Backend", 80, "Setting up Dify backend...")
-            self.installer.setup_backend()
-            
-            self.update_progress("Setting up Frontend", 90, "Setting up Dify frontend...")
-            self.installer.setup_frontend()
-            
-            self.update_progress("Verifying Installation", 95, "Performing final checks...")
-            if not self.installer.verify_installation():
-                raise Exception("Installation verification failed")
-                
+            self.step_results = scheduler.run()
+            timings = ", ".join(f"{name} {result.seconds:.1f}s" for name, result in self.step_results.items())
+            logger.info(f"Step timings: {timings}")
+
             self.update_progress("Complete", 100, "Installation completed successfully!")
             return True
             
         except Exception as e:
+            if isinstance(e, StepFailed):
+                self.step_results = e.results
             logger.error(f"Installation failed: {str(e)}")
             self.update_progress("Failed", -1, f"Error: {str(e)}")
             try:
+                venv_removed = self.installer.venv_created
                 self.installer.rollback()
+                if venv_removed:
+                    # Rebuild the deleted environment, and whatever used it, next time
+                    self.checkpoints.discard(*downstream(steps, 'python'))
                 self.update_progress("Rollback", -1, "Cleaned up failed installation")
             except Exception as rollback_error:
                 logger.error(f"Rollback failed: {rollback_error}")
             raise
 
-def create_installer(installation_path=None, config_path=None):
+def create_installer(installation_path=None, config_path=None, docker_client=None):
     """Create a new installer integration instance."""
-    return InstallerIntegration(installation_path, config_path)
\ No newline at end of file
+    return InstallerIntegration(installation_path, config_path, docker_client)
\ No newline at end of file
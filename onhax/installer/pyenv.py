@@ -0,0 +1,229 @@
+"""
+Reusable Python environments for the installer.
+
+A virtualenv is built once per combination of interpreter and
+requirements, keyed by a hash of both, and kept in a cache directory.
+Installing into a new location hardlinks the cached environment instead
+of creating it again. Only the few text files that contain the
+environment's own path (scripts, activate files, pyvenv.cfg) are copied
+and rewritten. Packages are installed from a shared wheel directory, so
+once the wheels are there, later builds need no network access.
+"""
+import hashlib
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+MARKER = ".onhax-env"
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "onhax", "installer")
+
+def venv_bin(venv_path: str, name: str) -> str:
+    """Return the path of an executable inside a virtualenv."""
+    return os.path.join(venv_path, "Scripts" if os.name == "nt" else "bin", name)
+
+def read_requirements(path: str, _seen: Optional[set] = None) -> List[str]:
+    """Return the requirement lines of a file, with ``-r`` includes expanded.
+
+    Comments, blank lines and surrounding whitespace are dropped, so that
+    only changes that matter to pip change the result.
+    """
+    path = os.path.abspath(path)
+    seen = _seen if _seen is not None else set()
+    if path in seen:
+        return []
+    seen.add(path)
+    lines = []
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            line = raw.split(" #", 1)[0].strip()
+            if not line or line.startswith("#"):
+                continue
+            for option in ("-r ", "--requirement ", "--requirement="):
+                if line.startswith(option):
+                    included = line[len(option):].strip()
+                    lines.extend(read_requirements(os.path.join(os.path.dirname(path), included), seen))
+                    break
+            else:
+                lines.append(line)
+    return lines
+
+def interpreter_id(python: str) -> str:
+    """Return the version and platform of an interpreter."""
+    if os.path.realpath(python) == os.path.realpath(sys.executable):
+        return f"{sys.version} {platform.machine()} {sys.implementation.cache_tag}"
+    code = "import platform, sys; print(sys.version, platform.machine(), sys.implementation.cache_tag)"
+    return subprocess.run([python, "-c", code], check=True, capture_output=True, text=True).stdout.strip()
+
+def environment_key(python: str, requirements: str) -> str:
+    """Return the cache key of an environment for ``requirements``."""
+    digest = hashlib.sha256()
+    digest.update(interpreter_id(python).encode("utf-8"))
+    for line in sorted(read_requirements(requirements)):
+        digest.update(b"\n" + line.encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+def read_marker(venv_path: str) -> Optional[str]:
+    """Return the key an environment was built for, or None."""
+    try:
+        with open(os.path.join(venv_path, MARKER)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def clone_environment(source: str, target: str) -> None:
+    """Copy a virtualenv to a new location, hardlinking where possible.
+
+    Files that mention the source path are copied with the path
+    replaced; everything else is hardlinked (or copied when the two
+    paths are on different filesystems). The build marker is left out;
+    the caller writes it once the copy is complete.
+    """
+    source = os.path.abspath(source)
+    target = os.path.abspath(target)
+    old, new = source.encode(), target.encode()
+    for root, dirs, files in os.walk(source):
+        relative = os.path.relpath(root, source)
+        destination = os.path.normpath(os.path.join(target, relative))
+        os.makedirs(destination, exist_ok=True)
+        for name in list(dirs) + files:
+            src = os.path.join(root, name)
+            dst = os.path.join(destination, name)
+            if os.path.islink(src):
+                link = os.readlink(src)
+                if link.startswith(source):
+                    link = target + link[len(source):]
+                os.symlink(link, dst)
+                if name in dirs:
+                    dirs.remove(name)  # don't descend into linked directories
+            elif name in files and not (relative == "." and name == MARKER):
+                _place_file(src, dst, old, new, rewrite=relative in ("bin", "Scripts") or name == "pyvenv.cfg")
+
+def _place_file(src: str, dst: str, old: bytes, new: bytes, rewrite: bool) -> None:
+    if rewrite:
+        with open(src, "rb") as f:
+            content = f.read()
+        if old in content:
+            with open(dst, "wb") as f:
+                f.write(content.replace(old, new))
+            shutil.copymode(src, dst)
+            return
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+class EnvironmentBuilder:
+    """Build virtualenvs from requirement files, reusing cached builds."""
+
+    def __init__(self, cache_dir: Optional[str] = None, python: Optional[str] = None):
+        """Initialize the builder.
+
+        Args:
+            cache_dir: Holds the ``venvs`` and ``wheels`` directories;
+                defaults to ~/.cache/onhax/installer
+            python: Interpreter the environments are created with;
+                defaults to the running one
+        """
+        self.cache_dir = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
+        self.python = python or sys.executable
+        self.venvs_dir = os.path.join(self.cache_dir, "venvs")
+        self.wheels_dir = os.path.join(self.cache_dir, "wheels")
+
+    def ensure(self, requirements: str, target: str) -> str:
+        """Make ``target`` a virtualenv with ``requirements`` installed.
+
+        Nothing is done if ``target`` was already built for the same
+        interpreter and requirements. Otherwise the cached environment for
+        them is linked into place, and built first if there is none.
+
+        Args:
+            requirements: Path of the requirements file
+            target: Where the virtualenv should be
+
+        Returns:
+            The environment's cache key
+        """
+        key = environment_key(self.python, requirements)
+        if read_marker(target) == key:
+            logger.info(f"Python environment at {target} is up to date")
+            return key
+
+        cached = self.build(requirements, key)
+        if os.path.lexists(target):
+            shutil.rmtree(target)
+        clone_environment(cached, target)
+        with open(os.path.join(target, MARKER), "w") as f:
+            f.write(key)
+        logger.info(f"Linked cached Python environment {key} to {target}")
+        return key
+
+    def build(self, requirements: str, key: Optional[str] = None) -> str:
+        """Return the cached environment for ``requirements``, building it if needed."""
+        key = key or environment_key(self.python, requirements)
+        cached = os.path.join(self.venvs_dir, key)
+        if read_marker(cached) == key:
+            return cached
+
+        os.makedirs(self.venvs_dir, exist_ok=True)
+        building = f"{cached}.building-{os.getpid()}"
+        shutil.rmtree(building, ignore_errors=True)
+        logger.info(f"Building Python environment {key}")
+        subprocess.run([self.python, "-m", "venv", building], check=True)
+        if read_requirements(requirements):
+            self.install(venv_bin(building, "python"), requirements)
+        with open(os.path.join(building, MARKER), "w") as f:
+            f.write(key)
+        # Scripts were written with the build path; give them the cache path
+        _rewrite_paths(building, building, cached)
+        shutil.rmtree(cached, ignore_errors=True)
+        try:
+            os.replace(building, cached)
+        except OSError:
+            # Built concurrently by another installer
+            shutil.rmtree(building, ignore_errors=True)
+        return cached
+
+    def install(self, python: str, requirements: str) -> None:
+        """Install requirements into an environment from the wheel cache.
+
+        The wheel cache is tried offline first. If it cannot satisfy the
+        requirements, the missing wheels are downloaded (or built) into it
+        and the install is repeated offline.
+        """
+        os.makedirs(self.wheels_dir, exist_ok=True)
+        offline = [python, "-m", "pip", "install", "--no-index", "--find-links", self.wheels_dir,
+                   "-r", requirements]
+        if subprocess.run(offline, capture_output=True).returncode == 0:
+            return
+        logger.info(f"Fetching wheels for {requirements} into {self.wheels_dir}")
+        subprocess.run([python, "-m", "pip", "wheel", "--find-links", self.wheels_dir,
+                        "--wheel-dir", self.wheels_dir, "-r", requirements], check=True)
+        subprocess.run(offline, check=True)
+
+def _rewrite_paths(venv_path: str, old: str, new: str) -> None:
+    """Replace ``old`` with ``new`` in an environment's scripts and pyvenv.cfg."""
+    if old == new:
+        return
+    candidates = [os.path.join(venv_path, "pyvenv.cfg")]
+    for directory in ("bin", "Scripts"):
+        path = os.path.join(venv_path, directory)
+        if os.path.isdir(path):
+            candidates.extend(os.path.join(path, name) for name in os.listdir(path))
+    for path in candidates:
+        if os.path.islink(path) or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            content = f.read()
+        if old.encode() in content:
+            # Write a new file: the old one may be hardlinked into the cache
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content.replace(old.encode(), new.encode()))
+            shutil.copymode(path, tmp)
+            os.replace(tmp, path)
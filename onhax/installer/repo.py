@@ -0,0 +1,186 @@
+"""
+Repository sync for the installer.
+
+Clones a repository, or updates an existing clone in place, at a given
+ref. New clones can be shallow (``depth``) and/or partial (``filter``,
+e.g. ``blob:none``), so only the history that is needed is downloaded.
+An existing clone is updated with a fetch of the ref alone and a
+checkout. A pinned commit that is already present locally needs no
+network at all.
+
+With a mirror directory, a bare mirror of the remote is kept there and
+shared by every clone of it: clones borrow its objects through git
+alternates, so a second installation path costs almost nothing. As with
+``git clone --shared``, objects must not be pruned from the mirror while
+clones depend on it. The mirror is only ever fetched into, and automatic
+garbage collection is turned off in it (``gc.auto=0``,
+``gc.pruneExpire=never``, ``maintenance.auto=false``), so that a fetch
+does not prune objects on its own either.
+"""
+import hashlib
+import logging
+import os
+import re
+import subprocess
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_COMMIT = re.compile(r"[0-9a-f]{40}")
+
+def git(*args: str, cwd: Optional[str] = None, timeout: Optional[float] = None) -> str:
+    """Run a git command and return its output.
+
+    Raises:
+        RuntimeError: If git exits with an error; the message includes git's
+    """
+    result = subprocess.run(
+        ["git", "-c", "advice.detachedHead=false", *args],
+        cwd=cwd, capture_output=True, text=True, timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+def is_commit(ref: Optional[str]) -> bool:
+    """Whether ``ref`` is a full commit hash."""
+    return bool(ref) and bool(_COMMIT.fullmatch(ref))
+
+class RepoSync:
+    """Keep a working copy of a repository at a ref."""
+
+    def __init__(self, url: str, path: str, ref: Optional[str] = None, depth: Optional[int] = None,
+                 filter: Optional[str] = None, mirror_dir: Optional[str] = None):
+        """Initialize the sync.
+
+        Args:
+            url: The repository to clone
+            path: The working copy
+            ref: Branch, tag or full commit hash; the remote's HEAD if None
+            depth: Fetch only this many commits of history
+            filter: Partial clone filter for new clones, e.g. "blob:none";
+                not used with a mirror
+            mirror_dir: Directory of shared bare mirrors; none if None
+        """
+        self.url = url
+        self.path = path
+        self.ref = ref
+        self.depth = depth
+        self.filter = filter
+        self.mirror_dir = os.path.expanduser(mirror_dir) if mirror_dir else None
+
+    @property
+    def mirror_path(self) -> Optional[str]:
+        if not self.mirror_dir:
+            return None
+        name = hashlib.sha256(self.url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.mirror_dir, f"{name}.git")
+
+    def head(self) -> Optional[str]:
+        """Return the commit checked out in the working copy, if any."""
+        if not os.path.isdir(os.path.join(self.path, ".git")):
+            return None
+        try:
+            return git("rev-parse", "HEAD", cwd=self.path)
+        except RuntimeError:
+            return None
+
+    def remote_commit(self, timeout: float = 30) -> Optional[str]:
+        """Return the commit ``ref`` points to on the remote.
+
+        A pinned commit is returned as is. Returns None if the remote can't
+        be reached or has no such ref.
+        """
+        if is_commit(self.ref):
+            return self.ref
+        ref = self.ref or "HEAD"
+        try:
+            output = git("ls-remote", self.url, ref, f"{ref}^{{}}", timeout=timeout)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not query {self.url}: {e}")
+            return None
+        refs = {}
+        for line in output.splitlines():
+            commit, _, name = line.partition("\t")
+            refs[name] = commit
+        # An annotated tag is listed twice; the ^{} line is the commit
+        for name in (f"refs/tags/{ref}^{{}}", f"refs/heads/{ref}", f"refs/tags/{ref}", ref):
+            if name in refs:
+                return refs[name]
+        return None
+
+    def sync(self) -> str:
+        """Clone or update the working copy and check out the ref.
+
+        Returns:
+            The commit checked out
+
+        Raises:
+            RuntimeError: If a git command fails, or ``path`` exists and is
+                neither a git repository nor empty
+        """
+        source = self._update_mirror() if self.mirror_dir else "origin"
+        cloned = not os.path.isdir(os.path.join(self.path, ".git"))
+        if cloned:
+            self._clone()
+
+        if is_commit(self.ref) and self._has_commit(self.ref):
+            target = self.ref
+        else:
+            fetch: List[str] = ["fetch", "--no-tags"]
+            if self.depth and source == "origin":
+                fetch.append(f"--depth={self.depth}")
+            git(*fetch, source, self.ref or "HEAD", cwd=self.path)
+            target = git("rev-parse", "FETCH_HEAD^{commit}", cwd=self.path)
+
+        if not cloned and self.head() == target:
+            logger.info(f"{self.path} is already at {target[:12]}")
+        else:
+            # No --force: refuse rather than discard local changes
+            git("checkout", "--detach", target, cwd=self.path)
+            logger.info(f"Checked out {target[:12]} in {self.path}")
+        return target
+
+    def _clone(self) -> None:
+        if os.path.exists(self.path) and os.listdir(self.path):
+            raise RuntimeError(f"{self.path} exists and is not a git repository")
+        parent = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(parent, exist_ok=True)
+        if self.mirror_dir:
+            # Borrow the mirror's objects; keep the real remote as origin
+            git("clone", "--quiet", "--no-checkout", "--shared", self.mirror_path, self.path)
+            git("remote", "set-url", "origin", self.url, cwd=self.path)
+            return
+        clone = ["clone", "--quiet", "--no-checkout"]
+        if self.depth:
+            clone.append(f"--depth={self.depth}")
+        if self.filter:
+            clone.append(f"--filter={self.filter}")
+        logger.info(f"Cloning {self.url} into {self.path}")
+        git(*clone, self.url, self.path)
+
+    def _update_mirror(self) -> str:
+        mirror = self.mirror_path
+        created = not os.path.isdir(mirror)
+        if created:
+            # Always complete: clones borrow objects from it and have no
+            # way of fetching ones it left out
+            os.makedirs(self.mirror_dir, exist_ok=True)
+            logger.info(f"Creating mirror of {self.url} in {mirror}")
+            git("clone", "--quiet", "--mirror", self.url, mirror)
+        # Set on every call, before any fetch: it is idempotent and also
+        # covers mirrors that were created without these settings
+        for key, value in (("gc.auto", "0"), ("gc.pruneExpire", "never"), ("maintenance.auto", "false")):
+            git("config", key, value, cwd=mirror)
+        if created or (is_commit(self.ref) and self._has_commit(self.ref, mirror)):
+            return mirror
+        logger.info(f"Updating mirror {mirror}")
+        git("fetch", "--quiet", "origin", cwd=mirror)
+        return mirror
+
+    def _has_commit(self, commit: str, repository: Optional[str] = None) -> bool:
+        try:
+            git("cat-file", "-e", f"{commit}^{{commit}}", cwd=repository or self.path)
+        except RuntimeError:
+            return False
+        return True
@@ -0,0 +1,241 @@
+"""
+Dependency-graph scheduler for installation steps.
+
+Steps declare the steps they require and run on a bounded thread pool as
+soon as those have finished, so independent work (package installs,
+image pulls, the clone) overlaps. The first failure stops the run: steps
+that have not started are cancelled, running ones are allowed to finish,
+and the error is raised once the pool is idle.
+
+With a Checkpoints journal, steps that declare a fingerprint are skipped
+when they completed before with the same fingerprint. A step's
+fingerprint covers its own inputs and the fingerprints of the steps it
+requires, so a change upstream re-runs everything that depends on it.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+from .checkpoints import Checkpoints, fingerprint
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+class Step(NamedTuple):
+    """One unit of installation work."""
+
+    name: str
+    func: Callable[[], object]
+    requires: Sequence[str] = ()
+    title: Optional[str] = None
+    weight: float = 1.0
+    # Returns the step's inputs; steps without one always run (checks)
+    inputs: Optional[Callable[[], object]] = None
+
+    @property
+    def label(self):
+        return self.title or self.name
+
+class StepResult(NamedTuple):
+    """Outcome of a step."""
+
+    name: str
+    status: str
+    seconds: float = 0.0
+    error: Optional[BaseException] = None
+
+# Called with (step, status, fraction of the total weight completed)
+EventCallback = Callable[[Step, str, float], None]
+
+def topological_order(steps: Iterable[Step]) -> List[Step]:
+    """Return the steps ordered so that every step follows its requirements.
+
+    Raises:
+        ValueError: If a step requires an unknown step, or on a cycle
+    """
+    by_name: Dict[str, Step] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step: {step.name}")
+        by_name[step.name] = step
+    for step in by_name.values():
+        unknown = [name for name in step.requires if name not in by_name]
+        if unknown:
+            raise ValueError(f"Step {step.name} requires unknown step(s): {', '.join(unknown)}")
+
+    ordered: List[Step] = []
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(step: Step, path: List[str]) -> None:
+        if state.get(step.name) == 2:
+            return
+        if state.get(step.name) == 1:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [step.name])}")
+        state[step.name] = 1
+        for name in step.requires:
+            visit(by_name[name], path + [step.name])
+        state[step.name] = 2
+        ordered.append(step)
+
+    for step in by_name.values():
+        visit(step, [])
+    return ordered
+
+def downstream(steps: Iterable[Step], name: str) -> Set[str]:
+    """Return ``name`` and the names of all steps that depend on it.
+
+    Raises:
+        ValueError: If there is no step called ``name``
+    """
+    steps = list(steps)
+    if name not in {step.name for step in steps}:
+        raise ValueError(f"Unknown step: {name} (steps: {', '.join(step.name for step in steps)})")
+    names = {name}
+    for step in topological_order(steps):
+        if names.intersection(step.requires):
+            names.add(step.name)
+    return names
+
+class StepFailed(RuntimeError):
+    """Raised when a step fails; the original error is the ``__cause__``."""
+
+    def __init__(self, step, error, results):
+        super().__init__(f"Step '{step.label}' failed: {error}")
+        self.step = step
+        self.results = results
+
+class Scheduler:
+    """Run steps in dependency order on a bounded worker pool."""
+
+    def __init__(self, steps: Iterable[Step], max_workers: int = 4,
+                 on_event: Optional[EventCallback] = None,
+                 checkpoints: Optional[Checkpoints] = None, force: Iterable[str] = ()):
+        """Initialize the scheduler.
+
+        Args:
+            steps: The steps to run
+            max_workers: Maximum number of steps running at once
+            on_event: Called from the scheduling thread when a step starts,
+                finishes, is skipped, fails or is cancelled
+            checkpoints: Journal of completed steps; without one every
+                step runs
+            force: Names of steps to run even if they are up to date
+
+        Raises:
+            ValueError: If the dependencies are invalid or a forced step
+                does not exist
+        """
+        self.steps = topological_order(steps)
+        self.max_workers = max(1, max_workers)
+        self.on_event = on_event
+        self.checkpoints = checkpoints
+        self.force = set(force)
+        unknown = self.force - {step.name for step in self.steps}
+        if unknown:
+            raise ValueError(f"Unknown step(s): {', '.join(sorted(unknown))}")
+        self.results: Dict[str, StepResult] = {}
+        self.fingerprints: Dict[str, Optional[str]] = {}
+
+    def run(self) -> Dict[str, StepResult]:
+        """Run all steps.
+
+        Returns:
+            The result of every step, by name. Up to date steps have the
+            status SKIPPED.
+
+        Raises:
+            StepFailed: If a step raised; its error is chained as the cause
+        """
+        total = sum(step.weight for step in self.steps) or 1.0
+        completed = 0.0
+        status = {step.name: PENDING for step in self.steps}
+        started: Dict[str, float] = {}
+        failure = None
+        self.results = {}
+        self.fingerprints = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="install-step") as executor:
+            running = {}
+
+            def submit_ready():
+                for step in self.steps:
+                    if status[step.name] == PENDING and all(status[n] in (DONE, SKIPPED) for n in step.requires):
+                        status[step.name] = RUNNING
+                        started[step.name] = time.monotonic()
+                        self._emit(step, RUNNING, completed / total)
+                        upstream = {name: self.fingerprints.get(name) for name in step.requires}
+                        running[executor.submit(self._execute, step, upstream)] = step
+
+            submit_ready()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    seconds = time.monotonic() - started[step.name]
+                    error = future.exception()
+                    if error is None:
+                        value, skipped = future.result()
+                        state = SKIPPED if skipped else DONE
+                        status[step.name] = state
+                        completed += step.weight
+                        self.fingerprints[step.name] = value
+                        self.results[step.name] = StepResult(step.name, state, seconds)
+                        if skipped:
+                            logger.info(f"Step {step.label} is up to date")
+                        else:
+                            if value is not None and self.checkpoints is not None:
+                                self.checkpoints.record(step.name, value, seconds)
+                            logger.info(f"Step {step.label} finished in {seconds:.1f}s")
+                        self._emit(step, state, completed / total)
+                    else:
+                        status[step.name] = FAILED
+                        if self.checkpoints is not None:
+                            self.checkpoints.discard(step.name)
+                        self.results[step.name] = StepResult(step.name, FAILED, seconds, error)
+                        logger.error(f"Step {step.label} failed after {seconds:.1f}s: {error}")
+                        self._emit(step, FAILED, completed / total)
+                        if failure is None:
+                            failure = (step, error)
+                if failure is None:
+                    submit_ready()
+
+        if failure is not None:
+            for step in self.steps:
+                if status[step.name] == PENDING:
+                    status[step.name] = CANCELLED
+                    self.results[step.name] = StepResult(step.name, CANCELLED)
+                    self._emit(step, CANCELLED, completed / total)
+            step, error = failure
+            raise StepFailed(step, error, self.results) from error
+        return self.results
+
+    def _execute(self, step, upstream):
+        """Run a step in a worker, unless its checkpoint is current.
+
+        Returns:
+            The step's fingerprint (None for steps without inputs) and
+            whether the step was skipped
+        """
+        value = None
+        if step.inputs is not None:
+            value = fingerprint(step.name, step.inputs(), upstream)
+            if (step.name not in self.force and self.checkpoints is not None
+                    and self.checkpoints.is_fresh(step.name, value)):
+                return value, True
+        step.func()
+        if value is not None:
+            # Record the state the step left behind (e.g. the commit a clone
+            # checked out), which is what the next run will compare against
+            value = fingerprint(step.name, step.inputs(), upstream)
+        return value, False
+
+    def _emit(self, step, state, fraction):
+        if self.on_event is not None:
+            self.on_event(step, state, fraction)
@@ -2,14 +2,17 @@
 Core installation logic for Dify automated installer.
 """
 import os
-import sys
 import subprocess
 import shutil
 import docker
 from pathlib import Path
 import logging
+from ..logging import setup_logging
+from .config import DEFAULT_CONFIG, Config
+from .images import SKIPPED, ImagePuller
+from .pyenv import EnvironmentBuilder, environment_key, read_marker, venv_bin
+from .repo import RepoSync
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BaseInstaller:
@@ -19,11 +22,18 @@ class BaseInstaller:
     See PROJECT_AUTOMATION.md for documentation on how this works.
     """
     """Base installer class that can be extended for any GitHub project."""
-    def __init__(self, installation_path=None):
+    def __init__(self, installation_path=None, client=None):
         self.installation_path = installation_path or os.path.expanduser('~/project')
-        self.client = docker.from_env()
+        self._client = client
         self.venv_created = False
         self.docker_configured = False
+
+    @property
+    def client(self):
+        """Docker client, connected on first use unless one was passed in."""
+        if self._client is None:
+            self._client = docker.from_env()
+        return self._client
         
     def rollback(self):
         """Revert changes on failure."""
@@ -40,7 +50,7 @@ class BaseInstaller:
         if self.venv_created:
             try:
                 venv_path = os.path.join(self.installation_path, 'venv')
-                if os.path.exists(venv_path):
+                if os.path.lexists(venv_path):
                     shutil.rmtree(venv_path)
             except Exception as e:
                 logger.error(f"Failed to cleanup virtualenv: {e}")
@@ -51,9 +61,10 @@ class DifyInstaller(BaseInstaller):
     This class implements the installation steps defined in project-definition.yaml,
     which maps directly to setup-instructions.md.
     """
-    def __init__(self, installation_path=None):
-        self.installation_path = installation_path or os.path.expanduser('~/dify')
-        self.client = docker.from_env()
+    def __init__(self, installation_path=None, client=None, repository=None):
+        super().__init__(installation_path or os.path.expanduser('~/dify'), client)
+        # Repository options: url, ref, depth, filter and mirror_dir (see RepoSync)
+        self.repository = dict(DEFAULT_CONFIG['repository'], **(repository or {}))
     
     def check_prerequisites(self):
         """Check if all required tools are installed."""
@@ -75,15 +86,24 @@ class DifyInstaller(BaseInstaller):
         if not system_manager.install_nodejs():
             raise RuntimeError("Failed to install Node.js")
 
-    def setup_python_environment(self):
-        """Set up Python virtual environment and install requirements."""
-        venv_path = os.path.join(self.installation_path, 'venv')
-        subprocess.run([sys.executable, '-m', 'venv', venv_path], check=True)
-        
-        # Activate virtual environment and install requirements
-        pip_path = os.path.join(venv_path, 'bin', 'pip')
-        subprocess.run([pip_path, 'install', '--upgrade', 'pip'], check=True)
-        subprocess.run([pip_path, 'install', '-r', 'requirements.txt'], check=True)
+    @property
+    def venv_path(self):
+        return os.path.join(self.installation_path, 'venv')
+
+    @property
+    def requirements_file(self):
+        return os.path.join(self.installation_path, 'api', 'requirements.txt')
+
+    def setup_python_environment(self, cache_dir=None):
+        """Set up the backend's virtual environment.
+
+        Environments are cached by interpreter and requirements, and a
+        matching one is hardlinked into place instead of being rebuilt.
+        """
+        builder = EnvironmentBuilder(cache_dir)
+        if read_marker(self.venv_path) != environment_key(builder.python, self.requirements_file):
+            self.venv_created = True
+        return builder.ensure(self.requirements_file, self.venv_path)
 
     def setup_docker(self):
         """Set up Docker and required containers."""
@@ -98,51 +118,63 @@ class DifyInstaller(BaseInstaller):
             raise RuntimeError("Failed to start Docker service")
         if not system_manager.enable_service('docker'):
             logger.warning("Failed to enable Docker service on boot")
-        
-        # Pull required images
-        self.client.images.pull('postgres:14')
-        self.client.images.pull('redis:6')
-        
-        # Set up Docker Compose configurations
+
+    def pull_images(self, images=None, on_progress=None, max_workers=4):
+        """Pull the images the services run on, concurrently.
+
+        Images already present with the current digest are skipped.
+        ``images`` defaults to the list in the installer configuration.
+        """
+        images = images or Config().images()
+        results = ImagePuller(self.client, max_workers, on_progress).pull(images)
+        skipped = [ref for ref, status in results.items() if status == SKIPPED]
+        if skipped:
+            logger.info(f"Images already up to date: {', '.join(skipped)}")
+        return results
+
+    def check_compose_file(self):
+        """Check that the Docker Compose configuration is in place."""
         compose_file = os.path.join(self.installation_path, 'docker-compose.yml')
         if not os.path.exists(compose_file):
             raise FileNotFoundError(f"Docker Compose file not found at {compose_file}")
 
+    def repo_sync(self):
+        """Return the RepoSync for the installation path."""
+        return RepoSync(path=self.installation_path, **self.repository)
+
     def clone_repository(self):
-        """Clone the Dify repository."""
-        if not os.path.exists(self.installation_path):
-            subprocess.run(['git', 'clone', 'https://github.com/langgenius/dify.git', self.installation_path], check=True)
-        else:
-            logger.info(f"Directory {self.installation_path} already exists")
+        """Clone the Dify repository, or update an existing clone to the configured ref."""
+        return self.repo_sync().sync()
 
     def setup_backend(self):
         """Set up the Dify backend."""
         backend_path = os.path.join(self.installation_path, 'api')
-        os.chdir(backend_path)
         
         # Copy environment file
-        if not os.path.exists('.env'):
-            shutil.copy('.env.example', '.env')
+        env_file = os.path.join(backend_path, '.env')
+        if not os.path.exists(env_file):
+            shutil.copy(os.path.join(backend_path, '.env.example'), env_file)
         
-        # Install dependencies and run migrations
-        subprocess.run(['pip', 'install', '-r', 'requirements.txt'], check=True)
-        subprocess.run(['flask', 'db', 'upgrade'], check=True)
+        # Run migrations with the environment set up by setup_python_environment
+        # (cwd= rather than os.chdir, which would move every thread of the process)
+        flask = venv_bin(self.venv_path, 'flask')
+        subprocess.run([flask, 'db', 'upgrade'], check=True, cwd=backend_path)
         
         # Create default admin user
-        subprocess.run(['flask', 'user', 'create', '--username', 'admin', '--password', 'password', '--email', 'admin@dify.ai'], check=True)
+        subprocess.run([flask, 'user', 'create', '--username', 'admin', '--password', 'password', '--email', 'admin@dify.ai'], check=True, cwd=backend_path)
 
     def setup_frontend(self):
         """Set up the Dify frontend."""
         web_path = os.path.join(self.installation_path, 'web')
-        os.chdir(web_path)
         
         # Copy environment file
-        if not os.path.exists('.env'):
-            shutil.copy('.env.example', '.env')
+        env_file = os.path.join(web_path, '.env')
+        if not os.path.exists(env_file):
+            shutil.copy(os.path.join(web_path, '.env.example'), env_file)
         
         # Install dependencies
-        subprocess.run(['npm', 'install'], check=True)
-        subprocess.run(['npm', 'run', 'build'], check=True)
+        subprocess.run(['npm', 'install'], check=True, cwd=web_path)
+        subprocess.run(['npm', 'run', 'build'], check=True, cwd=web_path)
 
     def verify_installation(self):
         """Verify the installation is working."""
@@ -168,12 +200,16 @@ class DifyInstaller(BaseInstaller):
 
     def install(self):
         """Run the complete installation process."""
+        # Same dependencies as the installation DAG: the Python environment
+        # and the compose check need the cloned repository
         steps = [
             ('Checking prerequisites', self.check_prerequisites),
             ('Installing Node.js', self.install_nodejs),
-            ('Setting up Python environment', self.setup_python_environment),
             ('Setting up Docker', self.setup_docker),
+            ('Pulling images', self.pull_images),
             ('Cloning repository', self.clone_repository),
+            ('Setting up Python environment', self.setup_python_environment),
+            ('Checking Docker Compose file', self.check_compose_file),
             ('Setting up backend', self.setup_backend),
             ('Setting up frontend', self.setup_frontend),
             ('Verifying installation', self.verify_installation)
@@ -190,6 +226,7 @@ class DifyInstaller(BaseInstaller):
 
 def main():
     """Run the installer directly."""
+    setup_logging()
     installer = DifyInstaller()
     installer.install()
 
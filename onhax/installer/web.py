@@ -7,6 +7,8 @@ import subprocess
 import os
 import sys
 
+from ..logging import setup_logging
+
 app = Flask(__name__)
 
 class InstallationManager:
@@ -87,6 +89,7 @@ def start_installation():
 
 def main():
     """Run the installer web interface."""
+    setup_logging()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
 if __name__ == '__main__':
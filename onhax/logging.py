@@ -1,71 +1,246 @@
-"""Logging configuration for OnHax."""
+"""Logging configuration for OnHax.
+
+``setup_logging`` is the single configuration entry point for the whole
+``onhax`` package. Loggers only put records on a queue; formatting and
+I/O happen on a listener thread, so a log call never waits for the
+terminal or the disk.
+"""
+import atexit
+import copy
+import itertools
+import json
 import logging
-import logging.config
+import logging.handlers
 import os
+import queue
+import sys
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """Format records as compact JSON lines.
+
+    Every line has ``ts``, ``level``, ``logger`` and ``msg`` keys, plus
+    ``exc`` for exceptions and any fields passed in ``extra``. Events
+    logged with ``log_event`` carry their name in ``msg`` and their data
+    in ``fields``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if "event" in data:
+            data["msg"] = data.pop("event")
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, separators=(",", ":"), default=str)
+
+class DebugSampler(logging.Filter):
+    """Let through one in every ``1 / rate`` DEBUG records, and all others.
+
+    Kept records are annotated with ``sample_rate`` so that counts derived
+    from the logs can be scaled back up.
+    """
+
+    def __init__(self, rate: float):
+        """Initialize the filter.
+
+        Args:
+            rate: Fraction of DEBUG records to keep, between 0 and 1.
+        """
+        super().__init__()
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Sample rate must be between 0 and 1, got {rate}")
+        self.rate = rate
+        self._every = round(1 / rate) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        if not self._every or next(self._counter) % self._every:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps records structured.
+
+    The standard handler formats the record into its message before
+    queueing it; this one only merges the arguments and renders the
+    traceback, so the listener's formatter still sees the separate parts.
+    """
+
+    _exception_formatter = logging.Formatter()
 
-def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> None:
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _file_handler(log_file: str, rotate: str, max_bytes: int, backup_count: int) -> logging.Handler:
+    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+    if rotate == "size":
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    if rotate == "none":
+        return logging.FileHandler(log_file, mode="a", encoding="utf-8", delay=True)
+    # Time based: "midnight", "H", "D", "W0"-"W6" ...
+    return logging.handlers.TimedRotatingFileHandler(
+        log_file, when=rotate, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+
+def setup_logging(
+    log_level: Optional[str] = None,
+    log_file: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    rotate: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    backup_count: Optional[int] = None,
+    debug_sample_rate: Optional[float] = None,
+    console: Optional[bool] = None,
+) -> None:
     """Configure logging for the application.
-    
+
+    The root and ``onhax`` loggers get a queue handler; a listener thread
+    passes the queued records to the console and file handlers. Calling
+    this again replaces the previous configuration. Arguments left as
+    None are read from the environment, then from the defaults below.
+
     Args:
-        log_level: The logging level to use (DEBUG, INFO, WARNING, ERROR, CRITICAL).
-        log_file: Optional path to a log file. If not provided, logs only go to console.
+        log_level: The logging level to use (DEBUG, INFO, WARNING, ERROR,
+            CRITICAL). Env: ONHAX_LOG_LEVEL, default INFO.
+        log_file: Optional path to a log file. If not provided, logs only go
+            to console. Env: ONHAX_LOG_FILE.
+        json_format: Write compact JSON lines instead of text. Env:
+            ONHAX_LOG_FORMAT=json.
+        rotate: How the log file is rotated: "size", a
+            TimedRotatingFileHandler interval such as "midnight" or "H", or
+            "none". Env: ONHAX_LOG_ROTATE, default size.
+        max_bytes: File size that triggers size rotation. Env:
+            ONHAX_LOG_MAX_BYTES, default 10 MiB.
+        backup_count: Rotated files to keep. Env: ONHAX_LOG_BACKUPS,
+            default 5.
+        debug_sample_rate: Fraction of DEBUG records to keep. Env:
+            ONHAX_LOG_DEBUG_SAMPLE, default 1.
+        console: Log to stdout as well. Env: ONHAX_LOG_CONSOLE=0 disables.
     """
-    config = {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "standard": {
-                "format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-            },
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": log_level,
-                "formatter": "standard",
-                "stream": "ext://sys.stdout",
-            },
-        },
-        "loggers": {
-            "": {  # Root logger
-                "handlers": ["console"],
-                "level": log_level,
-            },
-            "onhax": {
-                "handlers": ["console"],
-                "level": log_level,
-                "propagate": False,
-            },
-        },
-    }
-    
+    global _listener, _queue_handler
+    env = os.environ.get
+    log_level = (log_level or env("ONHAX_LOG_LEVEL") or "INFO").upper()
+    log_file = log_file or env("ONHAX_LOG_FILE") or None
+    if json_format is None:
+        json_format = env("ONHAX_LOG_FORMAT", "text").lower() == "json"
+    rotate = rotate or env("ONHAX_LOG_ROTATE") or "size"
+    max_bytes = max_bytes if max_bytes is not None else int(env("ONHAX_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    backup_count = backup_count if backup_count is not None else int(env("ONHAX_LOG_BACKUPS", "5"))
+    if debug_sample_rate is None:
+        debug_sample_rate = float(env("ONHAX_LOG_DEBUG_SAMPLE", "1"))
+    if console is None:
+        console = env("ONHAX_LOG_CONSOLE", "1") != "0"
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = []
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
     if log_file:
-        # Create log directory if it doesn't exist
-        log_path = Path(log_file).parent
-        if not log_path.exists():
-            log_path.mkdir(parents=True)
-            
-        config["handlers"]["file"] = {
-            "class": "logging.FileHandler",
-            "level": log_level,
-            "formatter": "standard",
-            "filename": log_file,
-            "mode": "a",
-        }
-        config["loggers"][""]["handlers"].append("file")
-        config["loggers"]["onhax"]["handlers"].append("file")
-    
-    logging.config.dictConfig(config)
+        handlers.append(_file_handler(log_file, rotate, max_bytes, backup_count))
+    for handler in handlers:
+        handler.setLevel(log_level)
+        handler.setFormatter(formatter)
+
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    queue_handler.setLevel(log_level)
+    if debug_sample_rate < 1:
+        queue_handler.addFilter(DebugSampler(debug_sample_rate))
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, *handlers, respect_handler_level=True
+    )
+
+    with _lock:
+        _shutdown()
+        for name, propagate in (("", True), ("onhax", False)):
+            logger = logging.getLogger(name)
+            # Replace handlers installed by other configuration, as dictConfig would
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.setLevel(log_level)
+            logger.propagate = propagate
+            logger.addHandler(queue_handler)
+        _queue_handler, _listener = queue_handler, listener
+        listener.start()
+
+def shutdown_logging() -> None:
+    """Flush the queued records, stop the listener and close the handlers."""
+    with _lock:
+        _shutdown()
+
+def _shutdown() -> None:
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    for name in ("", "onhax"):
+        logging.getLogger(name).removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = _queue_handler = None
+
+atexit.register(shutdown_logging)
 
 def get_logger(name: str) -> logging.Logger:
     """Get a logger with the given name.
-    
+
     Args:
         name: The name for the logger, typically __name__.
-        
+
     Returns:
         A configured logger instance.
     """
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
+
+def log_event(logger: logging.Logger, event: str, fields: Dict[str, Any], level: int = logging.INFO) -> None:
+    """Log a structured event.
+
+    The fields are attached to the log record as ``record.event`` and
+    ``record.fields`` for structured handlers, and rendered as JSON in
+    the message for plain ones. Nothing is serialized when the level is
+    disabled.
+
+    Args:
+        logger: The logger to emit on.
+        event: Name of the event, e.g. "request".
+        fields: JSON-serializable event data.
+        level: The logging level.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(
+            level, "%s %s", event, json.dumps(fields, default=str),
+            extra={"event": event, "fields": fields},
+        )
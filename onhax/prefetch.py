@@ -0,0 +1,101 @@
+"""Concurrent loading of the files a message refers to."""
+import os
+import stat
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+class PrefetchResult(NamedTuple):
+    """What one round of prefetching produced."""
+
+    loaded: Dict[str, Any]
+    errors: Dict[str, BaseException]
+    skipped: List[str]
+    seconds: float
+
+def stat_candidates(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Split candidate paths into existing regular files and the rest.
+
+    Duplicates are dropped and the order of first appearance is kept.
+
+    Returns:
+        The paths of regular files and the paths that were skipped
+    """
+    files: List[str] = []
+    skipped: List[str] = []
+    seen = set()
+    for path in paths:
+        if path in seen:
+            continue
+        seen.add(path)
+        try:
+            is_file = stat.S_ISREG(os.stat(path).st_mode)
+        except (OSError, ValueError):
+            is_file = False
+        (files if is_file else skipped).append(path)
+    return files, skipped
+
+class Prefetcher:
+    """Load candidate files on a thread pool, alongside an optional warm-up task.
+
+    Words that merely look like paths are filtered out with a stat call
+    before any read is scheduled. The remaining files are loaded
+    concurrently, and a warm-up callable (typically one that opens the
+    connection for the upcoming request) is started at the same time.
+    The warm-up is not waited for: the request is sent as soon as the
+    files are loaded, and simply finds the connection ready if the
+    warm-up got there first. A warm-up still running from an earlier
+    round is not started again.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Any],
+        max_workers: int = 8,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """Initialize the prefetcher.
+
+        Args:
+            load: Called with each existing path; must be thread-safe
+            max_workers: Maximum number of concurrent loads
+            clock: Time source used for the timing
+        """
+        self.load = load
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="onhax-prefetch")
+        self._warming: Optional[Future] = None
+
+    def run(self, paths: Iterable[str], warmup: Optional[Callable[[], Any]] = None) -> PrefetchResult:
+        """Load every existing file among ``paths``.
+
+        Errors from ``load`` are collected per path rather than raised.
+        ``warmup`` runs in the background and may still be running when
+        this returns; its result and errors are ignored.
+
+        Args:
+            paths: Candidate paths
+            warmup: Optional task started alongside the loads
+
+        Returns:
+            The loaded values and errors by path, the skipped candidates and
+            the elapsed time
+        """
+        started = self.clock()
+        if warmup is not None and (self._warming is None or self._warming.done()):
+            self._warming = self._executor.submit(warmup)
+        files, skipped = stat_candidates(paths)
+        futures = [(path, self._executor.submit(self.load, path)) for path in files]
+
+        loaded: Dict[str, Any] = {}
+        errors: Dict[str, BaseException] = {}
+        for path, future in futures:
+            try:
+                loaded[path] = future.result()
+            except Exception as e:
+                errors[path] = e
+        return PrefetchResult(loaded, errors, skipped, self.clock() - started)
+
+    def close(self) -> None:
+        """Shut down the worker threads."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,208 @@
+"""Registry of file snapshots kept in the conversation context."""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+Reader = Callable[[str, Optional[str]], str]
+
+def normalize_path(path_str: str) -> str:
+    """Return a canonical, absolute version of the path."""
+    return str(Path(path_str).resolve())
+
+def read_text(path: str) -> str:
+    """Return the text content of a local file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+class FileSnapshot:
+    """The content of a file as last seen on disk."""
+
+    __slots__ = ("path", "_content", "_loader", "mtime_ns", "size", "digest", "_message")
+
+    def __init__(
+        self,
+        path: str,
+        content: Optional[str],
+        mtime_ns: int,
+        size: int,
+        digest: Optional[str] = None,
+        loader: Optional[Callable[[], str]] = None,
+    ):
+        """Initialize the snapshot.
+
+        Args:
+            path: Normalized absolute path of the file
+            content: Text content of the file, or None to load it lazily
+            mtime_ns: Modification time of the file in nanoseconds
+            size: Size of the file in bytes
+            digest: SHA-256 of the content; required when it is lazy
+            loader: Returns the content on first access when it is lazy
+        """
+        self.path = path
+        self._content = content
+        self._loader = loader
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest or hashlib.sha256(content.encode("utf-8")).hexdigest()
+        self._message: Optional[Dict[str, str]] = None
+
+    @property
+    def content(self) -> str:
+        """Text content of the file."""
+        if self._content is None:
+            self._content = self._loader()
+            self._loader = None
+        return self._content
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Check whether a stat result describes the same file version."""
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def message(self) -> Dict[str, str]:
+        """Return the system message carrying this snapshot.
+
+        The same dict is returned on every call, so the message keeps its
+        identity (and its place in the prompt) while the snapshot lives.
+        """
+        if self._message is None:
+            self._message = {
+                "role": "system",
+                "content": f"Content of file '{self.path}':\n\n{self.content}",
+            }
+        return self._message
+
+class FileContextRegistry:
+    """One live snapshot per file, keyed by normalized path.
+
+    Lookups are dictionary operations rather than scans over the message
+    history, and ``refresh`` re-reads only files whose mtime or size has
+    changed since they were recorded. Files may be added from several
+    threads at once.
+    """
+
+    def __init__(self, reader: Optional[Reader] = None):
+        """Initialize an empty registry.
+
+        Args:
+            reader: Called as ``reader(path, content)`` to obtain the text to
+                keep for a file; ``content`` is None when the file has to be
+                read from disk. Defaults to keeping the whole file.
+        """
+        self._snapshots: Dict[str, FileSnapshot] = {}
+        self.reader = reader
+        self._lock = threading.Lock()
+
+    def __contains__(self, path: str) -> bool:
+        return normalize_path(path) in self._snapshots
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def __iter__(self) -> Iterator[FileSnapshot]:
+        return iter(list(self._snapshots.values()))
+
+    def get(self, path: str) -> Optional[FileSnapshot]:
+        """Return the snapshot for a path, if one is registered."""
+        return self._snapshots.get(normalize_path(path))
+
+    def add(self, path: str, content: Optional[str] = None) -> FileSnapshot:
+        """Record the current content of a file, replacing any older snapshot.
+
+        Args:
+            path: Path of the file
+            content: Content just written to the file; read from disk if omitted
+
+        Returns:
+            The new snapshot
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        normalized = normalize_path(path)
+        if self.reader is not None:
+            content = self.reader(normalized, content)
+        elif content is None:
+            content = read_text(normalized)
+        stat = os.stat(normalized)
+        snapshot = FileSnapshot(normalized, content, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            previous = self._snapshots.pop(normalized, None)
+            if previous is not None and previous.digest == snapshot.digest:
+                # Unchanged content keeps its place in the context
+                self._snapshots[normalized] = previous
+                previous.mtime_ns, previous.size = snapshot.mtime_ns, snapshot.size
+                return previous
+            self._snapshots[normalized] = snapshot
+            return snapshot
+
+    def ensure(self, path: str) -> FileSnapshot:
+        """Return an up to date snapshot of a file, reading it only if needed.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        normalized = normalize_path(path)
+        snapshot = self._snapshots.get(normalized)
+        if snapshot is not None and snapshot.matches(os.stat(normalized)):
+            return snapshot
+        return self.add(normalized)
+
+    def restore(
+        self, path: str, digest: str, mtime_ns: int, size: int, loader: Callable[[], str]
+    ) -> Optional[FileSnapshot]:
+        """Register a previously saved snapshot without reading the file.
+
+        If the file changed on disk since it was saved, it is read again
+        instead; if it is gone, nothing is registered.
+
+        Args:
+            path: Path of the file
+            digest: SHA-256 of the saved content
+            mtime_ns: Saved modification time
+            size: Saved size
+            loader: Returns the saved content when it is first needed
+
+        Returns:
+            The registered snapshot, or None if the file no longer exists
+        """
+        normalized = normalize_path(path)
+        try:
+            stat = os.stat(normalized)
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return self.add(normalized)
+        except OSError:
+            return None
+        snapshot = FileSnapshot(normalized, None, mtime_ns, size, digest=digest, loader=loader)
+        with self._lock:
+            self._snapshots[normalized] = snapshot
+        return snapshot
+
+    def discard(self, path: str) -> None:
+        """Forget the snapshot of a file."""
+        self._snapshots.pop(normalize_path(path), None)
+
+    def refresh(self) -> List[str]:
+        """Re-read registered files that changed on disk.
+
+        Files that can no longer be read are dropped from the registry.
+
+        Returns:
+            The paths whose content changed or that were dropped
+        """
+        changed = []
+        for path, snapshot in list(self._snapshots.items()):
+            try:
+                if snapshot.matches(os.stat(path)):
+                    continue
+                if self.add(path) is not snapshot:
+                    changed.append(path)
+            except OSError:
+                del self._snapshots[path]
+                changed.append(path)
+        return changed
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Return one system message per registered file."""
+        return [snapshot.message() for snapshot in self._snapshots.values()]
@@ -0,0 +1,102 @@
+"""Buffered terminal rendering of streamed text."""
+import sys
+import time
+from typing import Any, Callable, List, Optional, TextIO
+
+class RenderBuffer:
+    """Coalesce streamed text deltas and write them at a bounded frame rate.
+
+    Deltas are collected in memory and written when ``interval`` seconds
+    have passed since the last write or ``max_chars`` characters are
+    pending, so the terminal sees a few writes per second instead of one
+    per token. Call ``tick`` on every stream event, so that pending text
+    is also written while the stream carries no text to display. In
+    ``rich`` mode text goes through a Rich console with markup and
+    highlighting disabled; in ``plain`` mode it is written directly to a
+    text stream.
+    """
+
+    MODES = ("plain", "rich")
+
+    def __init__(
+        self,
+        console: Any = None,
+        mode: str = "rich",
+        interval: float = 1 / 30,
+        max_chars: int = 4096,
+        stream: Optional[TextIO] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the render buffer.
+
+        Args:
+            console: Rich console used in ``rich`` mode
+            mode: Either "plain" or "rich"
+            interval: Minimum seconds between two writes; 0 or less
+                writes every delta immediately
+            max_chars: Pending characters that force a write
+            stream: Text stream used in ``plain`` mode, defaults to stdout
+            clock: Monotonic clock, replaceable for testing
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown render mode: {mode!r}")
+        if mode == "rich" and console is None:
+            raise ValueError("A console is required for rich rendering")
+        self.console = console
+        self.mode = mode
+        self.interval = max(0.0, interval)
+        self.max_chars = max_chars
+        self.stream = stream
+        self.clock = clock
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._last_flush = clock()
+        self.flushes = 0
+        self.chars = 0
+        self.render_seconds = 0.0
+
+    def write(self, text: str) -> None:
+        """Queue text, writing it out if a frame is due."""
+        if not text:
+            return
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if (
+            self._pending_chars >= self.max_chars
+            or self.clock() - self._last_flush >= self.interval
+        ):
+            self.flush()
+
+    def tick(self) -> None:
+        """Write pending text if a frame is due."""
+        if self._pending and self.clock() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending text now."""
+        self._last_flush = self.clock()
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        started = time.process_time()
+        if self.mode == "rich":
+            self.console.print(text, end="", markup=False, highlight=False)
+        else:
+            stream = self.stream or sys.stdout
+            stream.write(text)
+            stream.flush()
+        self.render_seconds += time.process_time() - started
+        self.flushes += 1
+        self.chars += len(text)
+
+    def close(self) -> None:
+        """Write any remaining text."""
+        self.flush()
+
+    def __enter__(self) -> "RenderBuffer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
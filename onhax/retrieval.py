@@ -0,0 +1,406 @@
+"""BM25 retrieval of file chunks for token-budgeted prompts.
+
+Requires NumPy (``pip install onhax[retrieval]``).
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .context import estimate_tokens
+from .ingest import SNIFF_BYTES, is_binary
+
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+def default_index_dir(root: str) -> str:
+    """Return the per-workspace index directory under ~/.cache/onhax."""
+    digest = hashlib.sha1(os.path.realpath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(os.path.expanduser("~"), ".cache", "onhax", "retrieval", digest)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms.
+
+    Identifiers are kept whole and also split into their snake_case and
+    camelCase parts, so ``generate_code`` matches a query for "code".
+    """
+    terms = []
+    for word in TOKEN_RE.findall(text):
+        lower = word.lower()
+        if len(lower) > 1:
+            terms.append(lower)
+        parts = [p.lower() for piece in word.split("_") for p in CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(p for p in parts if len(p) > 1)
+    return terms
+
+def chunk_lines(lines: Sequence[str], max_lines: int = 40) -> List[Tuple[int, int]]:
+    """Split a file into line ranges of at most ``max_lines`` lines.
+
+    A chunk ends at the last blank line of its second half when there is
+    one, so chunks tend to follow function and paragraph boundaries.
+
+    Returns:
+        Half-open (start, end) line index ranges
+    """
+    ranges = []
+    start, n = 0, len(lines)
+    while start < n:
+        end = min(start + max_lines, n)
+        if end < n:
+            for i in range(end - 1, start + max_lines // 2, -1):
+                if not lines[i].strip():
+                    end = i + 1
+                    break
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+class Chunk(NamedTuple):
+    """A range of lines of an indexed file."""
+
+    path: str
+    start_line: int
+    end_line: int
+    tokens: int
+
+class Selection(NamedTuple):
+    """Chunks chosen for a prompt and what they cost."""
+
+    chunks: List[Tuple[Chunk, str]]
+    tokens: int
+    file_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        """Tokens saved compared with pasting the files the chunks come from."""
+        return max(0, self.file_tokens - self.tokens)
+
+    def message(self) -> Dict[str, str]:
+        """Return the system message carrying the selected excerpts."""
+        parts = ["Relevant excerpts from the workspace (line numbers are 1-based):"]
+        for chunk, text in self.chunks:
+            parts.append(f"--- {chunk.path} (lines {chunk.start_line + 1}-{chunk.end_line}) ---\n{text}")
+        return {"role": "system", "content": "\n\n".join(parts)}
+
+class _FileRecord:
+    __slots__ = ("mtime_ns", "size", "tokens", "chunks", "terms", "counts")
+
+    def __init__(self, mtime_ns: int, size: int, tokens: int):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.tokens = tokens
+        self.chunks: List[Tuple[int, int, int]] = []
+        self.terms: List[np.ndarray] = []
+        self.counts: List[np.ndarray] = []
+
+class ChunkIndex:
+    """Incremental BM25 index over line chunks of the files in a directory.
+
+    Files are re-chunked only when their mtime or size changes. Term
+    frequencies are kept per chunk and compiled into flat NumPy arrays for
+    scoring, which takes one vectorized pass over the postings of the
+    query terms. When a directory is given, the index is saved there
+    (``meta.json`` and ``postings.npz``) and reloaded on the next run.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        directory: Optional[str] = None,
+        max_lines: int = 40,
+        max_file_bytes: int = 1024 * 1024,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """Initialize the index.
+
+        Args:
+            root: Directory the indexed paths are relative to
+            directory: Where to persist the index; in memory only if omitted
+            max_lines: Maximum lines per chunk
+            max_file_bytes: Larger files are not indexed
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+        self.root = os.path.realpath(root)
+        self.directory = directory
+        self.max_lines = max_lines
+        self.max_file_bytes = max_file_bytes
+        self.k1 = k1
+        self.b = b
+        self._vocab: Dict[str, int] = {}
+        self._files: Dict[str, _FileRecord] = {}
+        self._compiled: Optional[Tuple] = None
+        self._dirty = False
+        if directory:
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(len(record.chunks) for record in self._files.values())
+
+    @property
+    def files(self) -> List[str]:
+        """Indexed paths, relative to the root."""
+        return list(self._files)
+
+    def update(self, paths: Iterable[str]) -> int:
+        """Bring the index in line with a set of files.
+
+        Files not among ``paths`` are dropped; new and modified files are
+        (re-)chunked. Binary and oversized files are skipped.
+
+        Args:
+            paths: Paths relative to the root
+
+        Returns:
+            The number of files that were (re-)indexed or dropped
+        """
+        seen: Set[str] = set()
+        changed = 0
+        for path in paths:
+            if self._sync(path):
+                changed += 1
+            if path in self._files:
+                seen.add(path)
+        for path in [p for p in self._files if p not in seen]:
+            del self._files[path]
+            changed += 1
+        if changed:
+            self._compiled = None
+            self._dirty = True
+        return changed
+
+    def refresh(self, paths: Iterable[str]) -> int:
+        """Re-check only the given files, e.g. those reported as changed.
+
+        Each path is (re-)chunked if it is new or modified and dropped if it
+        no longer exists or can't be indexed; other files are not touched.
+
+        Args:
+            paths: Paths relative to the root
+
+        Returns:
+            The number of files that were (re-)indexed or dropped
+        """
+        changed = sum(1 for path in set(paths) if self._sync(path))
+        if changed:
+            self._compiled = None
+            self._dirty = True
+        return changed
+
+    def search(self, query: str, k: int = 20, boost: Optional[Dict[str, float]] = None) -> List[Tuple[Chunk, float]]:
+        """Return the ``k`` best-scoring chunks for a query.
+
+        Args:
+            query: Free text, usually the user's message
+            k: Maximum number of chunks
+            boost: Score multipliers by path, e.g. for files named in the query
+
+        Returns:
+            (chunk, score) pairs, best first; chunks scoring zero are left out
+        """
+        chunks, indices, data, doc_of, doc_len, df_all = self._compile()
+        ids = np.array(sorted({self._vocab[t] for t in tokenize(query) if t in self._vocab}), dtype=np.int32)
+        if not len(chunks) or not len(ids):
+            return []
+
+        n_docs = len(chunks)
+        df = df_all[ids]
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        mask = np.isin(indices, ids)
+        docs = doc_of[mask]
+        tf = data[mask]
+        term_idf = idf[np.searchsorted(ids, indices[mask])]
+        norm = self.k1 * (1 - self.b + self.b * doc_len[docs] / max(doc_len.mean(), 1.0))
+        scores = np.bincount(docs, weights=term_idf * tf * (self.k1 + 1) / (tf + norm), minlength=n_docs)
+        if boost:
+            for i, chunk in enumerate(chunks):
+                factor = boost.get(chunk.path)
+                if factor is not None:
+                    scores[i] *= factor
+
+        k = min(k, n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(chunks[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def select(
+        self, query: str, budget_tokens: int, k: int = 20, boost: Optional[Dict[str, float]] = None
+    ) -> Selection:
+        """Pick the best chunks for a query that fit in a token budget.
+
+        Chunks are taken best first and skipped when they would overflow
+        the budget. The selected chunks are returned grouped by file in
+        line order, together with their text.
+        """
+        picked: List[Chunk] = []
+        used = 0
+        for chunk, _ in self.search(query, k, boost):
+            if used + chunk.tokens > budget_tokens:
+                continue
+            picked.append(chunk)
+            used += chunk.tokens
+        picked.sort(key=lambda c: (c.path, c.start_line))
+
+        texts: List[Tuple[Chunk, str]] = []
+        lines_cache: Dict[str, List[str]] = {}
+        for chunk in picked:
+            if chunk.path not in lines_cache:
+                try:
+                    with open(os.path.join(self.root, chunk.path), "r", encoding="utf-8", errors="replace") as f:
+                        lines_cache[chunk.path] = f.readlines()
+                except OSError:
+                    lines_cache[chunk.path] = []
+            lines = lines_cache[chunk.path][chunk.start_line:chunk.end_line]
+            if lines:
+                texts.append((chunk, "".join(lines)))
+        tokens = sum(chunk.tokens for chunk, _ in texts)
+        file_tokens = sum(self._files[path].tokens for path in {c.path for c, _ in texts})
+        return Selection(texts, tokens, file_tokens)
+
+    def save(self) -> None:
+        """Write the index to its directory if it changed since the last save."""
+        if not self.directory or not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        vocab = sorted(self._vocab, key=self._vocab.__getitem__)
+        files = []
+        terms: List[np.ndarray] = []
+        counts: List[np.ndarray] = []
+        for path, record in self._files.items():
+            files.append({
+                "path": path,
+                "mtime_ns": record.mtime_ns,
+                "size": record.size,
+                "tokens": record.tokens,
+                "chunks": record.chunks,
+            })
+            terms.extend(record.terms)
+            counts.extend(record.counts)
+        lengths = np.array([len(t) for t in terms], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self._write(
+            "postings.npz",
+            lambda f: np.savez(
+                f,
+                indptr=indptr,
+                indices=np.concatenate(terms).astype(np.int32) if terms else np.zeros(0, np.int32),
+                data=np.concatenate(counts).astype(np.float32) if counts else np.zeros(0, np.float32),
+            ),
+            binary=True,
+        )
+        # meta.json is written last: it is what marks the postings as valid
+        meta = {"version": INDEX_VERSION, "max_lines": self.max_lines, "vocab": vocab, "files": files}
+        self._write("meta.json", lambda f: json.dump(meta, f))
+        self._dirty = False
+
+    def load(self) -> bool:
+        """Read a previously saved index, if a compatible one exists."""
+        try:
+            with open(os.path.join(self.directory, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with np.load(os.path.join(self.directory, "postings.npz")) as postings:
+                indptr, indices, data = postings["indptr"], postings["indices"], postings["data"]
+        except (OSError, ValueError, KeyError):
+            return False
+        if meta.get("version") != INDEX_VERSION or meta.get("max_lines") != self.max_lines:
+            return False
+        if len(indptr) != sum(len(entry["chunks"]) for entry in meta["files"]) + 1:
+            return False
+
+        self._vocab = {term: i for i, term in enumerate(meta["vocab"])}
+        self._files = {}
+        doc = 0
+        for entry in meta["files"]:
+            record = _FileRecord(entry["mtime_ns"], entry["size"], entry["tokens"])
+            for chunk in entry["chunks"]:
+                record.chunks.append(tuple(chunk))
+                record.terms.append(indices[indptr[doc]:indptr[doc + 1]])
+                record.counts.append(data[indptr[doc]:indptr[doc + 1]])
+                doc += 1
+            self._files[entry["path"]] = record
+        self._compiled = None
+        self._dirty = False
+        return True
+
+    def _write(self, name: str, dump, binary: bool = False) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb" if binary else "w", **({} if binary else {"encoding": "utf-8"})) as f:
+                dump(f)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _sync(self, path: str) -> bool:
+        """Index, re-index or drop one file as needed; whether anything changed."""
+        try:
+            stat = os.stat(os.path.join(self.root, path))
+        except OSError:
+            return self._files.pop(path, None) is not None
+        record = self._files.get(path)
+        if record is not None and record.mtime_ns == stat.st_mtime_ns and record.size == stat.st_size:
+            return False
+        record = self._index_file(path, stat)
+        if record is None:
+            return self._files.pop(path, None) is not None
+        self._files[path] = record
+        return True
+
+    def _index_file(self, path: str, stat: os.stat_result) -> Optional[_FileRecord]:
+        if stat.st_size > self.max_file_bytes:
+            return None
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if is_binary(raw[:SNIFF_BYTES]):
+            return None
+        text = raw.decode("utf-8", errors="replace")
+        lines = text.splitlines(keepends=True)
+        record = _FileRecord(stat.st_mtime_ns, stat.st_size, estimate_tokens(text))
+        # The path itself is searchable, so "client" finds client.py
+        path_terms = tokenize(path)
+        for start, end in chunk_lines(lines, self.max_lines):
+            chunk_text = "".join(lines[start:end])
+            terms = tokenize(chunk_text) + path_terms
+            ids = np.fromiter((self._term_id(t) for t in terms), dtype=np.int32, count=len(terms))
+            unique, counts = np.unique(ids, return_counts=True)
+            record.chunks.append((start, end, estimate_tokens(chunk_text)))
+            record.terms.append(unique.astype(np.int32))
+            record.counts.append(counts.astype(np.float32))
+        return record
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._vocab.get(term)
+        if term_id is None:
+            term_id = self._vocab[term] = len(self._vocab)
+        return term_id
+
+    def _compile(self) -> Tuple:
+        if self._compiled is None:
+            chunks: List[Chunk] = []
+            terms: List[np.ndarray] = []
+            counts: List[np.ndarray] = []
+            for path, record in self._files.items():
+                for (start, end, tokens), t, c in zip(record.chunks, record.terms, record.counts):
+                    chunks.append(Chunk(path, start, end, tokens))
+                    terms.append(t)
+                    counts.append(c)
+            lengths = np.array([len(t) for t in terms], dtype=np.int64)
+            indices = np.concatenate(terms) if terms else np.zeros(0, np.int32)
+            data = np.concatenate(counts) if counts else np.zeros(0, np.float32)
+            doc_of = np.repeat(np.arange(len(chunks), dtype=np.int32), lengths)
+            doc_len = np.array([float(c.sum()) for c in counts], dtype=np.float64)
+            df = np.bincount(indices, minlength=len(self._vocab))
+            self._compiled = (chunks, indices, data, doc_of, doc_len, df)
+        return self._compiled
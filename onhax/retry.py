@@ -0,0 +1,122 @@
+"""Retry, hedging and deadline helpers for API requests."""
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+class Deadline:
+    """An absolute point in time by which a request must complete."""
+
+    def __init__(self, timeout: float, clock: Callable[[], float] = time.monotonic):
+        """Initialize the deadline.
+
+        Args:
+            timeout: Seconds from now until the deadline
+            clock: Monotonic clock, replaceable for testing
+        """
+        self.clock = clock
+        self.expires_at = clock() + timeout
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
+
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        """Initialize the retry policy.
+
+        Args:
+            max_attempts: Total number of attempts, including the first
+            base_delay: Backoff ceiling after the first failure, in seconds
+            max_delay: Upper bound for the backoff ceiling, in seconds
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Return a random delay before retry number ``attempt`` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def is_retryable(error: BaseException) -> bool:
+        """Whether a failed attempt is worth repeating."""
+        import requests  # imported here so that the timing helpers stay cheap to import
+
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code if error.response is not None else 0
+            return status == 429 or status >= 500
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+class LatencyTracker:
+    """Rolling window of request latencies."""
+
+    def __init__(self, window: int = 200):
+        """Initialize the tracker.
+
+        Args:
+            window: Number of most recent samples kept
+        """
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add a latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Return the given percentile (0-1) of the samples, or None if empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))
+        return samples[index]
+
+class HedgePolicy:
+    """When to send a duplicate of a request that is taking too long.
+
+    Once ``min_samples`` latencies have been observed the hedge fires at
+    the ``percentile`` of recent latencies; before that ``initial_delay``
+    is used.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+    ):
+        """Initialize the hedge policy.
+
+        Args:
+            percentile: Latency percentile (0-1) after which to hedge
+            initial_delay: Hedge delay in seconds until enough samples exist
+            min_samples: Samples needed before the percentile is trusted
+            window: Number of recent latencies considered
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+
+    def delay(self) -> float:
+        """Seconds to wait for the first attempt before hedging."""
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        return self.latencies.percentile(self.percentile) or self.initial_delay
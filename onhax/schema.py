@@ -0,0 +1,26 @@
+"""Structured output of the engineer assistant.
+
+Kept apart from main.py because importing pydantic and building the models
+is a noticeable part of startup; the assistant loads them on first use.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+__all__ = ["AssistantResponse", "FileToCreate", "FileToEdit", "ValidationError"]
+
+class FileToCreate(BaseModel):
+    path: str
+    content: str
+
+# Diff editing structure
+class FileToEdit(BaseModel):
+    path: str
+    original_snippet: str
+    new_snippet: str
+
+class AssistantResponse(BaseModel):
+    assistant_reply: str
+    files_to_create: Optional[List[FileToCreate]] = None
+    # Optionally hold diff edits
+    files_to_edit: Optional[List[FileToEdit]] = None
@@ -0,0 +1,431 @@
+"""Content-addressed, append-only persistence of chat sessions."""
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+Message = Dict[str, str]
+
+JOURNAL_VERSION = 1
+
+# Message contents longer than this go to the blob store
+INLINE_CHARS = 512
+
+# Blobs younger than this are never collected: another process may have
+# stored them without having journaled the reference yet
+BLOB_GRACE_SECONDS = 3600
+
+def default_session_root() -> str:
+    """Return the directory holding sessions and blobs (~/.onhax)."""
+    return os.path.join(os.path.expanduser("~"), ".onhax")
+
+def terminate_last_line(path: str) -> None:
+    """Append a newline if the file ends with a torn line.
+
+    A crash can leave the last line of an append-only log half written;
+    new entries must start on a line of their own to stay readable.
+    """
+    try:
+        with open(path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+def new_session_id() -> str:
+    """Return a sortable, unique session id such as 20240101-120000-ab12."""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + secrets.token_hex(2)
+
+class BlobStore:
+    """zlib-compressed text blobs keyed by the SHA-256 of their content.
+
+    Identical contents are stored once, across all sessions.
+    """
+
+    def __init__(self, directory: str, level: int = 6):
+        """Initialize the store.
+
+        Args:
+            directory: Directory holding the blobs
+            level: zlib compression level
+        """
+        self.directory = directory
+        self.level = level
+
+    @staticmethod
+    def digest(content: str) -> str:
+        """Return the key of a content."""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def path(self, digest: str) -> str:
+        """Return the file holding a blob."""
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def __contains__(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, content: str, digest: Optional[str] = None) -> str:
+        """Store a content unless it is already present.
+
+        Args:
+            content: Text to store
+            digest: Its key, if already known
+
+        Returns:
+            The key of the content
+        """
+        digest = digest or self.digest(content)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(zlib.compress(content.encode("utf-8"), self.level))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def get(self, digest: str) -> str:
+        """Return a stored content.
+
+        Raises:
+            OSError: If the blob is missing
+        """
+        with open(self.path(digest), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+
+    def sizes(self) -> Dict[str, int]:
+        """Return the stored size in bytes of every blob, by key."""
+        sizes: Dict[str, int] = {}
+        try:
+            shards = os.listdir(self.directory)
+        except OSError:
+            return sizes
+        for shard in shards:
+            try:
+                with os.scandir(os.path.join(self.directory, shard)) as it:
+                    for entry in it:
+                        if not entry.name.startswith(".tmp-"):
+                            sizes[entry.name] = entry.stat().st_size
+            except OSError:
+                continue
+        return sizes
+
+    def remove(self, digest: str, min_age: float = 0.0) -> int:
+        """Delete a blob unless it was written within the last ``min_age`` seconds.
+
+        Returns:
+            The number of bytes freed
+        """
+        path = self.path(digest)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime < min_age:
+                return 0
+            os.unlink(path)
+        except OSError:
+            return 0
+        return stat.st_size
+
+class FileRecord(NamedTuple):
+    """A file snapshot as recorded in a session."""
+
+    path: str
+    digest: str
+    mtime_ns: int
+    size: int
+    nbytes: int
+
+class PruneResult(NamedTuple):
+    """What ``SessionStore.prune`` deleted."""
+
+    sessions: List[str]
+    blobs: int
+    freed_bytes: int
+
+class SessionState(NamedTuple):
+    """A session replayed from its journal."""
+
+    session_id: str
+    messages: List[Message]
+    files: Dict[str, FileRecord]
+
+class SessionJournal:
+    """Append-only log of one session's messages and file snapshots.
+
+    ``sync`` compares the conversation with what was logged last time and
+    appends only the difference: new messages, and snapshots that were
+    added, changed or dropped. Long message contents and all file
+    contents are written to the blob store, so the journal itself stays
+    small. When the history was rewritten rather than extended (turns
+    evicted or compacted), one record listing the whole history is
+    written instead.
+    """
+
+    def __init__(self, path: str, blobs: BlobStore, session_id: str, state: Optional[SessionState] = None):
+        """Open a journal for appending.
+
+        Args:
+            path: Journal file
+            blobs: Blob store for contents
+            session_id: Id of the session
+            state: What the journal already holds, when resuming
+        """
+        self.path = path
+        self.blobs = blobs
+        self.session_id = session_id
+        self.state = state
+        self._messages: List[Message] = list(state.messages) if state else []
+        self._files: Dict[str, str] = {p: r.digest for p, r in state.files.items()} if state else {}
+        new = not os.path.exists(path)
+        if not new:
+            terminate_last_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+        if new:
+            self._append([{"op": "meta", "version": JOURNAL_VERSION, "created": time.time(), "cwd": os.getcwd()}])
+
+    def sync(self, messages: List[Message], snapshots: Iterable[Any]) -> int:
+        """Log the changes since the previous sync.
+
+        Args:
+            messages: The conversation history
+            snapshots: Current file snapshots, with ``path``, ``digest``,
+                ``content``, ``mtime_ns`` and ``size`` attributes
+
+        Returns:
+            The number of records written
+        """
+        records: List[Dict[str, Any]] = []
+        logged = len(self._messages)
+        if len(messages) >= logged and all(a is b for a, b in zip(self._messages, messages)):
+            records.extend({"op": "msg", **self._encode(msg)} for msg in messages[logged:])
+        else:
+            records.append({"op": "history", "messages": [self._encode(msg) for msg in messages]})
+        self._messages = list(messages)
+
+        current: Dict[str, str] = {}
+        for snapshot in snapshots:
+            current[snapshot.path] = snapshot.digest
+            if self._files.get(snapshot.path) == snapshot.digest:
+                continue
+            content = snapshot.content
+            self.blobs.put(content, snapshot.digest)
+            records.append({
+                "op": "file",
+                "path": snapshot.path,
+                "digest": snapshot.digest,
+                "mtime_ns": snapshot.mtime_ns,
+                "size": snapshot.size,
+                "bytes": len(content.encode("utf-8")),
+            })
+        records.extend({"op": "drop", "path": path} for path in self._files if path not in current)
+        self._files = current
+
+        self._append(records)
+        return len(records)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        self._file.close()
+
+    def _encode(self, message: Message) -> Dict[str, str]:
+        content = message.get("content", "")
+        if len(content) <= INLINE_CHARS:
+            return {"role": message["role"], "content": content}
+        return {"role": message["role"], "blob": self.blobs.put(content)}
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            self._file.write("".join(json.dumps(record) + "\n" for record in records))
+            self._file.flush()
+
+class SessionStore:
+    """Sessions saved as journals under ``<root>/sessions`` with shared blobs.
+
+    Nothing is deleted on its own; ``prune`` bounds the store.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """Initialize the store.
+
+        Args:
+            root: Base directory; defaults to ~/.onhax
+        """
+        root = root or default_session_root()
+        self.directory = os.path.join(root, "sessions")
+        self.blobs = BlobStore(os.path.join(root, "blobs"))
+
+    def journal_path(self, session_id: str) -> str:
+        """Return the journal file of a session."""
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def sessions(self) -> List[str]:
+        """Return the ids of saved sessions, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(name[:-len(".jsonl")] for name in names if name.endswith(".jsonl"))
+
+    def latest(self) -> Optional[str]:
+        """Return the id of the most recent session, if any."""
+        sessions = self.sessions()
+        return sessions[-1] if sessions else None
+
+    def create(self) -> SessionJournal:
+        """Start a new session."""
+        os.makedirs(self.directory, exist_ok=True)
+        session_id = new_session_id()
+        return SessionJournal(self.journal_path(session_id), self.blobs, session_id)
+
+    def resume(self, session_id: str) -> SessionJournal:
+        """Reopen a saved session for appending.
+
+        The replayed session (see ``load``) is available as the journal's
+        ``state``.
+        """
+        state = self.load(session_id)
+        return SessionJournal(self.journal_path(session_id), self.blobs, session_id, state)
+
+    def load(self, session_id: str) -> SessionState:
+        """Replay a session's journal.
+
+        File contents are not read here: the records carry their digests,
+        and the blobs are only opened when a snapshot's content is needed.
+        A partially written last line is ignored.
+
+        Raises:
+            FileNotFoundError: If there is no such session
+        """
+        messages: List[Message] = []
+        files: Dict[str, FileRecord] = {}
+        with open(self.journal_path(session_id), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                op = record.get("op")
+                if op == "msg":
+                    messages.append(self._decode(record))
+                elif op == "history":
+                    messages = [self._decode(msg) for msg in record["messages"]]
+                elif op == "file":
+                    files[record["path"]] = FileRecord(
+                        record["path"], record["digest"], record["mtime_ns"], record["size"], record["bytes"]
+                    )
+                elif op == "drop":
+                    files.pop(record["path"], None)
+        return SessionState(session_id, messages, files)
+
+    def prune(
+        self, keep: int, max_bytes: Optional[int] = None, protect: Iterable[str] = ()
+    ) -> PruneResult:
+        """Delete old sessions, then the blobs no remaining session refers to.
+
+        Sessions beyond the ``keep`` most recent are deleted, and further
+        old ones while journals and blobs together take more than
+        ``max_bytes``. Blobs written in the last hour are kept even when
+        unreferenced, since a session being written elsewhere may not have
+        journaled them yet.
+
+        Args:
+            keep: Number of most recent sessions to keep
+            max_bytes: Size limit of the store; none if None
+            protect: Sessions never to delete, e.g. the current one
+
+        Returns:
+            The deleted sessions, the number of deleted blobs and the bytes freed
+
+        Raises:
+            OSError: If a journal cannot be read; nothing is deleted then
+        """
+        sessions = self.sessions()
+        protected = set(protect)
+        refs = {session_id: self._references(session_id) for session_id in sessions}
+        counts: Dict[str, int] = {}
+        for digests in refs.values():
+            for digest in digests:
+                counts[digest] = counts.get(digest, 0) + 1
+        sizes = self.blobs.sizes()
+        journal_sizes = {session_id: self._size(self.journal_path(session_id)) for session_id in sessions}
+        total = sum(sizes.values()) + sum(journal_sizes.values())
+
+        removed: List[str] = []
+        recent = set(sessions[len(sessions) - keep:]) if keep > 0 else set()
+        for session_id in sessions:
+            if session_id in protected:
+                continue
+            if session_id in recent and (max_bytes is None or total <= max_bytes):
+                break
+            try:
+                os.unlink(self.journal_path(session_id))
+            except OSError:
+                continue
+            removed.append(session_id)
+            total -= journal_sizes[session_id]
+            for digest in refs[session_id]:
+                counts[digest] -= 1
+                if not counts[digest]:
+                    total -= sizes.get(digest, 0)
+
+        freed = sum(journal_sizes[session_id] for session_id in removed)
+        blobs = 0
+        for digest in sizes:
+            if counts.get(digest):
+                continue
+            nbytes = self.blobs.remove(digest, min_age=BLOB_GRACE_SECONDS)
+            if nbytes:
+                blobs += 1
+                freed += nbytes
+        return PruneResult(removed, blobs, freed)
+
+    def _references(self, session_id: str) -> Set[str]:
+        """Return every blob a session's journal mentions.
+
+        Raises:
+            OSError: If the journal exists but cannot be read
+        """
+        digests: Set[str] = set()
+        try:
+            f = open(self.journal_path(session_id), "r", encoding="utf-8")
+        except FileNotFoundError:
+            return digests  # deleted meanwhile
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                op = record.get("op")
+                if op == "msg" and "blob" in record:
+                    digests.add(record["blob"])
+                elif op == "history":
+                    digests.update(msg["blob"] for msg in record["messages"] if "blob" in msg)
+                elif op == "file":
+                    digests.add(record["digest"])
+        return digests
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _decode(self, record: Dict[str, str]) -> Message:
+        if "blob" in record:
+            return {"role": record["role"], "content": self.blobs.get(record["blob"])}
+        return {"role": record["role"], "content": record["content"]}
@@ -0,0 +1,171 @@
+"""Incremental parsing of streamed structured assistant responses."""
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_ESCAPE = re.compile(r"\\(?:u[0-9a-fA-F]{0,4}|.)?", re.S)
+
+class ParseEvent(NamedTuple):
+    """Something useful recognized in the stream so far.
+
+    ``kind`` is ``"reply"`` for a piece of decoded ``assistant_reply`` text,
+    or the name of the list (``"files_to_create"`` / ``"files_to_edit"``)
+    a completed entry belongs to, in which case ``value`` is the entry dict.
+    """
+
+    kind: str
+    value: Any
+
+def _split_decodable(raw: str) -> Tuple[str, str]:
+    """Split raw JSON string content into a decodable prefix and a held-back tail.
+
+    The tail is a trailing escape sequence that is not complete yet,
+    including a high surrogate still waiting for its low half.
+    """
+    cut = len(raw)
+    matches = list(_ESCAPE.finditer(raw))[-2:]
+    for match in reversed(matches):
+        if match.end() != cut:
+            break
+        text = match.group()
+        incomplete = text == "\\" or (text.startswith("\\u") and len(text) < 6)
+        high_surrogate = len(text) == 6 and text[1] == "u" and 0xD800 <= int(text[2:], 16) <= 0xDBFF
+        if not (incomplete or high_surrogate):
+            break
+        cut = match.start()
+    return raw[:cut], raw[cut:]
+
+def _decode(raw: str) -> str:
+    return json.loads(f'"{raw}"', strict=False)
+
+class StreamingResponseParser:
+    """Parse an ``AssistantResponse`` JSON document while it is streamed.
+
+    Feed content deltas as they arrive. Each call returns the events that
+    became available: decoded ``assistant_reply`` text, and every
+    ``files_to_create`` / ``files_to_edit`` entry as soon as its closing
+    brace has been received. Chunks are only joined once, in ``result``.
+    """
+
+    REPLY_KEY = "assistant_reply"
+    ENTRY_KEYS = ("files_to_create", "files_to_edit")
+
+    def __init__(self):
+        """Initialize the parser state."""
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        # String state: mode is "key", "reply" or None for other strings,
+        # whose content is skipped here (entries are sliced from the chunks)
+        self._in_string = False
+        self._escape = False
+        self._string_mode: Optional[str] = None
+        self._pending = ""
+        # Entry capture state
+        self._array_key: Optional[str] = None
+        self._entry_parts: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[ParseEvent]:
+        """Consume the next piece of streamed content.
+
+        Args:
+            chunk: The content delta
+
+        Returns:
+            Events recognized in this chunk, in stream order
+        """
+        self._chunks.append(chunk)
+        events: List[ParseEvent] = []
+        entry_start = 0
+        seg_start = 0
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(chunk, i)
+                if match is None:
+                    break
+                i = match.start()
+                if chunk[i] == "\\":
+                    self._escape = True
+                    i += 1
+                    continue
+                if self._string_mode is None:
+                    self._in_string = False
+                else:
+                    self._close_string(self._pending + chunk[seg_start:i], events)
+                    self._pending = ""
+                i += 1
+                continue
+
+            ch = chunk[i]
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._string_mode = "key"
+                elif self._depth == 1 and self._key == self.REPLY_KEY:
+                    self._string_mode = "reply"
+                else:
+                    self._string_mode = None
+                seg_start = i + 1
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._array_key is not None and self._depth == 3:
+                    self._entry_parts = []
+                    entry_start = i
+            elif ch == "[":
+                self._depth += 1
+                if self._depth == 2 and self._key in self.ENTRY_KEYS:
+                    self._array_key = self._key
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._depth == 2 and self._entry_parts is not None:
+                    self._entry_parts.append(chunk[entry_start:i + 1])
+                    entry = json.loads("".join(self._entry_parts), strict=False)
+                    self._entry_parts = None
+                    events.append(ParseEvent(self._array_key, entry))
+                elif ch == "]" and self._depth == 1:
+                    self._array_key = None
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    self._expect_key = True
+            i += 1
+
+        # Only keys and the reply are kept while a string is open: other
+        # strings (file contents) can be megabytes long, and growing one
+        # str per chunk would be quadratic. The reply only ever holds back
+        # an incomplete escape sequence, keys are short.
+        if self._in_string and self._string_mode is not None:
+            self._pending += chunk[seg_start:]
+            if self._string_mode == "reply":
+                text, self._pending = _split_decodable(self._pending)
+                if text:
+                    events.append(ParseEvent("reply", _decode(text)))
+        if self._entry_parts is not None:
+            self._entry_parts.append(chunk[entry_start:])
+        return events
+
+    def _close_string(self, raw: str, events: List[ParseEvent]) -> None:
+        self._in_string = False
+        if self._string_mode == "key":
+            self._key = _decode(raw)
+        elif self._string_mode == "reply" and raw:
+            events.append(ParseEvent("reply", _decode(raw)))
+        self._string_mode = None
+
+    def result(self) -> Dict[str, Any]:
+        """Parse the complete document.
+
+        Raises:
+            json.JSONDecodeError: If the streamed content is not valid JSON
+        """
+        return json.loads("".join(self._chunks))
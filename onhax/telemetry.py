@@ -0,0 +1,268 @@
+"""Per-request latency and token telemetry."""
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .context import cache_usage
+from .logging import get_logger, log_event
+from .retry import LatencyTracker
+
+logger = get_logger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Rolling-percentile metrics: name -> (help text, Prometheus unit suffix)
+TIMINGS = {
+    "ttft": ("Time to first token", "seconds"),
+    "duration": ("Time until the response was complete", "seconds"),
+    "postprocess": ("Local processing of the response", "seconds"),
+    "tokens_per_second": ("Completion tokens per second of generation", ""),
+}
+
+COUNTERS = (
+    "requests", "errors", "request_bytes", "prompt_tokens", "completion_tokens",
+    "cache_hit_tokens", "cache_miss_tokens",
+)
+
+class RequestRecord:
+    """What was measured for one request."""
+
+    __slots__ = (
+        "source", "model", "started_at", "request_bytes", "ttft", "duration", "postprocess",
+        "prompt_tokens", "completion_tokens", "cache_hit_tokens", "cache_miss_tokens",
+        "status", "error",
+    )
+
+    def __init__(self, source: str, model: Optional[str] = None, request_bytes: int = 0):
+        """Initialize an empty record.
+
+        Args:
+            source: Which code path made the request, e.g. "client"
+            model: Model name
+            request_bytes: Size of the request body
+        """
+        self.source = source
+        self.model = model
+        self.started_at = time.time()
+        self.request_bytes = request_bytes
+        self.ttft: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.postprocess = 0.0
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.cache_hit_tokens: Optional[int] = None
+        self.cache_miss_tokens: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Completion tokens per second.
+
+        Counted from the first token when streamed; otherwise over the whole
+        request, prompt processing included, since ``ttft`` is unknown.
+        """
+        if not self.completion_tokens or self.duration is None:
+            return None
+        generating = self.duration - (self.ttft or 0.0)
+        return self.completion_tokens / generating if generating > 0 else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the record as a JSON-serializable dictionary."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["tokens_per_second"] = self.tokens_per_second
+        return data
+
+class RequestSpan:
+    """Collects the measurements of one request while it runs."""
+
+    def __init__(self, telemetry: "Telemetry", record: RequestRecord, clock: Callable[[], float]):
+        """Start timing a request; use ``Telemetry.start`` instead."""
+        self.telemetry = telemetry
+        self.record = record
+        self._clock = clock
+        self._started = clock()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def first_token(self) -> None:
+        """Mark the arrival of the first piece of output (only the first call counts)."""
+        if self.record.ttft is None:
+            self.record.ttft = self._clock() - self._started
+
+    def response_done(self) -> None:
+        """Mark the end of the response, before local processing starts."""
+        if self.record.duration is None:
+            self.record.duration = self._clock() - self._started
+
+    def set_usage(self, usage: Any) -> None:
+        """Take token counts from a response's usage dictionary or object."""
+        if not usage:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+        self.record.prompt_tokens = get("prompt_tokens")
+        self.record.completion_tokens = get("completion_tokens")
+        cache = cache_usage(usage)
+        if cache is not None:
+            self.record.cache_hit_tokens = cache.hit_tokens
+            self.record.cache_miss_tokens = cache.miss_tokens
+
+    def add_postprocess(self, seconds: float) -> None:
+        """Add time spent processing the response locally."""
+        with self._lock:
+            self.record.postprocess += seconds
+
+    @contextlib.contextmanager
+    def postprocess(self) -> Iterator[None]:
+        """Time a block of local processing of the response."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.add_postprocess(self._clock() - started)
+
+    def finish(self, status: str = "ok", error: Optional[BaseException] = None) -> RequestRecord:
+        """Complete the record and hand it to the telemetry (once).
+
+        Args:
+            status: "ok", "error" or "cached"
+            error: The exception that ended the request, if any
+        """
+        with self._lock:
+            if self._finished:
+                return self.record
+            self._finished = True
+        self.response_done()
+        self.record.status = status
+        if error is not None:
+            self.record.error = str(error) or type(error).__name__
+        self.telemetry.record(self.record)
+        return self.record
+
+class Telemetry:
+    """In-process request metrics with rolling percentiles.
+
+    Every finished request is logged as a structured ``request`` event on
+    the ``onhax.telemetry`` logger, added to per-source counters and to
+    rolling windows of its timings, and, when an export path is set,
+    written out as a Prometheus textfile (``.prom``) or JSON snapshot.
+    """
+
+    def __init__(
+        self,
+        window: int = 1000,
+        export_path: Optional[str] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """Initialize the telemetry.
+
+        Args:
+            window: Number of recent samples the percentiles are taken over
+            export_path: File rewritten after every request; Prometheus text
+                format if it ends in ".prom", JSON otherwise
+            clock: Monotonic time source
+        """
+        self.window = window
+        self.export_path = export_path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._timings: Dict[Tuple[str, str], LatencyTracker] = {}
+
+    def start(self, source: str, model: Optional[str] = None, request_bytes: int = 0) -> RequestSpan:
+        """Start measuring a request.
+
+        Args:
+            source: Which code path makes the request
+            model: Model name
+            request_bytes: Size of the request body
+        """
+        return RequestSpan(self, RequestRecord(source, model, request_bytes), self.clock)
+
+    def record(self, record: RequestRecord) -> None:
+        """Add a finished request to the metrics, log it and export."""
+        with self._lock:
+            counters = self._counters.setdefault(record.source, dict.fromkeys(COUNTERS, 0))
+            counters["requests"] += 1
+            if record.status == "error":
+                counters["errors"] += 1
+            for name in COUNTERS[2:]:
+                counters[name] += getattr(record, name) or 0
+            for name in TIMINGS:
+                value = getattr(record, name)
+                if value is None or (name == "postprocess" and record.status == "error"):
+                    continue
+                key = (record.source, name)
+                if key not in self._timings:
+                    self._timings[key] = LatencyTracker(self.window)
+                self._timings[key].record(value)
+        log_event(logger, "request", record.as_dict())
+        if self.export_path:
+            try:
+                self.export(self.export_path)
+            except OSError as e:
+                logger.warning("Could not export metrics to %s: %s", self.export_path, e)
+
+    def sources(self) -> List[str]:
+        """Return the sources that made requests."""
+        with self._lock:
+            return sorted(self._counters)
+
+    def percentile(self, source: str, name: str, fraction: float) -> Optional[float]:
+        """Return a percentile of a timing metric over the recent window."""
+        tracker = self._timings.get((source, name))
+        return tracker.percentile(fraction) if tracker is not None else None
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return counters and timing percentiles per source."""
+        result: Dict[str, Dict[str, Any]] = {}
+        for source in self.sources():
+            with self._lock:
+                entry: Dict[str, Any] = dict(self._counters[source])
+            for name in TIMINGS:
+                entry[name] = {
+                    f"p{int(q * 100)}": self.percentile(source, name, q) for q in QUANTILES
+                }
+            result[source] = entry
+        return result
+
+    def to_json(self) -> str:
+        """Return the summary as JSON."""
+        return json.dumps({"generated_at": time.time(), "sources": self.summary()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Return the summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines: List[str] = []
+        for name in COUNTERS:
+            metric = f"onhax_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for source, entry in summary.items():
+                lines.append(f'{metric}{{source="{source}"}} {entry[name]}')
+        for name, (description, unit) in TIMINGS.items():
+            metric = f"onhax_request_{name}" + (f"_{unit}" if unit else "")
+            lines.append(f"# HELP {metric} {description} (rolling window).")
+            lines.append(f"# TYPE {metric} gauge")
+            for source, entry in summary.items():
+                for q in QUANTILES:
+                    value = entry[name][f"p{int(q * 100)}"]
+                    if value is not None:
+                        lines.append(f'{metric}{{source="{source}",quantile="{q}"}} {value:.6g}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """Atomically write the metrics to a file (.prom or JSON)."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".onhax-metrics-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
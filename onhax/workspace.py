@@ -0,0 +1,440 @@
+"""Incrementally maintained index of the files in a workspace."""
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern, Set
+
+LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".html": "html",
+    ".css": "css",
+    ".json": "json",
+    ".md": "markdown",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".toml": "toml",
+    ".sh": "shell",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "java",
+    ".c": "c",
+    ".h": "c",
+    ".cpp": "cpp",
+    ".rb": "ruby",
+}
+
+ALWAYS_IGNORED = frozenset({".git", ".hg", ".svn"})
+
+class FileEntry(NamedTuple):
+    """A file known to the index."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    language: Optional[str]
+
+class IgnoreRule(NamedTuple):
+    """One compiled .gitignore pattern."""
+
+    base: str
+    regex: Pattern
+    negate: bool
+    dir_only: bool
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a glob into a regular expression over '/'-separated paths.
+
+    ``*`` and ``?`` do not cross directory boundaries, while ``**`` matches
+    any number of directories.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                if pattern.startswith("**/", i):
+                    out.append("(?:.*/)?")
+                    i += 3
+                else:
+                    out.append(".*")
+                    i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+                continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+def is_glob(pattern: str) -> bool:
+    """Check whether a path contains glob characters."""
+    return any(c in pattern for c in "*?[")
+
+def parse_gitignore(text: str, base: str = "") -> List[IgnoreRule]:
+    """Compile the patterns of a .gitignore file found in directory ``base``."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        if line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            continue
+        prefix = "^" if anchored else "(?:^|.*/)"
+        rules.append(IgnoreRule(base, re.compile(prefix + glob_to_regex(line) + "$"), negate, dir_only))
+    return rules
+
+def is_ignored(rules: List[IgnoreRule], path: str, is_dir: bool) -> bool:
+    """Apply .gitignore rules to a workspace-relative path; the last match wins."""
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        relative = path[len(rule.base) + 1:] if rule.base else path
+        if rule.regex.match(relative):
+            ignored = not rule.negate
+    return ignored
+
+class _DirState:
+    __slots__ = ("mtime_ns", "rules", "files", "subdirs")
+
+    def __init__(self, mtime_ns: int, rules: List[IgnoreRule]):
+        self.mtime_ns = mtime_ns
+        self.rules = rules
+        self.files: Set[str] = set()
+        self.subdirs: Set[str] = set()
+
+def _join(directory: str, name: str) -> str:
+    return f"{directory}/{name}" if directory else name
+
+class WorkspaceIndex:
+    """Paths, sizes, mtimes and languages of the files under a root directory.
+
+    The index honours .gitignore files at every level and is built once,
+    optionally in a background thread. ``refresh`` then only rescans
+    directories whose mtime changed (files added, removed or renamed), so
+    polling a large tree costs one stat per directory. File names map to
+    their paths in a dictionary, so resolving a bare name like
+    ``client.py`` does not touch the file system, and ``glob`` matches
+    patterns against the index instead of walking the tree.
+
+    Sizes and mtimes are those seen when a file's directory was last
+    scanned. A change to any .gitignore triggers a full rebuild. Since the
+    root may be any directory (even $HOME), the index holds at most
+    ``max_files`` files and descends at most ``max_depth`` directories;
+    ``truncated`` tells whether either limit was reached.
+
+    Every file added, modified or removed by ``refresh`` bumps
+    ``generation``; ``changes_since`` returns the paths touched after a
+    given generation, so consumers can follow the tree incrementally too.
+    """
+
+    def __init__(self, root: str, poll_interval: float = 2.0, max_files: int = 20000, max_depth: int = 16):
+        """Initialize the index.
+
+        Args:
+            root: Directory to index
+            poll_interval: Seconds between refreshes in the background thread
+            max_files: Most files indexed; the rest of the tree is left out
+            max_depth: Deepest directory level scanned below the root
+        """
+        self.root = os.path.realpath(root)
+        self.poll_interval = poll_interval
+        self.max_files = max_files
+        self.max_depth = max_depth
+        self.truncated = False
+        self.generation = 0
+        self._rebuilt = 0
+        self._changes: Dict[str, int] = {}
+        self.ready = threading.Event()
+        self._lock = threading.RLock()
+        self._entries: Dict[str, FileEntry] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._dirs: Dict[str, _DirState] = {}
+        self._ignore_files: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return self.relative(path) in self._entries
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        with self._lock:
+            return iter(list(self._entries.values()))
+
+    def relative(self, path: str) -> str:
+        """Return a path relative to the root, '/'-separated."""
+        if os.path.isabs(path):
+            path = os.path.relpath(os.path.realpath(path), self.root)
+        path = os.path.normpath(path).replace(os.sep, "/")
+        return "" if path == "." else path
+
+    def absolute(self, relative: str) -> str:
+        """Return the absolute path of an indexed file."""
+        return os.path.join(self.root, *relative.split("/"))
+
+    def get(self, path: str) -> Optional[FileEntry]:
+        """Return the entry of a file, if it is indexed."""
+        return self._entries.get(self.relative(path))
+
+    def build(self) -> None:
+        """Scan the whole tree and replace the index.
+
+        The scan fills a separate index without holding the lock, so
+        lookups keep being answered from the previous state until it is
+        swapped in.
+        """
+        fresh = WorkspaceIndex(self.root, max_files=self.max_files, max_depth=self.max_depth)
+        fresh._scan_tree("", [])
+        with self._lock:
+            self._entries, self._by_name = fresh._entries, fresh._by_name
+            self._dirs, self._ignore_files = fresh._dirs, fresh._ignore_files
+            self.truncated = fresh.truncated
+            self.generation += 1
+            self._rebuilt = self.generation
+            self._changes = {}
+        self.ready.set()
+
+    def start(self) -> None:
+        """Build the index and keep it current from a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="onhax-workspace", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the first build has finished."""
+        return self.ready.wait(timeout)
+
+    def refresh(self) -> bool:
+        """Bring the index up to date by polling directory mtimes.
+
+        Changed directories are rescanned under the lock; a full rebuild
+        (after a .gitignore change) scans without it, like ``build``.
+
+        Returns:
+            Whether anything changed
+        """
+        changed = self._refresh_dirs()
+        if changed is None:
+            self.build()
+            return True
+        return changed
+
+    def changes_since(self, generation: int) -> Optional[Set[str]]:
+        """Return the paths added, modified or removed after ``generation``.
+
+        Read ``generation`` before listing or processing the files; a change
+        made in between is then reported again rather than missed.
+
+        Returns:
+            Paths relative to the root, or None if the index was rebuilt
+            since, in which case the caller has to start over from the
+            full list of files
+        """
+        with self._lock:
+            if generation < self._rebuilt:
+                return None
+            return {path for path, changed in self._changes.items() if changed > generation}
+
+    def resolve(self, name: str) -> List[str]:
+        """Return the absolute paths of indexed files matching a mentioned name.
+
+        A bare file name matches files with that name anywhere in the tree;
+        a name with directories matches files whose path ends with it.
+        """
+        relative = name.replace(os.sep, "/").strip("/")
+        if os.path.isabs(name):
+            relative = self.relative(name)
+            return [self.absolute(relative)] if relative in self._entries else []
+        with self._lock:
+            candidates = self._by_name.get(relative.rsplit("/", 1)[-1], ())
+            if "/" in relative:
+                suffix = "/" + relative
+                candidates = [c for c in candidates if c == relative or c.endswith(suffix)]
+            return [self.absolute(c) for c in sorted(candidates)]
+
+    def glob(self, pattern: str) -> List[str]:
+        """Return the absolute paths of indexed files matching a glob.
+
+        Relative patterns are taken from the root; ``**`` spans directories.
+        """
+        if os.path.isabs(pattern):
+            pattern = os.path.relpath(pattern, self.root).replace(os.sep, "/")
+        elif pattern.startswith("./"):
+            pattern = pattern[2:]
+        regex = re.compile(glob_to_regex(pattern) + "$")
+        with self._lock:
+            return [self.absolute(path) for path in sorted(self._entries) if regex.match(path)]
+
+    def _run(self) -> None:
+        self.build()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except OSError:
+                continue
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh_dirs(self) -> Optional[bool]:
+        """Rescan changed directories; None if the index must be rebuilt instead."""
+        with self._lock:
+            for path, mtime_ns in self._ignore_files.items():
+                if self._mtime(os.path.join(self.root, path)) != mtime_ns:
+                    return None
+            changed = False
+            for directory in list(self._dirs):
+                state = self._dirs.get(directory)
+                if state is None:
+                    continue  # dropped with a parent earlier in this pass
+                mtime_ns = self._mtime(self.absolute(directory) if directory else self.root)
+                if mtime_ns is None:
+                    self._drop_dir(directory)
+                    changed = True
+                elif mtime_ns != state.mtime_ns:
+                    ignore_path = _join(directory, ".gitignore")
+                    if ignore_path not in self._ignore_files and os.path.exists(self.absolute(ignore_path)):
+                        return None
+                    self._rescan_dir(directory, state, mtime_ns)
+                    changed = True
+            return changed
+
+    def _dir_rules(self, directory: str, inherited: List[IgnoreRule]) -> List[IgnoreRule]:
+        ignore_path = _join(directory, ".gitignore")
+        absolute = self.absolute(ignore_path)
+        try:
+            with open(absolute, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            self._ignore_files[ignore_path] = os.stat(absolute).st_mtime_ns
+        except OSError:
+            return inherited
+        return inherited + parse_gitignore(text, directory)
+
+    def _scan_tree(self, directory: str, inherited: List[IgnoreRule]) -> None:
+        absolute = self.absolute(directory) if directory else self.root
+        try:
+            mtime_ns = os.stat(absolute).st_mtime_ns
+        except OSError:
+            return
+        state = _DirState(mtime_ns, self._dir_rules(directory, inherited))
+        self._dirs[directory] = state
+        for subdir in self._scan_children(directory, state):
+            self._scan_tree(subdir, state.rules)
+
+    def _scan_children(self, directory: str, state: _DirState) -> List[str]:
+        """Index the files of a directory and return its subdirectories."""
+        absolute = self.absolute(directory) if directory else self.root
+        subdirs = []
+        try:
+            with os.scandir(absolute) as it:
+                for item in it:
+                    path = _join(directory, item.name)
+                    try:
+                        is_dir = item.is_dir(follow_symlinks=False)
+                        if is_dir:
+                            if item.name in ALWAYS_IGNORED or is_ignored(state.rules, path, True):
+                                continue
+                            if path.count("/") >= self.max_depth:
+                                self.truncated = True
+                                continue
+                            state.subdirs.add(path)
+                            subdirs.append(path)
+                        elif item.is_file() and not is_ignored(state.rules, path, False):
+                            if path not in self._entries and len(self._entries) >= self.max_files:
+                                self.truncated = True
+                                continue
+                            stat = item.stat()
+                            self._add_file(path, stat.st_size, stat.st_mtime_ns)
+                            state.files.add(path)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return subdirs
+
+    def _rescan_dir(self, directory: str, state: _DirState, mtime_ns: int) -> None:
+        old_files, old_subdirs = state.files, state.subdirs
+        state.files, state.subdirs, state.mtime_ns = set(), set(), mtime_ns
+        new_subdirs = self._scan_children(directory, state)
+        for path in old_files - state.files:
+            self._remove_file(path)
+        for subdir in old_subdirs - state.subdirs:
+            self._drop_dir(subdir)
+        for subdir in new_subdirs:
+            if subdir not in self._dirs:
+                self._scan_tree(subdir, state.rules)
+
+    def _drop_dir(self, directory: str) -> None:
+        state = self._dirs.pop(directory, None)
+        if state is None:
+            return
+        self._ignore_files.pop(_join(directory, ".gitignore"), None)
+        for path in state.files:
+            self._remove_file(path)
+        for subdir in state.subdirs:
+            self._drop_dir(subdir)
+
+    def _add_file(self, path: str, size: int, mtime_ns: int) -> None:
+        name = path.rsplit("/", 1)[-1]
+        language = LANGUAGES.get(os.path.splitext(name)[1].lower())
+        entry = FileEntry(path, size, mtime_ns, language)
+        if self._entries.get(path) != entry:
+            self._entries[path] = entry
+            self._mark(path)
+        self._by_name.setdefault(name, set()).add(path)
+
+    def _remove_file(self, path: str) -> None:
+        if self._entries.pop(path, None) is None:
+            return
+        self._mark(path)
+        name = path.rsplit("/", 1)[-1]
+        paths = self._by_name.get(name)
+        if paths is not None:
+            paths.discard(path)
+            if not paths:
+                del self._by_name[name]
+
+    def _mark(self, path: str) -> None:
+        self.generation += 1
+        self._changes[path] = self.generation
@@ -8,6 +8,9 @@ setup(
     install_requires=[
         "requests>=2.25.0",
     ],
+    extras_require={
+        "retrieval": ["numpy>=1.20"],
+    },
     entry_points={
         "console_scripts": [
             "onhax=onhax.__main__:main",
@@ -0,0 +1,78 @@
+"""Shared fixtures for the onhax tests."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint that echoes the prompt back.
+
+    Latency and failures are injected per request from the server's
+    ``delays`` and ``statuses`` queues, falling back to ``delay`` and 200.
+    Streams end with ``[DONE]`` unless ``truncate_stream`` is set.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(body)
+            server.connections.add(self.client_address)
+            delay = server.delays.pop(0) if server.delays else server.delay
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(delay)
+        prompt = body["messages"][-1]["content"]
+        if body.get("stream") and status == 200:
+            self._stream(f"echo: {prompt}")
+            return
+        payload = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": f"echo: {prompt}"}}],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 2},
+        }).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, text):
+        """Send the text word by word as server-sent events."""
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in text.split(" "):
+            event = {"choices": [{"delta": {"content": word + " "}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+        if not self.server.truncate_stream:
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """Run a local DeepSeek-compatible server and point the config at it."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.connections = set()
+    server.delay = 0.0
+    server.delays = []
+    server.statuses = []
+    server.truncate_stream = False
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setenv("DEEPSEEK_BASE_URL", server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -1,5 +1,8 @@
 """Tests for the main application module."""
+import os
+import stat
 import pytest
+import requests
 from onhax.app import OnHaxApp
 
 def test_app_initialization():
@@ -23,4 +26,60 @@ def test_save_generated_code(tmp_path):
     app.save_generated_code(code, str(filename))
     
     assert filename.exists()
-    assert filename.read_text() == code
\ No newline at end of file
+    assert filename.read_text() == code
+
+def test_generate_many(stub_server):
+    """Test generating code for several prompts concurrently."""
+    app = OnHaxApp()
+    results = app.generate_many(["a", "b", "c"], concurrency=3)
+    assert results == ["echo: a", "echo: b", "echo: c"]
+
+def test_generate_code_stream(stub_server, tmp_path):
+    """Test streaming generated code straight to a file."""
+    app = OnHaxApp()
+    filename = tmp_path / "out.py"
+    written = app.save_generated_code_stream(app.generate_code_stream("stream me"), str(filename))
+    assert filename.read_text() == "echo: stream me "
+    assert written == len("echo: stream me ")
+    assert [p.name for p in tmp_path.iterdir()] == ["out.py"]
+
+def test_save_generated_code_stream_failure_keeps_old_file(stub_server, tmp_path):
+    """Test that a failed stream leaves the existing file untouched."""
+    app = OnHaxApp()
+    filename = tmp_path / "out.py"
+    filename.write_text("old")
+
+    def chunks():
+        yield "partial"
+        raise ConnectionError("stream dropped")
+
+    with pytest.raises(ConnectionError):
+        app.save_generated_code_stream(chunks(), str(filename))
+    assert filename.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.py"]
+
+def test_save_generated_code_stream_file_modes(stub_server, tmp_path):
+    """Test that new files get the umask mode and existing files keep theirs."""
+    app = OnHaxApp()
+    umask = os.umask(0o022)
+    try:
+        created = tmp_path / "new.py"
+        app.save_generated_code_stream(["x"], str(created))
+        assert stat.S_IMODE(created.stat().st_mode) == 0o644
+
+        script = tmp_path / "run.sh"
+        script.write_text("old")
+        script.chmod(0o750)
+        app.save_generated_code_stream(["new"], str(script))
+        assert stat.S_IMODE(script.stat().st_mode) == 0o750
+    finally:
+        os.umask(umask)
+
+def test_truncated_stream_is_not_saved(stub_server, tmp_path):
+    """Test that a stream ending without [DONE] raises and leaves no file behind."""
+    stub_server.truncate_stream = True
+    app = OnHaxApp()
+    filename = tmp_path / "out.py"
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        app.save_generated_code_stream(app.generate_code_stream("cut short"), str(filename))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,81 @@
+"""Tests for batch generation."""
+import json
+import os
+import stat
+import pytest
+from onhax.app import OnHaxApp
+from onhax.batch import completed_ids, read_records, run_batch, write_output
+
+def write_prompts(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+def read_manifest(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_run_batch_writes_outputs_and_manifest(stub_server, tmp_path):
+    """Test that every record is generated and recorded."""
+    prompts = tmp_path / "prompts.jsonl"
+    records = [{"prompt": f"p{i}", "output": str(tmp_path / "out" / f"{i}.py")} for i in range(6)]
+    write_prompts(prompts, records)
+
+    summary = run_batch(OnHaxApp(), str(prompts), concurrency=3)
+
+    assert summary == (6, 0, 0)
+    for i in range(6):
+        assert (tmp_path / "out" / f"{i}.py").read_text() == f"echo: p{i}"
+    manifest = read_manifest(tmp_path / "prompts.jsonl.manifest.jsonl")
+    assert {entry["status"] for entry in manifest} == {"ok"}
+    assert all(entry["completion_tokens"] == 2 and entry["latency"] >= 0 for entry in manifest)
+
+def test_run_batch_resumes_from_manifest(stub_server, tmp_path):
+    """Test that finished records are not redone after a failure."""
+    prompts = tmp_path / "prompts.jsonl"
+    manifest = tmp_path / "manifest.jsonl"
+    write_prompts(prompts, [
+        {"id": "a", "prompt": "a", "output": str(tmp_path / "a.py")},
+        {"id": "b", "prompt": "b", "output": str(tmp_path / "b.py")},
+    ])
+    stub_server.statuses = [400]
+
+    first = run_batch(OnHaxApp(), str(prompts), str(manifest), concurrency=1)
+    assert first == (1, 1, 0)
+    assert completed_ids(str(manifest)) == {"b"}
+
+    second = run_batch(OnHaxApp(), str(prompts), str(manifest), concurrency=1)
+    assert second == (1, 0, 1)
+    assert [r["messages"][0]["content"] for r in stub_server.requests] == ["a", "b", "a"]
+    assert completed_ids(str(manifest)) == {"a", "b"}
+
+def test_completed_ids_ignores_torn_line(tmp_path):
+    """Test that a partially written manifest line is ignored."""
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"id": "a", "status": "ok"}\n{"id": "b", "sta')
+    assert completed_ids(str(manifest)) == {"a"}
+
+def test_resume_after_torn_line_keeps_new_entries_readable(stub_server, tmp_path):
+    """Test that entries appended after a torn line start on a new line."""
+    prompts = tmp_path / "prompts.jsonl"
+    manifest = tmp_path / "manifest.jsonl"
+    write_prompts(prompts, [{"id": "a", "prompt": "a", "output": str(tmp_path / "a.py")}])
+    manifest.write_text('{"id": "b", "sta')
+
+    assert run_batch(OnHaxApp(), str(prompts), str(manifest), concurrency=1) == (1, 0, 0)
+    assert completed_ids(str(manifest)) == {"a"}
+    assert run_batch(OnHaxApp(), str(prompts), str(manifest), concurrency=1) == (0, 0, 1)
+
+def test_read_records_validates(tmp_path):
+    """Test that records without an output are rejected."""
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text('{"prompt": "x"}\n')
+    with pytest.raises(ValueError):
+        list(read_records(str(prompts)))
+
+def test_write_output_keeps_mode_and_leaves_no_temp_files(tmp_path):
+    """Test that outputs are replaced atomically without losing their mode."""
+    target = tmp_path / "out" / "tool.py"
+    write_output(str(target), "first")
+    target.chmod(0o755)
+    write_output(str(target), "second")
+    assert target.read_text() == "second"
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o755
+    assert os.listdir(tmp_path / "out") == ["tool.py"]
@@ -0,0 +1,42 @@
+"""Smoke tests for the offline benchmark suite."""
+import json
+import subprocess
+import sys
+import requests
+from benchmarks.__main__ import flatten
+from benchmarks.common import ROOT
+from benchmarks.mock_server import MockDeepSeekServer
+
+def test_mock_server_streams_usage():
+    """Test that the mock server streams tokens and reports usage."""
+    with MockDeepSeekServer(rate=0, latency=0, words=5) as server:
+        response = requests.post(f"{server.url}/chat/completions", json={
+            "messages": [{"role": "user", "content": "hi"}],
+            "stream": True, "stream_options": {"include_usage": True},
+        })
+    events = [json.loads(line[6:]) for line in response.text.splitlines()
+              if line.startswith("data: {")]
+    text = "".join(e["choices"][0]["delta"]["content"] for e in events if e["choices"])
+    assert json.loads(text)["assistant_reply"].startswith("word0 word1")
+    assert events[-1]["usage"]["completion_tokens"] == len(events) - 1
+
+def test_flatten_labels_results():
+    """Test that result lists are labelled by their first field."""
+    document = {"client": {"results": [{"concurrency": 4, "latency": {"p50": 0.1}}]}}
+    assert dict(flatten(document)) == {
+        "client.results[concurrency=4].concurrency": 4.0,
+        "client.results[concurrency=4].latency.p50": 0.1,
+    }
+
+def test_quick_suite(tmp_path):
+    """Test that the quick suite runs offline and writes JSON results."""
+    output = tmp_path / "results.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks", "--quick", "--only", "stream,client,edits,history",
+         "--output", str(output)],
+        cwd=ROOT, check=True, capture_output=True, timeout=300,
+    )
+    document = json.loads(output.read_text())
+    assert set(document["benchmarks"]) == {"stream", "client", "edits", "history"}
+    assert document["benchmarks"]["stream"]["results"][0]["tokens_per_second_p50"] > 0
+    assert document["environment"]["python"]
@@ -0,0 +1,117 @@
+"""Tests for the response cache."""
+import logging
+import multiprocessing
+import os
+import time
+from onhax.cache import ResponseCache
+from onhax.client import DeepSeekClient
+from onhax.config import Config
+
+def test_make_key_is_canonical():
+    """Test that key order does not change the cache key."""
+    a = ResponseCache.make_key({"model": "m", "messages": [], "temperature": 0})
+    b = ResponseCache.make_key({"temperature": 0, "messages": [], "model": "m"})
+    assert a == b
+    assert a != ResponseCache.make_key({"model": "m", "messages": [], "temperature": 1})
+
+def test_make_key_covers_endpoint():
+    """Test that the same body sent to different endpoints gets different keys."""
+    payload = {"model": "m", "messages": []}
+    assert (ResponseCache.make_key(payload, "https://a.example/chat/completions")
+            != ResponseCache.make_key(payload, "https://b.example/chat/completions"))
+
+def test_callers_cannot_modify_cached_responses(tmp_path):
+    """Test that mutating a stored or returned response leaves the cache intact."""
+    cache = ResponseCache(str(tmp_path))
+    response = {"choices": [{"text": "a"}]}
+    cache.set("c" * 64, response)
+    response["choices"].append({"text": "b"})
+    cache.get("c" * 64)["choices"][0]["text"] = "changed"
+    assert cache.get("c" * 64) == {"choices": [{"text": "a"}]}
+
+    fresh = ResponseCache(str(tmp_path))
+    fresh.get("c" * 64)["choices"].clear()
+    assert fresh.get("c" * 64) == {"choices": [{"text": "a"}]}
+
+def test_overwrite_is_not_counted_twice(tmp_path):
+    """Test that rewriting an entry does not inflate the tracked disk size."""
+    cache = ResponseCache(str(tmp_path), max_disk_bytes=1000)
+    for _ in range(20):
+        cache.set("d" * 64, {"blob": "x" * 100})
+    assert cache._disk_bytes == os.path.getsize(cache._path("d" * 64))
+
+def test_memory_and_disk_tiers(tmp_path):
+    """Test hits from memory and, in a new instance, from disk."""
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get("k" * 64) is None
+    cache.set("k" * 64, {"answer": 42})
+    assert cache.get("k" * 64) == {"answer": 42}
+
+    fresh = ResponseCache(str(tmp_path))
+    assert fresh.get("k" * 64) == {"answer": 42}
+    assert cache.stats() == {"hits": 1, "memory_hits": 1, "disk_hits": 0, "misses": 1}
+    assert fresh.stats()["disk_hits"] == 1
+
+def test_ttl_expiry(tmp_path):
+    """Test that expired entries are not served."""
+    cache = ResponseCache(str(tmp_path), ttl=0.05)
+    cache.set("a" * 64, {"x": 1})
+    time.sleep(0.1)
+    assert cache.get("a" * 64) is None
+    assert ResponseCache(str(tmp_path), ttl=0.05).get("a" * 64) is None
+
+def test_disk_size_eviction(tmp_path):
+    """Test that the oldest entries are evicted past the size limit."""
+    cache = ResponseCache(str(tmp_path), max_memory_entries=1, max_disk_bytes=2000)
+    for i in range(20):
+        key = f"{i:064d}"
+        cache.set(key, {"blob": "x" * 200})
+        os.utime(cache._path(key), (i, i))
+    total = sum(os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(tmp_path) for name in names)
+    assert total <= 2000
+    assert ResponseCache(str(tmp_path)).get(f"{19:064d}") is not None
+    assert ResponseCache(str(tmp_path)).get(f"{0:064d}") is None
+
+def _writer(directory, worker):
+    cache = ResponseCache(directory, max_disk_bytes=20000)
+    for i in range(50):
+        cache.set(f"{i % 10:064d}", {"worker": worker, "i": i})
+        cache.get(f"{(i + 3) % 10:064d}")
+
+def test_concurrent_processes(tmp_path):
+    """Test that several processes can share one cache directory."""
+    workers = [multiprocessing.Process(target=_writer, args=(str(tmp_path), n)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    cache = ResponseCache(str(tmp_path))
+    assert all(cache.get(f"{i:064d}") is not None for i in range(10))
+
+def test_client_uses_cache(stub_server, tmp_path):
+    """Test that repeated queries are served from the cache unless bypassed."""
+    cache = ResponseCache(str(tmp_path))
+    client = DeepSeekClient(Config(), cache=cache)
+    first = client.query("hello")
+    assert client.query("hello") == first
+    assert len(stub_server.requests) == 1
+    client.query("hello", use_cache=False)
+    assert len(stub_server.requests) == 2
+    assert cache.hits == 1
+
+def test_client_survives_cache_errors(stub_server, tmp_path, monkeypatch, caplog):
+    """Test that a failing cache is logged and the response still returned."""
+    cache = ResponseCache(str(tmp_path))
+
+    def broken(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(cache, "get", broken)
+    monkeypatch.setattr(cache, "set", broken)
+    client = DeepSeekClient(Config(), cache=cache)
+    with caplog.at_level(logging.WARNING, logger="onhax.client"):
+        assert client.query("hello")
+    assert len(stub_server.requests) == 1
+    assert "Response cache write failed" in caplog.text
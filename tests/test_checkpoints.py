@@ -0,0 +1,110 @@
+"""Tests for checkpointed, resumable installer runs."""
+import threading
+
+import pytest
+
+from onhax.installer.checkpoints import Checkpoints, file_digest, fingerprint
+from onhax.installer.scheduler import DONE, SKIPPED, Scheduler, Step, StepFailed, downstream
+
+def make_steps(calls, inputs, fail=()):
+    def action(name):
+        def run():
+            calls.append(name)
+            if name in fail:
+                raise RuntimeError(f"{name} broke")
+        return run
+
+    def step(name, requires=()):
+        return Step(name, action(name), requires, inputs=lambda: inputs.get(name))
+
+    return [
+        Step("check", action("check")),
+        step("clone", ("check",)),
+        step("python", ("clone",)),
+        step("frontend", ("clone",)),
+        Step("verify", action("verify"), ("python", "frontend")),
+    ]
+
+def test_journal_persists_per_scope(tmpdir):
+    path = str(tmpdir.join("checkpoints.json"))
+    journal = Checkpoints(path, "/opt/a")
+    journal.record("clone", "abc", 1.5)
+    Checkpoints(path, "/opt/b").record("clone", "other")
+
+    reloaded = Checkpoints(path, "/opt/a")
+    assert reloaded.is_fresh("clone", "abc")
+    assert not reloaded.is_fresh("clone", "other")
+    reloaded.discard("clone")
+    assert not Checkpoints(path, "/opt/a").is_fresh("clone", "abc")
+    assert Checkpoints(path, "/opt/b").is_fresh("clone", "other")
+
+def test_concurrent_scopes_do_not_lose_updates(tmpdir):
+    path = str(tmpdir.join("checkpoints.json"))
+    journals = [Checkpoints(path, f"/opt/{i}") for i in range(8)]
+
+    def record(journal):
+        for step in range(10):
+            journal.record(f"step{step}", "done")
+
+    threads = [threading.Thread(target=record, args=(journal,)) for journal in journals]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(8):
+        assert Checkpoints(path, f"/opt/{i}").is_fresh("step9", "done")
+    assert sorted(p.basename for p in tmpdir.listdir()) == ["checkpoints.json", "checkpoints.json.lock"]
+
+def test_fingerprint_helpers(tmpdir):
+    assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+    assert file_digest(str(tmpdir.join("missing"))) is None
+    lock = tmpdir.join("package-lock.json")
+    lock.write("{}")
+    assert len(file_digest(str(lock))) == 64
+
+def test_failed_run_resumes_at_the_failed_step(tmpdir):
+    journal = Checkpoints(str(tmpdir.join("checkpoints.json")), "install")
+    inputs = {"clone": "commit-1", "python": "req-1", "frontend": "lock-1"}
+
+    calls = []
+    with pytest.raises(StepFailed):
+        Scheduler(make_steps(calls, inputs, fail={"frontend"}), max_workers=1, checkpoints=journal).run()
+    assert "verify" not in calls
+
+    calls = []
+    results = Scheduler(make_steps(calls, inputs), max_workers=1, checkpoints=journal).run()
+    assert calls == ["check", "frontend", "verify"]
+    assert results["clone"].status == SKIPPED
+    assert results["python"].status == SKIPPED
+    assert results["frontend"].status == DONE
+
+def test_changed_inputs_rerun_the_step_and_its_dependents(tmpdir):
+    journal = Checkpoints(str(tmpdir.join("checkpoints.json")), "install")
+    inputs = {"clone": "commit-1", "python": "req-1", "frontend": "lock-1"}
+    Scheduler(make_steps([], inputs), checkpoints=journal).run()
+
+    calls = []
+    Scheduler(make_steps(calls, dict(inputs, python="req-2")), max_workers=1, checkpoints=journal).run()
+    assert calls == ["check", "python", "verify"]
+
+    calls = []
+    Scheduler(make_steps(calls, dict(inputs, clone="commit-2", python="req-2")),
+              max_workers=1, checkpoints=journal).run()
+    assert sorted(calls) == ["check", "clone", "frontend", "python", "verify"]
+
+def test_force_and_from_step(tmpdir):
+    journal = Checkpoints(str(tmpdir.join("checkpoints.json")), "install")
+    inputs = {"clone": "commit-1", "python": "req-1", "frontend": "lock-1"}
+    Scheduler(make_steps([], inputs), checkpoints=journal).run()
+
+    calls = []
+    Scheduler(make_steps(calls, inputs), max_workers=1, checkpoints=journal, force={"python"}).run()
+    assert calls == ["check", "python", "verify"]
+
+    steps = make_steps([], inputs)
+    assert downstream(steps, "clone") == {"clone", "python", "frontend", "verify"}
+    with pytest.raises(ValueError, match="Unknown step"):
+        downstream(steps, "nope")
+    with pytest.raises(ValueError, match="Unknown step"):
+        Scheduler(steps, force={"nope"})
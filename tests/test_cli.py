@@ -0,0 +1,25 @@
+"""Tests for the python -m onhax command line."""
+import sys
+from onhax.__main__ import main
+
+def run_cli(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["onhax", *argv])
+    main()
+
+def test_cli_uses_cache_when_configured(stub_server, tmp_path, monkeypatch, capsys):
+    """Test that a configured response cache answers a repeated prompt."""
+    monkeypatch.setenv("ONHAX_CACHE_DIR", str(tmp_path / "cache"))
+    output = tmp_path / "out.py"
+    run_cli(monkeypatch, "hello", str(output))
+    run_cli(monkeypatch, "hello", str(output))
+    assert len(stub_server.requests) == 1
+    assert output.read_text() == "echo: hello"
+    assert "Generated code saved" in capsys.readouterr().out
+
+def test_cli_streams_without_cache(stub_server, tmp_path, monkeypatch):
+    """Test that the default streaming path is used when no cache is set."""
+    monkeypatch.delenv("ONHAX_CACHE_DIR", raising=False)
+    output = tmp_path / "out.py"
+    run_cli(monkeypatch, "hello", str(output))
+    assert stub_server.requests[0].get("stream") is True
+    assert output.read_text().strip() == "echo: hello"
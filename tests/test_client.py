@@ -1,6 +1,10 @@
 """Tests for the API client module."""
+import asyncio
+import time
 import pytest
-from onhax.client import DeepSeekClient
+import requests
+from onhax.client import AsyncDeepSeekClient, DeepSeekClient, iter_sse_data
+from onhax.retry import Deadline, HedgePolicy, RetryPolicy
 from onhax.config import Config
 
 def test_client_initialization():
@@ -17,4 +21,127 @@ def test_query():
     
     result = client.query("Test prompt")
     assert isinstance(result, dict)
-    assert "response" in result
\ No newline at end of file
+    assert "response" in result
+
+def test_query_stub_server(stub_server):
+    """Test a query against the local stub server."""
+    client = DeepSeekClient(Config())
+    result = client.query("hello", timeout=5)
+    assert result["choices"][0]["message"]["content"] == "echo: hello"
+    assert stub_server.requests[0]["model"] == "deepseek-chat"
+
+def test_async_query_concurrent(stub_server):
+    """Test that async queries run concurrently over pooled connections."""
+    stub_server.delay = 0.2
+
+    async def run():
+        async with AsyncDeepSeekClient(Config(), max_connections=4) as client:
+            return await asyncio.gather(*(client.query(f"p{i}") for i in range(8)))
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    elapsed = time.monotonic() - started
+
+    assert [r["choices"][0]["message"]["content"] for r in results] == [f"echo: p{i}" for i in range(8)]
+    assert elapsed < 1.2
+    assert len(stub_server.connections) <= 4
+
+def test_async_query_deadline(stub_server):
+    """Test that a per-request deadline is enforced."""
+    stub_server.delay = 1.0
+
+    async def run():
+        async with AsyncDeepSeekClient(Config()) as client:
+            return await client.query("slow", timeout=0.1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+
+def test_close_waits_for_running_requests(stub_server):
+    """Test that closing does not pull the session from under an abandoned request."""
+    stub_server.delay = 0.3
+    closed = []
+
+    async def run():
+        client = AsyncDeepSeekClient(Config())
+        session_close = client.client.session.close
+        client.client.session.close = lambda: (closed.append(len(stub_server.requests)), session_close())
+        task = asyncio.ensure_future(client.query("abandoned"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        started = time.monotonic()
+        await client.aclose()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.2
+    assert closed == [1]
+
+def test_retry_after_server_error(stub_server):
+    """Test that a 503 is retried with backoff."""
+    stub_server.statuses = [503, 503]
+    client = DeepSeekClient(Config(), retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+    result = client.query("again", timeout=5)
+    assert result["choices"][0]["message"]["content"] == "echo: again"
+    assert len(stub_server.requests) == 3
+
+def test_client_error_not_retried(stub_server):
+    """Test that a 400 fails immediately."""
+    stub_server.statuses = [400]
+    client = DeepSeekClient(Config(), retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+    with pytest.raises(requests.HTTPError):
+        client.query("bad", timeout=5)
+    assert len(stub_server.requests) == 1
+
+def test_hedged_request_beats_stall(stub_server):
+    """Test that a hedge returns while the first request is stalled."""
+    stub_server.delays = [3.0]
+    client = DeepSeekClient(Config(), hedge=HedgePolicy(initial_delay=0.1))
+    started = time.monotonic()
+    result = client.query("hedge", timeout=5)
+    assert time.monotonic() - started < 1.5
+    assert result["choices"][0]["message"]["content"] == "echo: hedge"
+    assert len(stub_server.requests) == 2
+
+def test_async_hedged_request_beats_stall(stub_server):
+    """Test hedging on the async path."""
+    stub_server.delays = [3.0]
+
+    async def run():
+        async with AsyncDeepSeekClient(Config(), hedge=HedgePolicy(initial_delay=0.1)) as client:
+            started = time.monotonic()
+            result = await client.query("hedge", timeout=5)
+            # Closing waits for the stalled attempt, so time the answer only
+            return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(run())
+    assert elapsed < 1.5
+    assert result["choices"][0]["message"]["content"] == "echo: hedge"
+
+def test_deadline_bounds_retries(stub_server):
+    """Test that retries stop once the overall deadline has passed."""
+    stub_server.delay = 0.3
+    stub_server.statuses = [503] * 10
+    client = DeepSeekClient(Config(), retry=RetryPolicy(max_attempts=10, base_delay=0.01))
+    started = time.monotonic()
+    with pytest.raises(requests.RequestException):
+        client.query("slow", deadline=Deadline(0.5))
+    assert time.monotonic() - started < 1.5
+    assert len(stub_server.requests) < 10
+
+def test_iter_sse_data():
+    """Test parsing of server-sent event payloads."""
+    lines = [": comment", "data: one", "", "event: x", "data: two", "data: lines", "", "data: [DONE]", "", "data: after"]
+    assert list(iter_sse_data(lines)) == ["one", "two\nlines"]
+
+def test_stream_stub_server(stub_server):
+    """Test streaming text deltas from the stub server."""
+    client = DeepSeekClient(Config())
+    chunks = list(client.stream("hello world é", timeout=5))
+    assert len(chunks) == 4
+    assert "".join(chunks) == "echo: hello world é "
+    assert stub_server.requests[0]["stream"] is True
+
+def test_iter_sse_data_without_done():
+    """Test that a stream cut short before [DONE] is an error."""
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        list(iter_sse_data(["data: one", "", "data: two"]))
@@ -0,0 +1,128 @@
+"""Tests for the context window module."""
+import pytest
+from onhax.context import (
+    ContextWindow, PrefixAssembler, cache_usage, estimate_tokens, file_snapshot_path
+)
+
+def snapshot(path, content):
+    return {"role": "system", "content": f"Content of file '{path}':\n\n{content}"}
+
+def test_estimate_tokens():
+    """Test the character based token estimate."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+def test_file_snapshot_path():
+    """Test extracting the path from a file snapshot message."""
+    assert file_snapshot_path(snapshot("/tmp/a.py", "x")) == "/tmp/a.py"
+    assert file_snapshot_path({"role": "user", "content": "Content of file '/tmp/a.py'"}) is None
+
+def test_file_snapshot_path_with_quotes():
+    """Test that a path containing apostrophes is read whole."""
+    path = "/home/o'brien/it's.py"
+    assert file_snapshot_path(snapshot(path, "x = 'a':\n")) == path
+
+def test_superseded_snapshots_dropped():
+    """Test that only the latest snapshot of a file is kept."""
+    window = ContextWindow(budget_tokens=10000)
+    messages = [
+        {"role": "system", "content": "prompt"},
+        snapshot("/tmp/a.py", "old"),
+        {"role": "user", "content": "edit it"},
+        snapshot("/tmp/a.py", "new"),
+        {"role": "user", "content": "again"},
+    ]
+    result, stats = window.prepare(messages)
+    assert stats.dropped_snapshots == 1
+    assert [m["content"] for m in result if file_snapshot_path(m)] == [
+        "Content of file '/tmp/a.py':\n\nnew"
+    ]
+    assert result[0]["content"] == "prompt"
+    assert result[-1]["content"] == "again"
+
+def test_evict_oldest_turns():
+    """Test that the oldest turns are evicted to fit the budget."""
+    window = ContextWindow(budget_tokens=60, message_overhead=0)
+    messages = [{"role": "system", "content": "prompt"}]
+    messages += [{"role": "user", "content": f"turn {i} " + "x" * 80} for i in range(5)]
+    result, stats = window.prepare(messages)
+    assert stats.tokens <= 60
+    assert stats.evicted == 3
+    assert stats.saved_tokens > 0
+    assert result[0]["content"] == "prompt"
+    assert result[-1]["content"].startswith("turn 4")
+
+def test_reserved_tokens_are_kept_free():
+    """Test that trimming leaves room for content added afterwards."""
+    window = ContextWindow(budget_tokens=100, message_overhead=0)
+    messages = [{"role": "system", "content": "prompt"}]
+    messages += [{"role": "user", "content": "x" * 80} for _ in range(4)]
+    result, stats = window.prepare(messages, reserve_tokens=40)
+    assert stats.tokens <= 60
+    assert stats.evicted == 2
+    assert window.prepare(messages)[1].evicted == 0
+
+def test_compact_policy_shortens_before_evicting():
+    """Test that the compact policy truncates old turns instead of dropping them."""
+    window = ContextWindow(budget_tokens=50, policy="compact", compact_chars=20, message_overhead=0)
+    messages = [
+        {"role": "system", "content": "prompt"},
+        {"role": "assistant", "content": "a" * 400},
+        {"role": "user", "content": "latest"},
+    ]
+    result, stats = window.prepare(messages)
+    assert stats.compacted == 1
+    assert stats.evicted == 0
+    assert "characters compacted" in result[1]["content"]
+
+def test_invalid_policy():
+    """Test that unknown policies are rejected."""
+    with pytest.raises(ValueError):
+        ContextWindow(policy="summarize")
+
+def test_low_watermark_evicts_further():
+    """Test that trimming goes down to the low watermark once over budget."""
+    messages = [{"role": "system", "content": "prompt"}]
+    messages += [{"role": "user", "content": "x" * 40} for _ in range(10)]
+    window = ContextWindow(budget_tokens=100, message_overhead=0, low_watermark=0.5)
+    result, stats = window.prepare(messages)
+    assert stats.tokens <= 50
+    # Under budget nothing is trimmed, even above the watermark
+    result, stats = window.prepare(messages[:9])
+    assert stats.evicted == 0
+    with pytest.raises(ValueError):
+        ContextWindow(low_watermark=0)
+
+def test_prefix_assembler_appends_new_messages():
+    """Test that sent messages keep their order and new ones go last."""
+    assembler = PrefixAssembler()
+    system = {"role": "system", "content": "prompt"}
+    a_v1 = snapshot("/a.py", "v1")
+    first = {"role": "user", "content": "one"}
+    sent = assembler.assemble([system], [a_v1], [first])
+    assert sent == [system, a_v1, first]
+    assembler.record(sent)
+
+    reply = {"role": "assistant", "content": "done"}
+    b = snapshot("/b.py", "b")
+    second = {"role": "user", "content": "two"}
+    sent2 = assembler.assemble([system], [b, a_v1], [first, reply, second])
+    assert sent2 == [system, a_v1, first, reply, b, second]
+    assert assembler.shared_prefix(sent2) == 3
+    assembler.record(sent2)
+
+    # A changed snapshot leaves its old position and is appended
+    a_v2 = snapshot("/a.py", "v2")
+    third = {"role": "user", "content": "three"}
+    sent3 = assembler.assemble([system], [b, a_v2], [first, reply, second, third])
+    assert sent3 == [system, first, reply, b, second, a_v2, third]
+    assert assembler.shared_prefix(sent3) == 1
+
+def test_cache_usage():
+    """Test reading DeepSeek and OpenAI style cache counters."""
+    usage = cache_usage({"prompt_cache_hit_tokens": 30, "prompt_cache_miss_tokens": 10})
+    assert usage.prompt_tokens == 40
+    assert usage.hit_ratio == 0.75
+    assert cache_usage({"prompt_tokens": 50, "prompt_tokens_details": {"cached_tokens": 20}}).miss_tokens == 30
+    assert cache_usage({"prompt_tokens": 50}) is None
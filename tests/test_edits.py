@@ -0,0 +1,83 @@
+"""Tests for the single-pass edit engine."""
+import os
+import stat
+from onhax.edits import Edit, apply_edits, apply_file_edits, group_edits
+
+def test_edits_located_against_original():
+    """Test that edits do not see each other's replacements."""
+    content, applied, failures = apply_edits("a b c", [Edit("a", "b"), Edit("b", "X")])
+    assert content == "b X c"
+    assert applied == 2
+    assert failures == []
+
+def test_repeated_snippets_take_successive_occurrences():
+    """Test that identical snippets map to successive occurrences."""
+    content, applied, _ = apply_edits("x = 1\nx = 1\n", [Edit("x = 1", "x = 2"), Edit("x = 1", "x = 3")])
+    assert content == "x = 2\nx = 3\n"
+    assert applied == 2
+
+def test_overlapping_edit_rejected():
+    """Test that an edit overlapping an earlier one is reported."""
+    content, applied, failures = apply_edits("hello world", [Edit("hello world", "hi"), Edit("world", "there")])
+    assert content == "hi"
+    assert applied == 1
+    assert [(f.index, f.reason) for f in failures] == [(1, "overlaps another edit")]
+
+def test_missing_snippet_reported():
+    """Test that a snippet that does not occur is reported."""
+    content, applied, failures = apply_edits("abc", [Edit("zzz", "y"), Edit("", "y")])
+    assert content == "abc"
+    assert applied == 0
+    assert [f.reason for f in failures] == ["snippet not found", "empty snippet"]
+
+def test_whitespace_tolerant_matching():
+    """Test matching a snippet whose spacing between tokens differs from the file."""
+    original = "def f():\n    return  1\n"
+    snippet = "def f():\n    return 1"
+    assert apply_edits(original, [Edit(snippet, "def f():\n    return 2")])[1] == 0
+    content, applied, _ = apply_edits(original, [Edit(snippet, "def f():\n    return 2")], whitespace_tolerant=True)
+    assert applied == 1
+    assert content == "def f():\n    return 2\n"
+
+def test_whitespace_tolerant_reindents_replacement():
+    """Test that a snippet indented less than the file is shifted back into place."""
+    original = "def f():\n        if x:\n            return 1\n\n"
+    edit = Edit("    if x:\n        return 1\n", "    if x:\n        return 2\n")
+    content, applied, _ = apply_edits(original, [edit], whitespace_tolerant=True)
+    assert applied == 1
+    assert content == "def f():\n        if x:\n            return 2\n\n"
+
+    original = "class A:\n\tdef f(self):\n\t\treturn 1\n"
+    edit = Edit("\t\tdef f(self):\n\t\t\treturn 1", "\t\tdef f(self):\n\t\t\treturn 2")
+    content, applied, _ = apply_edits(original, [edit], whitespace_tolerant=True)
+    assert content == "class A:\n\tdef f(self):\n\t\treturn 2\n"
+
+def test_whitespace_tolerant_refuses_inconsistent_indentation():
+    """Test that tab and space indentation are never mixed by an edit."""
+    original = "def f():\n        if x:\n            return 1"
+    edit = Edit("\tif x:\n\t\treturn 1", "\tif x:\n\t\treturn 2")
+    content, applied, failures = apply_edits(original, [edit], whitespace_tolerant=True)
+    assert (content, applied) == (original, 0)
+    assert [f.reason for f in failures] == ["snippet not found"]
+
+    # The replacement cannot lose an indent it does not have
+    original = "if x:\n    return 1\n"
+    edit = Edit("        return 1", "return 2")
+    assert apply_edits(original, [edit], whitespace_tolerant=True)[1] == 0
+
+def test_apply_file_edits_single_atomic_write(tmp_path):
+    """Test that a file is rewritten once, keeping its mode."""
+    path = tmp_path / "script.sh"
+    path.write_text("echo a\necho b\n")
+    os.chmod(path, 0o755)
+    result = apply_file_edits(str(path), [Edit("echo a", "echo A"), Edit("echo b", "echo B")])
+    assert result.applied == 2
+    assert path.read_text() == "echo A\necho B\n"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
+    assert [p.name for p in tmp_path.iterdir()] == ["script.sh"]
+
+def test_group_edits_keeps_order():
+    """Test grouping edits by file."""
+    grouped = group_edits([("b", Edit("1", "2")), ("a", Edit("3", "4")), ("b", Edit("5", "6"))])
+    assert list(grouped) == ["b", "a"]
+    assert grouped["b"] == [Edit("1", "2"), Edit("5", "6")]
@@ -0,0 +1,117 @@
+"""Tests for concurrent image pulls."""
+import threading
+import time
+
+import pytest
+from docker.errors import ImageNotFound
+
+from onhax.installer.config import Config
+from onhax.installer.images import PULLED, SKIPPED, ImagePuller, split_reference
+from onhax.installer.setup import DifyInstaller
+
+class FakeImage:
+    def __init__(self, digests):
+        self.attrs = {"RepoDigests": digests}
+
+class FakeRegistryData:
+    def __init__(self, digest):
+        self.id = digest
+
+class FakeImages:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, ref):
+        if ref not in self.client.local:
+            raise ImageNotFound(ref)
+        return FakeImage(self.client.local[ref])
+
+    def get_registry_data(self, ref):
+        return FakeRegistryData(self.client.remote[ref])
+
+class FakeApi:
+    def __init__(self, client):
+        self.client = client
+
+    def pull(self, repository, tag=None, stream=False, decode=False):
+        assert stream and decode
+        self.client.pulled.append(f"{repository}:{tag}")
+        self.client.active += 1
+        self.client.max_active = max(self.client.max_active, self.client.active)
+        try:
+            yield {"status": f"Pulling from library/{repository}", "id": tag}
+            for layer in ("aaa", "bbb"):
+                yield {"status": "Pulling fs layer", "id": layer}
+            for current in (50, 100):
+                time.sleep(0.05)
+                for layer in ("aaa", "bbb"):
+                    yield {"status": "Downloading", "id": layer,
+                           "progressDetail": {"current": current, "total": 100}}
+            if repository in self.client.broken:
+                yield {"error": "manifest unknown"}
+            for layer in ("aaa", "bbb"):
+                yield {"status": "Pull complete", "id": layer}
+        finally:
+            self.client.active -= 1
+
+class FakeDockerClient:
+    def __init__(self, local=None, remote=None, broken=()):
+        self.local = local or {}
+        self.remote = remote or {}
+        self.broken = set(broken)
+        self.pulled = []
+        self.active = 0
+        self.max_active = 0
+        self.images = FakeImages(self)
+        self.api = FakeApi(self)
+
+def test_split_reference():
+    assert split_reference("postgres:14") == ("postgres", "14", None)
+    assert split_reference("redis") == ("redis", None, None)
+    assert split_reference("localhost:5000/app") == ("localhost:5000/app", None, None)
+    assert split_reference("postgres:14@sha256:abc") == ("postgres", "14", "sha256:abc")
+
+def test_pulls_concurrently_and_skips_current_images():
+    client = FakeDockerClient(
+        local={"redis:6": ["redis@sha256:current"], "nginx:1": ["nginx@sha256:old"]},
+        remote={"redis:6": "sha256:current", "nginx:1": "sha256:new"},
+    )
+    results = ImagePuller(client).pull(["postgres:14", "redis:6", "nginx:1", "postgres:14"])
+    assert results == {"postgres:14": PULLED, "redis:6": SKIPPED, "nginx:1": PULLED}
+    assert sorted(client.pulled) == ["nginx:1", "postgres:14"]
+    assert client.max_active == 2
+
+def test_pinned_digest_is_checked_locally():
+    client = FakeDockerClient(local={"redis@sha256:abc": ["redis@sha256:abc"]})
+    assert ImagePuller(client).pull(["redis@sha256:abc"]) == {"redis@sha256:abc": SKIPPED}
+    assert client.pulled == []
+
+def test_progress_is_aggregated_across_images():
+    reports = []
+    lock = threading.Lock()
+
+    def on_progress(status):
+        with lock:
+            reports.append(status)
+
+    ImagePuller(FakeDockerClient(), on_progress=on_progress, interval=0).pull(["a:1", "b:1"])
+    assert reports[-1].images_done == 2
+    assert reports[-1].done_bytes == reports[-1].total_bytes == 400
+    assert reports[-1].fraction == 1.0
+    assert max(status.total_bytes for status in reports) == 400
+    assert [status.images_done for status in reports] == sorted(status.images_done for status in reports)
+
+def test_failed_pull_raises_after_the_others_finish():
+    client = FakeDockerClient(broken={"bad"})
+    with pytest.raises(RuntimeError, match="manifest unknown"):
+        ImagePuller(client).pull(["bad:1", "good:1"])
+    assert sorted(client.pulled) == ["bad:1", "good:1"]
+
+def test_installer_uses_injected_client_and_configured_images(tmpdir):
+    client = FakeDockerClient()
+    installer = DifyInstaller(str(tmpdir), client=client)
+    config = Config(str(tmpdir.join("config.json")))
+    assert config.images() == ["postgres:14", "redis:6"]
+    config.set("docker", {"images": ["postgres:16", "redis:7"]})
+    installer.pull_images(config.images())
+    assert sorted(client.pulled) == ["postgres:16", "redis:7"]
@@ -0,0 +1,91 @@
+"""Tests for size-aware file ingestion."""
+import pytest
+from onhax.ingest import FileIngestor, IngestError, is_binary
+from onhax.registry import FileContextRegistry
+
+def test_small_file_read_whole(tmp_path):
+    """Test that files within the budget are read unchanged."""
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n")
+    ingestor = FileIngestor()
+
+    result = ingestor.ingest(str(path))
+    assert result.content == "x = 1\n"
+    assert not result.truncated
+    assert ingestor.used_bytes == 6
+
+def test_large_file_excerpted(tmp_path):
+    """Test that large files keep whole lines from their head and tail."""
+    path = tmp_path / "big.py"
+    lines = [f"line {i}\n" for i in range(10000)]
+    path.write_text("".join(lines))
+    notified = []
+    ingestor = FileIngestor(max_file_bytes=2048, on_truncate=notified.append)
+
+    result = ingestor.ingest(str(path))
+    assert result.truncated
+    assert result.content.startswith("line 0\nline 1\n")
+    assert result.content.endswith("line 9999\n")
+    assert "bytes omitted" in result.content
+    assert len(result.content.encode("utf-8")) <= 2048 + 64
+    assert notified == [result]
+
+def test_binary_file_refused(tmp_path):
+    """Test that binary files are not ingested."""
+    path = tmp_path / "image.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")
+
+    with pytest.raises(IngestError):
+        FileIngestor().ingest(str(path))
+    assert is_binary("héllo".encode("utf-8")[:2]) is False
+
+def test_session_budget(tmp_path):
+    """Test that the session budget is shared and released."""
+    first = tmp_path / "first.txt"
+    second = tmp_path / "second.txt"
+    first.write_text("a\n" * 1000)
+    second.write_text("b\n" * 1000)
+    ingestor = FileIngestor(max_session_bytes=2500, min_excerpt_bytes=1024)
+
+    ingestor.ingest(str(first))
+    with pytest.raises(IngestError):
+        ingestor.ingest(str(second))
+    # Re-reading the same path does not count twice
+    ingestor.ingest(str(first))
+    assert ingestor.used_bytes == 2000
+
+    ingestor.release(str(first))
+    assert not ingestor.ingest(str(second)).truncated
+
+def test_registry_uses_reader(tmp_path):
+    """Test that the registry keeps what the ingestor returns."""
+    path = tmp_path / "big.txt"
+    path.write_text("z\n" * 5000)
+    ingestor = FileIngestor(max_file_bytes=1024)
+    registry = FileContextRegistry(reader=ingestor.read)
+
+    content = registry.add(str(path)).content
+    assert "bytes omitted" in content
+    assert len(content) < 1100
+    assert registry.add(str(path), "short").content == "short"
+
+def test_concurrent_ingest_respects_budget(tmp_path):
+    """Test that concurrent reads never exceed the session budget."""
+    from concurrent.futures import ThreadPoolExecutor
+    paths = []
+    for i in range(16):
+        path = tmp_path / f"{i}.txt"
+        path.write_text("q\n" * 1000)
+        paths.append(str(path))
+    ingestor = FileIngestor(max_session_bytes=10000)
+
+    def ingest(path):
+        try:
+            return ingestor.ingest(path)
+        except IngestError:
+            return None
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(ingest, paths))
+    assert sum(result is not None for result in results) >= 5
+    assert ingestor.used_bytes <= 10000 + 64 * 16
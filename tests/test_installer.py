@@ -4,6 +4,7 @@ import pytest
 from onhax.installer.setup import DifyInstaller
 from onhax.installer.config import Config
 from onhax.installer.integration import create_installer
+from onhax.installer.scheduler import Step, StepFailed
 
 def test_config_loading():
     """Test configuration loading and saving."""
@@ -33,6 +34,19 @@ def test_installer_integration(tmpdir):
     
     integration.set_progress_callback(progress_callback)
 
+def test_sequential_install_follows_dependencies(tmpdir):
+    """Test that the sequential install clones before using the repository."""
+    installer = DifyInstaller(str(tmpdir))
+    calls = []
+    for name in ('check_prerequisites', 'install_nodejs', 'setup_docker', 'pull_images',
+                 'clone_repository', 'setup_python_environment', 'check_compose_file',
+                 'setup_backend', 'setup_frontend', 'verify_installation'):
+        setattr(installer, name, lambda name=name: calls.append(name))
+    installer.install()
+    assert calls.index('clone_repository') < calls.index('setup_python_environment')
+    assert calls.index('clone_repository') < calls.index('check_compose_file')
+    assert calls.index('setup_python_environment') < calls.index('setup_backend')
+
 def test_env_file_generation(tmpdir):
     """Test environment file generation."""
     config = Config()
@@ -55,4 +69,33 @@ def test_docker_compose_generation(tmpdir):
     
     content = compose_path.read()
     assert 'postgres:' in content
-    assert 'redis:' in content
\ No newline at end of file
+    assert 'redis:' in content
+def test_rollback_forgets_the_removed_virtualenv(tmpdir):
+    """Test that a virtualenv deleted by rollback is rebuilt by the next run."""
+    integration = create_installer(installation_path=str(tmpdir.join('dify')),
+                                   config_path=str(tmpdir.join('config.json')))
+    installer = integration.installer
+    calls = []
+
+    def setup_python_environment():
+        calls.append('python')
+        os.makedirs(installer.venv_path, exist_ok=True)
+        installer.venv_created = True
+
+    def setup_backend():
+        calls.append('backend')
+        if calls.count('backend') == 1:
+            raise RuntimeError("backend broke")
+
+    integration.build_steps = lambda: [
+        Step('python', setup_python_environment, inputs=lambda: {'requirements': 'r1'}),
+        Step('backend', setup_backend, ('python',), inputs=lambda: {}),
+    ]
+    with pytest.raises(StepFailed):
+        integration.run_installation()
+    assert not os.path.exists(installer.venv_path)
+    assert 'python' not in integration.checkpoints.steps
+
+    integration.run_installation(from_step='backend')
+    assert calls == ['python', 'backend', 'python', 'backend']
+    assert os.path.isdir(installer.venv_path)
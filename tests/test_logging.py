@@ -0,0 +1,89 @@
+"""Tests for the logging module."""
+import json
+import logging
+import threading
+import pytest
+from onhax.logging import DebugSampler, JsonFormatter, log_event, setup_logging, shutdown_logging
+
+@pytest.fixture
+def restore_logging():
+    """Put the root and onhax loggers back as they were."""
+    saved = {name: (logging.getLogger(name).handlers[:], logging.getLogger(name).level,
+                    logging.getLogger(name).propagate) for name in ("", "onhax")}
+    yield
+    shutdown_logging()
+    for name, (handlers, level, propagate) in saved.items():
+        logger = logging.getLogger(name)
+        logger.handlers[:] = handlers
+        logger.setLevel(level)
+        logger.propagate = propagate
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_json_lines_written_by_listener(tmp_path, restore_logging):
+    """Test that records are queued and written as JSON lines on another thread."""
+    log_file = tmp_path / "logs" / "onhax.log"
+    setup_logging("INFO", str(log_file), json_format=True, console=False)
+    logger = logging.getLogger("onhax.test")
+    assert logging.getLogger("onhax").handlers[0].__class__.__name__ == "_QueueHandler"
+
+    log_event(logger, "request", {"status": "ok", "ttft": 0.25})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed %s", "step", extra={"step": 3})
+    logger.debug("hidden")
+    shutdown_logging()
+
+    event, failure = read_lines(log_file)
+    assert event["msg"] == "request" and event["fields"] == {"status": "ok", "ttft": 0.25}
+    assert failure["level"] == "ERROR" and failure["msg"] == "failed step"
+    assert failure["step"] == 3 and "ValueError: boom" in failure["exc"]
+
+def test_log_call_does_not_wait_for_handler(tmp_path, restore_logging):
+    """Test that a slow handler does not block the logging thread."""
+    setup_logging("INFO", console=False)
+    release = threading.Event()
+    seen = []
+
+    class SlowHandler(logging.Handler):
+        def emit(self, record):
+            release.wait(5)
+            seen.append(record.getMessage())
+
+    from onhax import logging as onhax_logging
+    onhax_logging._listener.handlers = (SlowHandler(),)
+    logging.getLogger("onhax.test").info("first")
+    logging.getLogger("onhax.test").info("second")
+    assert seen == []
+    release.set()
+    shutdown_logging()
+    assert seen == ["first", "second"]
+
+def test_size_rotation(tmp_path, restore_logging):
+    """Test that the log file is rotated by size."""
+    log_file = tmp_path / "onhax.log"
+    setup_logging("INFO", str(log_file), max_bytes=200, backup_count=2, console=False)
+    for i in range(20):
+        logging.getLogger("onhax.test").info("message number %d", i)
+    shutdown_logging()
+    assert (tmp_path / "onhax.log.1").exists() and (tmp_path / "onhax.log.2").exists()
+    assert not (tmp_path / "onhax.log.3").exists()
+
+def test_debug_sampling():
+    """Test that one in N debug records is kept and others pass."""
+    sampler = DebugSampler(0.25)
+    debug = [logging.LogRecord("onhax", logging.DEBUG, "", 0, "d", (), None) for _ in range(8)]
+    kept = [record for record in debug if sampler.filter(record)]
+    assert len(kept) == 2 and kept[0].sample_rate == 0.25
+    assert sampler.filter(logging.LogRecord("onhax", logging.INFO, "", 0, "i", (), None))
+    with pytest.raises(ValueError):
+        DebugSampler(2)
+
+def test_json_formatter_compact():
+    """Test the JSON line layout."""
+    record = logging.LogRecord("onhax.x", logging.WARNING, "", 0, "hello %s", ("you",), None)
+    line = JsonFormatter().format(record)
+    assert " " not in line.replace("hello you", "")
+    assert json.loads(line)["msg"] == "hello you"
@@ -0,0 +1,72 @@
+"""Tests for the interactive entry point."""
+import pytest
+import main
+from onhax.context import ContextWindow, PrefixAssembler
+from onhax.ingest import FileIngestor
+from onhax.registry import FileContextRegistry
+
+@pytest.fixture
+def small_context(monkeypatch):
+    """Give main a 3000-byte context budget and a fresh conversation."""
+    ingestor = FileIngestor(max_session_bytes=3000)
+    registry = FileContextRegistry(reader=ingestor.read)
+    monkeypatch.setattr(main, "file_ingestor", ingestor)
+    monkeypatch.setattr(main, "file_registry", registry)
+    monkeypatch.setattr(main, "conversation_history", [])
+    return registry
+
+def test_create_file_over_context_budget(small_context, tmp_path):
+    """Test that a created file that does not fit the context is written and skipped."""
+    first, second = tmp_path / "a.py", tmp_path / "b.py"
+    main.create_file(str(first), "a" * 2400)
+    main.create_file(str(second), "b" * 2400)
+
+    assert second.read_text() == "b" * 2400
+    assert str(first) in small_context
+    assert str(second) not in small_context
+    assert len(main.conversation_history) == 2
+
+def test_edit_over_context_budget_drops_stale_snapshot(small_context, tmp_path):
+    """Test that an edited file that no longer fits loses its old snapshot."""
+    first, second = tmp_path / "a.py", tmp_path / "b.py"
+    main.create_file(str(first), "a" * 2400)
+    main.create_file(str(second), "small\n")
+    main.apply_diff_edit(str(second), "small", "b" * 2400)
+
+    assert second.read_text() == "b" * 2400 + "\n"
+    assert str(second) not in small_context
+    assert main.file_ingestor.used_bytes == 2400
+
+def test_excerpt_counts_against_context_budget(monkeypatch):
+    """Test that turns are trimmed to leave room for the retrieved excerpt."""
+    history = [{"role": "system", "content": "prompt"}]
+    history += [{"role": "user", "content": f"turn {i} " + "x" * 400} for i in range(4)]
+    monkeypatch.setattr(main, "conversation_history", history)
+    monkeypatch.setattr(main, "file_registry", FileContextRegistry())
+    monkeypatch.setattr(main, "context_window", ContextWindow(budget_tokens=400, message_overhead=0))
+    monkeypatch.setattr(main, "prefix_assembler", PrefixAssembler())
+    excerpt = {"role": "system", "content": "Relevant excerpts:\n" + "y" * 600}
+
+    messages, stats, _ = main.build_messages(excerpt)
+    assert stats.tokens <= 400
+    assert main.context_window.count(messages) == stats.tokens
+    assert messages[-1] is excerpt
+    assert messages[-2]["content"].startswith("turn 3")
+    assert excerpt not in main.conversation_history
+
+def test_excerpt_keeps_the_next_prefix_stable(monkeypatch):
+    """Test that the excerpt sits after the pending turn and is recorded as sent."""
+    history = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "first"}]
+    monkeypatch.setattr(main, "conversation_history", history)
+    monkeypatch.setattr(main, "file_registry", FileContextRegistry())
+    monkeypatch.setattr(main, "context_window", ContextWindow(message_overhead=0))
+    monkeypatch.setattr(main, "prefix_assembler", PrefixAssembler())
+
+    sent, _, _ = main.build_messages({"role": "system", "content": "excerpt one"})
+    main.conversation_history.append({"role": "assistant", "content": "reply"})
+    main.conversation_history.append({"role": "user", "content": "second"})
+    messages, _, prefix_tokens = main.build_messages({"role": "system", "content": "excerpt two"})
+
+    assert [m["content"] for m in messages] == ["prompt", "first", "reply", "second", "excerpt two"]
+    # Shared with the request actually sent: everything before its excerpt
+    assert prefix_tokens == main.context_window.count(sent[:-1])
@@ -0,0 +1,80 @@
+"""Tests for concurrent file prefetching."""
+import threading
+from onhax.ingest import FileIngestor
+from onhax.prefetch import Prefetcher, stat_candidates
+from onhax.registry import FileContextRegistry
+
+def test_stat_candidates(tmp_path):
+    """Test that only existing regular files are kept, once each."""
+    path = tmp_path / "a.py"
+    path.write_text("x")
+    files, skipped = stat_candidates([str(path), str(tmp_path), str(tmp_path / "nope.py"), str(path)])
+    assert files == [str(path)]
+    assert skipped == [str(tmp_path), str(tmp_path / "nope.py")]
+
+def test_loads_run_concurrently_with_warmup(tmp_path):
+    """Test that loads overlap each other and the warm-up task."""
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.py"
+        path.write_text(str(i))
+        paths.append(str(path))
+    barrier = threading.Barrier(4, timeout=5)
+
+    def load(path):
+        barrier.wait()
+        with open(path) as f:
+            return f.read()
+
+    prefetcher = Prefetcher(load, max_workers=4)
+    try:
+        result = prefetcher.run(paths + ["missing.py"], warmup=barrier.wait)
+    finally:
+        prefetcher.close()
+    assert result.loaded == {paths[0]: "0", paths[1]: "1", paths[2]: "2"}
+    assert result.skipped == ["missing.py"]
+    assert result.errors == {}
+    assert result.seconds >= 0
+
+def test_errors_collected(tmp_path):
+    """Test that a failing load is reported without hiding the others."""
+    good = tmp_path / "good.py"
+    bad = tmp_path / "bad.bin"
+    good.write_text("ok")
+    bad.write_bytes(b"\0\1\2")
+    registry = FileContextRegistry(reader=FileIngestor().read)
+
+    prefetcher = Prefetcher(registry.ensure)
+    try:
+        result = prefetcher.run([str(good), str(bad)], warmup=lambda: 1 / 0)
+    finally:
+        prefetcher.close()
+    assert result.loaded[str(good)].content == "ok"
+    assert list(result.errors) == [str(bad)]
+    assert len(registry) == 1
+
+def test_warmup_not_waited_for(tmp_path):
+    """Test that loads return without joining a slow warm-up, which is not restarted while running."""
+    path = tmp_path / "a.py"
+    path.write_text("a")
+    release = threading.Event()
+    calls = []
+
+    def warmup():
+        calls.append(1)
+        release.wait(5)
+
+    def load(path):
+        with open(path) as f:
+            return f.read()
+
+    prefetcher = Prefetcher(load, max_workers=2)
+    try:
+        first = prefetcher.run([str(path)], warmup=warmup)
+        second = prefetcher.run([str(path)], warmup=warmup)
+        assert not release.is_set()
+    finally:
+        release.set()
+        prefetcher.close()
+    assert first.loaded == second.loaded == {str(path): "a"}
+    assert calls == [1]
@@ -0,0 +1,61 @@
+"""Tests for the cached Python environment builder."""
+import os
+import subprocess
+
+from onhax.installer.pyenv import (
+    MARKER, EnvironmentBuilder, clone_environment, environment_key, read_marker, read_requirements, venv_bin,
+)
+
+def test_requirements_are_normalized_and_includes_expanded(tmpdir):
+    tmpdir.join("base.txt").write("requests==2.31.0  # http\n\n")
+    main = tmpdir.join("requirements.txt")
+    main.write("# backend\n-r base.txt\nflask>=2\n")
+    assert read_requirements(str(main)) == ["requests==2.31.0", "flask>=2"]
+
+    key = environment_key("python", str(main))
+    main.write("-r base.txt\n# reordered, same requirements\nflask>=2\n")
+    assert environment_key("python", str(main)) == key
+    main.write("-r base.txt\nflask>=3\n")
+    assert environment_key("python", str(main)) != key
+
+def test_clone_links_files_and_rewrites_scripts(tmpdir):
+    source = tmpdir.join("cache", "abc")
+    site = source.join("lib", "site-packages")
+    site.join("module.py").write("x = 1\n", ensure=True)
+    script = source.join("bin", "tool")
+    script.write(f"#!{source}/bin/python\nprint('hi')\n", ensure=True)
+    os.chmod(str(script), 0o755)
+    os.symlink("lib", str(source.join("lib64")))
+    source.join("pyvenv.cfg").write(f"home = /usr/bin\ncommand = python -m venv {source}\n")
+    source.join(MARKER).write("abc")
+
+    target = tmpdir.join("install", "venv")
+    clone_environment(str(source), str(target))
+
+    assert os.stat(str(target.join("lib", "site-packages", "module.py"))).st_ino == os.stat(str(site.join("module.py"))).st_ino
+    assert target.join("bin", "tool").read().startswith(f"#!{target}/bin/python")
+    assert script.read().startswith(f"#!{source}/bin/python")
+    assert os.access(str(target.join("bin", "tool")), os.X_OK)
+    assert str(target) in target.join("pyvenv.cfg").read()
+    assert os.readlink(str(target.join("lib64"))) == "lib"
+    assert not target.join(MARKER).exists()
+
+def test_matching_environment_is_reused(tmpdir, monkeypatch):
+    requirements = tmpdir.join("requirements.txt")
+    requirements.write("# nothing to install\n")
+    builder = EnvironmentBuilder(str(tmpdir.join("cache")))
+
+    first, second = str(tmpdir.join("one", "venv")), str(tmpdir.join("two", "venv"))
+    key = builder.ensure(str(requirements), first)
+    assert read_marker(first) == key
+
+    calls = []
+    real_run = subprocess.run
+    monkeypatch.setattr(subprocess, "run", lambda *a, **k: calls.append(a) or real_run(*a, **k))
+    assert builder.ensure(str(requirements), second) == key
+    assert builder.ensure(str(requirements), first) == key
+    assert calls == []
+
+    prefix = real_run([venv_bin(second, "python"), "-c", "import sys; print(sys.prefix)"],
+                      capture_output=True, text=True, check=True).stdout.strip()
+    assert os.path.realpath(prefix) == os.path.realpath(second)
@@ -0,0 +1,57 @@
+"""Tests for the file context registry."""
+import os
+from onhax.registry import FileContextRegistry, normalize_path
+
+def test_add_and_lookup(tmp_path):
+    """Test that files are keyed by normalized path."""
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n")
+    registry = FileContextRegistry()
+
+    snapshot = registry.add(str(path))
+    assert snapshot.content == "x = 1\n"
+    assert str(path) in registry
+    assert registry.get(str(tmp_path / "." / "a.py")) is snapshot
+    assert registry.messages() == [
+        {"role": "system", "content": f"Content of file '{normalize_path(str(path))}':\n\nx = 1\n"}
+    ]
+
+def test_single_snapshot_per_path(tmp_path):
+    """Test that re-adding a file replaces its snapshot."""
+    path = tmp_path / "a.py"
+    path.write_text("old")
+    registry = FileContextRegistry()
+    registry.add(str(path))
+    path.write_text("new")
+    registry.add(str(path), "new")
+
+    assert len(registry) == 1
+    assert registry.get(str(path)).content == "new"
+
+def test_refresh_detects_changes(tmp_path):
+    """Test that refresh re-reads modified files and drops deleted ones."""
+    changed = tmp_path / "changed.py"
+    same = tmp_path / "same.py"
+    gone = tmp_path / "gone.py"
+    for path in (changed, same, gone):
+        path.write_text("v1")
+    registry = FileContextRegistry()
+    for path in (changed, same, gone):
+        registry.add(str(path))
+
+    changed.write_text("version 2")
+    os.utime(changed, ns=(0, 0))
+    gone.unlink()
+
+    assert sorted(registry.refresh()) == sorted([str(changed), str(gone)])
+    assert registry.get(str(changed)).content == "version 2"
+    assert str(gone) not in registry
+    assert registry.refresh() == []
+
+def test_ensure_reuses_unchanged_snapshot(tmp_path):
+    """Test that ensure does not re-read an unchanged file."""
+    path = tmp_path / "a.py"
+    path.write_text("x")
+    registry = FileContextRegistry()
+    first = registry.ensure(str(path))
+    assert registry.ensure(str(path)) is first
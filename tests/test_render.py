@@ -0,0 +1,75 @@
+"""Tests for the buffered renderer."""
+import io
+import pytest
+from rich.console import Console
+from onhax.render import RenderBuffer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_plain_mode_coalesces_until_frame_due():
+    """Test that deltas are written together once per frame."""
+    out = io.StringIO()
+    clock = FakeClock()
+    buffer = RenderBuffer(mode="plain", interval=0.1, stream=out, clock=clock)
+
+    for text in ("a", "b", "c"):
+        clock.now += 0.01
+        buffer.write(text)
+    assert out.getvalue() == ""
+
+    clock.now += 0.1
+    buffer.write("d")
+    assert out.getvalue() == "abcd"
+    assert buffer.flushes == 1
+
+def test_size_threshold_forces_flush():
+    """Test that a large pending buffer is written without waiting."""
+    out = io.StringIO()
+    buffer = RenderBuffer(mode="plain", interval=60, max_chars=5, stream=out, clock=FakeClock())
+    buffer.write("abc")
+    buffer.write("def")
+    assert out.getvalue() == "abcdef"
+
+def test_rich_mode_does_not_interpret_markup():
+    """Test that rich output is printed literally on close."""
+    out = io.StringIO()
+    console = Console(file=out, force_terminal=False)
+    with RenderBuffer(console, interval=60, clock=FakeClock()) as buffer:
+        buffer.write("[bold]x[/bold]")
+    assert out.getvalue() == "[bold]x[/bold]"
+    assert buffer.chars == len("[bold]x[/bold]")
+
+def test_invalid_mode():
+    """Test that unknown modes are rejected."""
+    with pytest.raises(ValueError):
+        RenderBuffer(mode="curses")
+
+def test_tick_flushes_pending_text_without_new_text():
+    """Test that pending text is written once a frame is due, even with no new deltas."""
+    out = io.StringIO()
+    clock = FakeClock()
+    buffer = RenderBuffer(mode="plain", interval=0.1, stream=out, clock=clock)
+    clock.now += 0.05
+    buffer.write("end of reply")
+    buffer.tick()
+    assert out.getvalue() == ""
+
+    clock.now += 0.1
+    buffer.tick()
+    assert out.getvalue() == "end of reply"
+    buffer.tick()
+    assert buffer.flushes == 1
+
+def test_non_positive_interval_is_unbuffered():
+    """Test that an interval of 0 or less writes every delta."""
+    out = io.StringIO()
+    buffer = RenderBuffer(mode="plain", interval=-1, stream=out, clock=FakeClock())
+    buffer.write("a")
+    buffer.write("b")
+    assert out.getvalue() == "ab"
+    assert buffer.flushes == 2
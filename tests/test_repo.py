@@ -0,0 +1,101 @@
+"""Tests for repository sync, against a local bare repository."""
+import os
+
+import pytest
+
+from onhax.installer.repo import RepoSync, git
+
+def commit(work, message, content):
+    with open(os.path.join(work, "file.txt"), "w") as f:
+        f.write(content)
+    git("add", "file.txt", cwd=work)
+    git("commit", "-q", "-m", message, cwd=work)
+    return git("rev-parse", "HEAD", cwd=work)
+
+@pytest.fixture
+def remote(tmpdir):
+    """A bare repository with three commits on main and a tag on the first."""
+    work = str(tmpdir.join("work"))
+    git("init", "-q", "-b", "main", work)
+    git("config", "user.name", "Test", cwd=work)
+    git("config", "user.email", "test@example.com", cwd=work)
+    commits = [commit(work, f"commit {i}", f"version {i}\n") for i in range(3)]
+    git("tag", "-a", "v1", "-m", "release", commits[0], cwd=work)
+    bare = str(tmpdir.join("remote.git"))
+    git("clone", "-q", "--bare", work, bare)
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    return {"url": f"file://{bare}", "work": work, "commits": commits}
+
+def read(path):
+    with open(os.path.join(path, "file.txt")) as f:
+        return f.read()
+
+def test_shallow_clone_then_incremental_update(remote, tmpdir):
+    path = str(tmpdir.join("install"))
+    sync = RepoSync(remote["url"], path, ref="main", depth=1, filter="blob:none")
+    assert sync.sync() == remote["commits"][-1]
+    assert read(path) == "version 2\n"
+    assert git("rev-list", "--count", "HEAD", cwd=path) == "1"
+    assert git("config", "remote.origin.partialclonefilter", cwd=path) == "blob:none"
+
+    new = commit(remote["work"], "commit 3", "version 3\n")
+    git("push", "-q", remote["url"], "main", cwd=remote["work"])
+    assert sync.remote_commit() == new
+    assert sync.sync() == new
+    assert read(path) == "version 3\n"
+
+def test_pinning_to_tag_and_commit(remote, tmpdir):
+    path = str(tmpdir.join("install"))
+    assert RepoSync(remote["url"], path, ref="v1").sync() == remote["commits"][0]
+    assert RepoSync(remote["url"], path, ref="v1").remote_commit() == remote["commits"][0]
+    assert read(path) == "version 0\n"
+
+    pinned = RepoSync("file:///nonexistent/remote.git", path, ref=remote["commits"][0])
+    assert pinned.sync() == remote["commits"][0]  # present locally: no fetch
+
+    assert RepoSync(remote["url"], path, ref=remote["commits"][1]).sync() == remote["commits"][1]
+    assert read(path) == "version 1\n"
+
+def test_local_changes_are_not_discarded(remote, tmpdir):
+    path = str(tmpdir.join("install"))
+    RepoSync(remote["url"], path, ref="v1").sync()
+    with open(os.path.join(path, "file.txt"), "w") as f:
+        f.write("edited\n")
+    with pytest.raises(RuntimeError, match="checkout"):
+        RepoSync(remote["url"], path, ref="main").sync()
+    assert read(path) == "edited\n"
+
+def test_existing_directory_that_is_not_a_repository(remote, tmpdir):
+    tmpdir.join("install", "notes.txt").write("mine", ensure=True)
+    with pytest.raises(RuntimeError, match="not a git repository"):
+        RepoSync(remote["url"], str(tmpdir.join("install"))).sync()
+
+def test_mirror_is_shared_between_installations(remote, tmpdir):
+    mirrors = str(tmpdir.join("mirrors"))
+    first = RepoSync(remote["url"], str(tmpdir.join("one")), mirror_dir=mirrors)
+    assert first.sync() == remote["commits"][-1]
+    second = RepoSync(remote["url"], str(tmpdir.join("two")), ref="v1", mirror_dir=mirrors)
+    assert second.sync() == remote["commits"][0]
+
+    alternates = tmpdir.join("two", ".git", "objects", "info", "alternates").read()
+    assert first.mirror_path in alternates
+    assert git("remote", "get-url", "origin", cwd=second.path) == remote["url"]
+    assert os.listdir(mirrors) == [os.path.basename(first.mirror_path)]
+
+def test_mirror_is_never_garbage_collected(remote, tmpdir):
+    sync = RepoSync(remote["url"], str(tmpdir.join("one")), mirror_dir=str(tmpdir.join("mirrors")))
+    sync.sync()
+    assert git("config", "gc.auto", cwd=sync.mirror_path) == "0"
+    assert git("config", "gc.pruneExpire", cwd=sync.mirror_path) == "never"
+    assert git("config", "maintenance.auto", cwd=sync.mirror_path) == "false"
+
+def test_existing_mirror_gets_gc_settings(remote, tmpdir):
+    mirrors = str(tmpdir.join("mirrors"))
+    RepoSync(remote["url"], str(tmpdir.join("one")), mirror_dir=mirrors).sync()
+    sync = RepoSync(remote["url"], str(tmpdir.join("two")), ref=remote["commits"][0], mirror_dir=mirrors)
+    for key in ("gc.auto", "gc.pruneExpire", "maintenance.auto"):
+        git("config", "--unset", key, cwd=sync.mirror_path)
+    sync.sync()
+    assert git("config", "gc.auto", cwd=sync.mirror_path) == "0"
+    assert git("config", "gc.pruneExpire", cwd=sync.mirror_path) == "never"
+    assert git("config", "maintenance.auto", cwd=sync.mirror_path) == "false"
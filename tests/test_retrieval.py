@@ -0,0 +1,87 @@
+"""Tests for BM25 chunk retrieval."""
+import pytest
+
+pytest.importorskip("numpy")
+
+from onhax.retrieval import ChunkIndex, chunk_lines, tokenize
+
+def write_files(root, files):
+    for path, content in files.items():
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text(content)
+
+FILES = {
+    "retry.py": "def backoff(attempt):\n    return jitter(base_delay * 2 ** attempt)\n",
+    "cache.py": "class ResponseCache:\n    def get(self, key):\n        return self.memory.get(key)\n",
+    "render.py": "class RenderBuffer:\n    def flush(self):\n        self.console.print(self.pending)\n",
+}
+
+def test_tokenize_splits_identifiers():
+    """Test that identifiers are indexed whole and by their parts."""
+    terms = tokenize("generate_code ResponseCache x")
+    assert "generate_code" in terms and "generate" in terms and "code" in terms
+    assert "responsecache" in terms and "response" in terms and "cache" in terms
+    assert "x" not in terms
+
+def test_chunk_lines_prefers_blank_lines():
+    """Test that chunks break at blank lines when they can."""
+    lines = ["a\n"] * 30 + ["\n"] + ["b\n"] * 30
+    assert chunk_lines(lines, 40) == [(0, 31), (31, 61)]
+
+def test_search_ranks_relevant_chunks(tmp_path):
+    """Test that the chunk mentioning the query terms ranks first."""
+    write_files(tmp_path, FILES)
+    index = ChunkIndex(str(tmp_path))
+    assert index.update(FILES) == 3
+
+    results = index.search("how is the backoff jitter computed?")
+    assert results[0][0].path == "retry.py"
+    assert index.search("nothing matches zzz") == []
+    boosted = index.search("class", boost={"render.py": 10.0})
+    assert boosted[0][0].path == "render.py"
+
+def test_select_respects_budget(tmp_path):
+    """Test that selection stays within the token budget and reports savings."""
+    write_files(tmp_path, {"big.py": "".join(f"def cache_{i}():\n    pass\n\n" for i in range(200))})
+    index = ChunkIndex(str(tmp_path), max_lines=12)
+    index.update(["big.py"])
+
+    selection = index.select("cache", budget_tokens=100)
+    assert 0 < selection.tokens <= 100
+    assert selection.saved_tokens > 0
+    assert "big.py (lines " in selection.message()["content"]
+
+def test_incremental_update_and_persistence(tmp_path):
+    """Test that only changed files are re-indexed and the index reloads."""
+    root = tmp_path / "src"
+    write_files(root, FILES)
+    directory = str(tmp_path / "index")
+    index = ChunkIndex(str(root), directory)
+    index.update(FILES)
+    index.save()
+
+    reloaded = ChunkIndex(str(root), directory)
+    assert sorted(reloaded.files) == sorted(FILES)
+    assert reloaded.update(FILES) == 0
+    assert reloaded.search("jitter")[0][0].path == "retry.py"
+
+    (root / "retry.py").write_text("def retry_forever():\n    pass\n")
+    assert reloaded.update(["retry.py", "cache.py"]) == 2  # one changed, one dropped
+    assert reloaded.search("jitter") == []
+    assert reloaded.search("forever")[0][0].path == "retry.py"
+
+def test_refresh_checks_only_given_paths(tmp_path):
+    """Test that refresh re-indexes or drops the named files and leaves the rest."""
+    write_files(tmp_path, FILES)
+    index = ChunkIndex(str(tmp_path))
+    index.update(FILES)
+
+    (tmp_path / "retry.py").write_text("def retry_forever():\n    pass\n")
+    (tmp_path / "cache.py").write_text("def evict_everything():\n    pass\n")
+    (tmp_path / "render.py").unlink()
+    assert index.refresh(["retry.py", "render.py"]) == 2
+    assert "render.py" not in index.files
+    assert index.search("forever")[0][0].path == "retry.py"
+    assert index.search("everything") == []
+    assert index.refresh(["retry.py"]) == 0
@@ -0,0 +1,35 @@
+"""Tests for the retry and hedging helpers."""
+from onhax.retry import Deadline, HedgePolicy, LatencyTracker, RetryPolicy
+
+def test_deadline_remaining():
+    """Test that the deadline counts down and never goes negative."""
+    now = [100.0]
+    deadline = Deadline(5, clock=lambda: now[0])
+    assert deadline.remaining() == 5
+    now[0] += 7
+    assert deadline.remaining() == 0
+    assert deadline.expired
+
+def test_backoff_is_bounded():
+    """Test that jittered backoff stays under the growing ceiling."""
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    for attempt, ceiling in ((1, 1), (2, 2), (3, 4), (6, 4)):
+        assert all(0 <= policy.backoff(attempt) <= ceiling for _ in range(50))
+
+def test_latency_percentile():
+    """Test percentile selection over the rolling window."""
+    tracker = LatencyTracker(window=100)
+    assert tracker.percentile(0.95) is None
+    for i in range(1, 101):
+        tracker.record(i / 100)
+    assert tracker.percentile(0.5) == 0.5
+    assert tracker.percentile(0.95) == 0.95
+
+def test_hedge_delay_uses_percentile_once_warm():
+    """Test that the hedge delay switches from the default to the percentile."""
+    policy = HedgePolicy(percentile=0.9, initial_delay=2.0, min_samples=10)
+    for _ in range(9):
+        policy.latencies.record(0.1)
+    assert policy.delay() == 2.0
+    policy.latencies.record(0.1)
+    assert policy.delay() == 0.1
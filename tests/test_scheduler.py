@@ -0,0 +1,80 @@
+"""Tests for the installer step scheduler."""
+import threading
+import time
+
+import pytest
+
+from onhax.installer.scheduler import (
+    CANCELLED, DONE, FAILED, RUNNING, Scheduler, Step, StepFailed, topological_order,
+)
+
+def sleeper(seconds, log=None, name=None):
+    def run():
+        time.sleep(seconds)
+        if log is not None:
+            log.append(name)
+    return run
+
+def test_independent_steps_run_in_parallel():
+    steps = [Step(name, sleeper(0.2)) for name in ("a", "b", "c", "d")]
+    started = time.monotonic()
+    results = Scheduler(steps, max_workers=4).run()
+    assert time.monotonic() - started < 0.6
+    assert all(result.status == DONE for result in results.values())
+
+def test_steps_wait_for_their_requirements():
+    log = []
+    steps = [
+        Step("verify", sleeper(0, log, "verify"), ("backend", "frontend")),
+        Step("backend", sleeper(0.05, log, "backend"), ("clone",)),
+        Step("frontend", sleeper(0, log, "frontend"), ("clone",)),
+        Step("clone", sleeper(0.02, log, "clone")),
+    ]
+    Scheduler(steps, max_workers=3).run()
+    assert log[0] == "clone"
+    assert log[-1] == "verify"
+    assert set(log[1:3]) == {"backend", "frontend"}
+
+def test_failure_cancels_dependents_and_lets_running_steps_finish():
+    log = []
+    release = threading.Event()
+
+    def fail():
+        release.set()
+        raise OSError("disk full")
+
+    def slow():
+        release.wait(1)
+        time.sleep(0.05)
+        log.append("slow")
+
+    steps = [
+        Step("fail", fail),
+        Step("slow", slow),
+        Step("after", sleeper(0, log, "after"), ("fail",)),
+    ]
+    with pytest.raises(StepFailed) as excinfo:
+        Scheduler(steps, max_workers=2).run()
+    assert isinstance(excinfo.value.__cause__, OSError)
+    results = excinfo.value.results
+    assert results["fail"].status == FAILED
+    assert results["slow"].status == DONE
+    assert results["after"].status == CANCELLED
+    assert log == ["slow"]
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order([Step("a", print, ("b",)), Step("b", print, ("a",))])
+    with pytest.raises(ValueError, match="unknown"):
+        Scheduler([Step("a", print, ("missing",))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        Scheduler([Step("a", print), Step("a", print)])
+
+def test_progress_events():
+    events = []
+    steps = [Step("a", sleeper(0)), Step("b", sleeper(0), ("a",), title="Step B", weight=3)]
+    Scheduler(steps, on_event=lambda step, state, fraction: events.append((step.label, state, fraction))).run()
+    assert events == [
+        ("a", RUNNING, 0.0), ("a", DONE, 0.25),
+        ("Step B", RUNNING, 0.25), ("Step B", DONE, 1.0),
+    ]
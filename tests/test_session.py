@@ -0,0 +1,122 @@
+"""Tests for session persistence."""
+import json
+import os
+from functools import partial
+from onhax import session
+from onhax.registry import FileContextRegistry
+from onhax.session import INLINE_CHARS, BlobStore, SessionJournal, SessionStore
+
+def test_blob_store_dedups(tmp_path):
+    """Test that identical contents are stored once, compressed."""
+    blobs = BlobStore(str(tmp_path))
+    content = "x = 1\n" * 1000
+    digest = blobs.put(content)
+    assert blobs.put(content) == digest
+    assert digest in blobs
+    assert blobs.get(digest) == content
+    assert len(list(tmp_path.rglob("*"))) == 2  # one shard directory, one blob
+    with open(blobs.path(digest), "rb") as f:
+        assert len(f.read()) < len(content) // 10
+
+def test_journal_is_incremental(tmp_path):
+    """Test that sync appends only what changed."""
+    source = tmp_path / "a.py"
+    source.write_text("print(1)\n")
+    registry = FileContextRegistry()
+    registry.add(str(source))
+    store = SessionStore(str(tmp_path / "store"))
+    journal = store.create()
+    history = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "hi"}]
+
+    assert journal.sync(history, registry) == 3  # two messages, one file
+    assert journal.sync(history, registry) == 0
+    history.append({"role": "assistant", "content": "y" * (INLINE_CHARS + 1)})
+    assert journal.sync(history, registry) == 1
+    registry.discard(str(source))
+    history[:] = history[1:]  # rewritten, e.g. by eviction
+    assert journal.sync(history, registry) == 2  # full history, one drop
+    journal.close()
+
+    with open(store.journal_path(journal.session_id)) as f:
+        ops = [json.loads(line)["op"] for line in f]
+    assert ops == ["meta", "msg", "msg", "file", "msg", "history", "drop"]
+    state = store.load(journal.session_id)
+    assert [m["role"] for m in state.messages] == ["user", "assistant"]
+    assert state.messages[1]["content"] == "y" * (INLINE_CHARS + 1)
+    assert state.files == {}
+
+def test_resume_restores_files_lazily(tmp_path):
+    """Test that unchanged files come back from the blob store, not the disk."""
+    unchanged = tmp_path / "same.py"
+    changed = tmp_path / "changed.py"
+    unchanged.write_text("same\n")
+    changed.write_text("old\n")
+    registry = FileContextRegistry()
+    registry.add(str(unchanged))
+    registry.add(str(changed))
+    store = SessionStore(str(tmp_path / "store"))
+    journal = store.create()
+    journal.sync([{"role": "user", "content": "hi"}], registry)
+    journal.close()
+    changed.write_text("newer\n")
+
+    resumed = store.resume(store.latest())
+    reads = []
+    fresh = FileContextRegistry(reader=lambda path, content: reads.append(path) or open(path).read())
+    for record in resumed.state.files.values():
+        fresh.restore(record.path, record.digest, record.mtime_ns, record.size,
+                      partial(store.blobs.get, record.digest))
+    assert reads == [str(changed)]
+    assert fresh.get(str(unchanged)).content == "same\n"
+    assert fresh.get(str(changed)).content == "newer\n"
+    assert resumed.sync(resumed.state.messages, fresh) == 1  # only the changed file
+    resumed.close()
+
+def test_prune_keeps_recent_sessions_and_their_blobs(tmp_path, monkeypatch):
+    """Test that old sessions go, together with the blobs only they used."""
+    monkeypatch.setattr(session, "BLOB_GRACE_SECONDS", 0)
+    store = SessionStore(str(tmp_path / "store"))
+    shared = "s" * (INLINE_CHARS + 1)
+    ids = [f"20240101-00000{i}-0000" for i in range(3)]
+    os.makedirs(store.directory)
+    for i, session_id in enumerate(ids):
+        journal = SessionJournal(store.journal_path(session_id), store.blobs, session_id)
+        journal.sync([{"role": "user", "content": shared}, {"role": "user", "content": str(i) * 600}], [])
+        journal.close()
+    orphan = store.blobs.put("never referenced")
+
+    result = store.prune(keep=1, protect=[ids[0]])
+    assert result.sessions == [ids[1]]
+    assert store.sessions() == [ids[0], ids[2]]
+    assert result.blobs == 2  # session 1's own message and the orphan
+    assert orphan not in store.blobs
+    assert store.blobs.digest(shared) in store.blobs
+    assert store.load(ids[0]).messages[1]["content"] == "0" * 600
+    assert result.freed_bytes > 0
+
+    assert store.prune(keep=10, max_bytes=0).sessions == [ids[0], ids[2]]
+    assert store.blobs.sizes() == {}
+
+def test_prune_spares_fresh_blobs(tmp_path):
+    """Test that recently written blobs survive, referenced or not."""
+    store = SessionStore(str(tmp_path / "store"))
+    digest = store.blobs.put("in flight")
+    assert store.prune(keep=0).blobs == 0
+    assert digest in store.blobs
+
+def test_resume_after_torn_write(tmp_path):
+    """Test that records appended after a crash mid-write stay readable."""
+    store = SessionStore(str(tmp_path / "store"))
+    journal = store.create()
+    journal.sync([{"role": "user", "content": "hi"}], [])
+    journal.close()
+    path = store.journal_path(journal.session_id)
+    with open(path, "a") as f:
+        f.write('{"op": "msg", "role": "assis')
+
+    journal = store.resume(journal.session_id)
+    history = journal.state.messages + [{"role": "user", "content": "again"}]
+    assert journal.sync(history, []) == 1
+    journal.close()
+
+    assert [m["content"] for m in store.load(journal.session_id).messages] == ["hi", "again"]
@@ -0,0 +1,25 @@
+"""Startup time checks for the entry points."""
+import os
+import pytest
+from benchmarks.bench_startup import best_of, parse_importtime
+
+# Generous enough for slow CI machines; the entry points take ~0.15 s here
+BUDGET_SECONDS = float(os.getenv("ONHAX_STARTUP_BUDGET", "0.6"))
+
+def test_parse_importtime():
+    """Test parsing of -X importtime output."""
+    timings = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+    )
+    assert [t.module for t in timings] == ["json.decoder", "json"]
+    assert timings[0].depth == 1 and timings[1].depth == 0
+    assert timings[1].cumulative_seconds == pytest.approx(0.00042)
+
+@pytest.mark.parametrize("module", ["main", "onhax.__main__"])
+def test_startup_budget(module):
+    """Test that heavy dependencies load lazily and startup stays in budget."""
+    report = best_of(module, runs=3)
+    assert report.lazy_loaded == []
+    assert 0 < report.seconds < BUDGET_SECONDS
@@ -0,0 +1,70 @@
+"""Tests for the incremental response parser."""
+import json
+import time
+import pytest
+from onhax.streaming import ParseEvent, StreamingResponseParser
+
+RESPONSE = {
+    "assistant_reply": 'Done: "quoted", tab\t, unicode é \U0001f40b and a \\ slash',
+    "files_to_create": [
+        {"path": "a.py", "content": "print('{not a brace}')\n"},
+        {"path": "b.py", "content": "x = [1, 2]\n"},
+    ],
+    "files_to_edit": [
+        {"path": "c.py", "original_snippet": "a\nb", "new_snippet": "c\\d"},
+    ],
+}
+
+def collect(text, size):
+    parser = StreamingResponseParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64, 4096])
+def test_events_independent_of_chunking(size):
+    """Test that the same events come out whatever the chunk boundaries."""
+    text = json.dumps(RESPONSE, indent=2)
+    parser, events = collect(text, size)
+
+    reply = "".join(e.value for e in events if e.kind == "reply")
+    assert reply == RESPONSE["assistant_reply"]
+    entries = [e for e in events if e.kind != "reply"]
+    assert entries == [
+        ParseEvent("files_to_create", RESPONSE["files_to_create"][0]),
+        ParseEvent("files_to_create", RESPONSE["files_to_create"][1]),
+        ParseEvent("files_to_edit", RESPONSE["files_to_edit"][0]),
+    ]
+    assert parser.result() == RESPONSE
+
+def test_entry_emitted_before_stream_ends():
+    """Test that an entry is available as soon as its closing brace arrives."""
+    text = json.dumps(RESPONSE)
+    cut = text.index('}, {"path": "b.py"') + 1
+    parser = StreamingResponseParser()
+    events = parser.feed(text[:cut])
+    assert ParseEvent("files_to_create", RESPONSE["files_to_create"][0]) in events
+
+def test_escaped_surrogate_pair_split():
+    """Test that an escaped surrogate pair split across chunks decodes once."""
+    text = '{"assistant_reply": "whale \\ud83d\\udc0b!"}'
+    parser, events = collect(text, 3)
+    assert "".join(e.value for e in events) == "whale \U0001f40b!"
+
+def test_invalid_json_raises():
+    """Test that a truncated document fails to parse."""
+    parser = StreamingResponseParser()
+    parser.feed('{"assistant_reply": "cut')
+    with pytest.raises(json.JSONDecodeError):
+        parser.result()
+
+def test_large_file_content_is_linear():
+    """Test that a multi-megabyte file content streams in linear time."""
+    content = "x = 1  # padding\n" * (4 * 1024 * 1024 // 17)
+    text = json.dumps({"assistant_reply": "ok", "files_to_create": [{"path": "big.py", "content": content}]})
+    started = time.perf_counter()
+    parser, events = collect(text, 16)
+    # Quadratic buffering took over a minute here
+    assert time.perf_counter() - started < 5
+    assert events[-1] == ParseEvent("files_to_create", {"path": "big.py", "content": content})
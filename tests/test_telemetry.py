@@ -0,0 +1,112 @@
+"""Tests for the telemetry module."""
+import json
+import logging
+from onhax.client import DeepSeekClient
+from onhax.config import Config
+from onhax.telemetry import Telemetry
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_span_measures_request():
+    """Test TTFT, duration, tokens per second and post-processing time."""
+    clock = FakeClock()
+    telemetry = Telemetry(clock=clock)
+    span = telemetry.start("assistant", "deepseek-chat", request_bytes=1200)
+    clock.now = 0.5
+    span.first_token()
+    clock.now = 0.6
+    span.first_token()
+    clock.now = 2.5
+    span.response_done()
+    span.set_usage({
+        "prompt_tokens": 900, "completion_tokens": 100,
+        "prompt_cache_hit_tokens": 800, "prompt_cache_miss_tokens": 100,
+    })
+    with span.postprocess():
+        clock.now = 2.75
+    record = span.finish()
+
+    assert record.ttft == 0.5
+    assert record.duration == 2.5
+    assert record.tokens_per_second == 50.0
+    assert record.postprocess == 0.25
+    assert record.cache_hit_tokens == 800
+    assert span.finish() is record
+
+    summary = telemetry.summary()["assistant"]
+    assert summary["requests"] == 1 and summary["errors"] == 0
+    assert summary["prompt_tokens"] == 900 and summary["request_bytes"] == 1200
+    assert summary["ttft"]["p50"] == 0.5
+
+def test_rolling_percentiles_and_errors():
+    """Test that percentiles cover the recent window and errors are counted."""
+    clock = FakeClock()
+    telemetry = Telemetry(window=10, clock=clock)
+    for i in range(20):
+        span = telemetry.start("client")
+        clock.now += i / 10
+        span.finish()
+    span = telemetry.start("client")
+    span.finish("error", ValueError("boom"))
+
+    summary = telemetry.summary()["client"]
+    assert summary["requests"] == 21
+    assert summary["errors"] == 1
+    assert summary["duration"]["p50"] >= 1.0
+
+def test_structured_log_record(caplog):
+    """Test that every request is logged with its fields attached."""
+    telemetry = Telemetry()
+    with caplog.at_level(logging.INFO, logger="onhax.telemetry"):
+        telemetry.start("client", "deepseek-chat").finish()
+    record = caplog.records[-1]
+    assert record.event == "request"
+    assert record.fields["model"] == "deepseek-chat"
+    assert json.loads(record.getMessage().split(" ", 1)[1])["status"] == "ok"
+
+def test_export_formats(tmp_path):
+    """Test the Prometheus textfile and JSON exports."""
+    prom = tmp_path / "onhax.prom"
+    telemetry = Telemetry(export_path=str(prom))
+    span = telemetry.start("client")
+    span.set_usage({"prompt_tokens": 3, "completion_tokens": 2})
+    span.finish()
+
+    text = prom.read_text()
+    assert 'onhax_requests_total{source="client"} 1' in text
+    assert 'onhax_request_duration_seconds{source="client",quantile="0.5"}' in text
+
+    telemetry.export(str(tmp_path / "onhax.json"))
+    data = json.loads((tmp_path / "onhax.json").read_text())
+    assert data["sources"]["client"]["completion_tokens"] == 2
+
+def test_client_records_requests(stub_server):
+    """Test that the client reports queries and streams to its telemetry."""
+    telemetry = Telemetry()
+    client = DeepSeekClient(Config(), telemetry=telemetry)
+    client.query("hello there", timeout=5)
+    assert "".join(client.stream("streamed", timeout=5)).strip() == "echo: streamed"
+
+    summary = telemetry.summary()
+    assert summary["client"]["prompt_tokens"] == 2
+    assert summary["client"]["request_bytes"] > 0
+    assert summary["stream"]["requests"] == 1
+    assert summary["stream"]["ttft"]["p50"] is not None
+    assert stub_server.requests[1]["stream_options"] == {"include_usage": True}
+
+def test_query_tokens_per_second_spans_whole_request(stub_server):
+    """Test that a non-streamed query has no TTFT and a rate over its full duration."""
+    stub_server.delay = 0.2
+    telemetry = Telemetry()
+    client = DeepSeekClient(Config(), telemetry=telemetry)
+    client.query("rate me", timeout=5)
+
+    summary = telemetry.summary()["client"]
+    assert summary["ttft"]["p50"] is None
+    # Two completion tokens over at least 0.2 s
+    assert 0 < summary["tokens_per_second"]["p50"] <= 10
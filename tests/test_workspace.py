@@ -0,0 +1,150 @@
+"""Tests for the workspace file index."""
+import os
+import re
+import threading
+from onhax.workspace import WorkspaceIndex, glob_to_regex, parse_gitignore, is_ignored
+
+def make_tree(root, files):
+    for path, content in files.items():
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text(content)
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_glob_to_regex():
+    """Test that ** spans directories and * does not."""
+    regex = re.compile(glob_to_regex("src/**/*.py") + "$")
+    assert regex.match("src/a.py")
+    assert regex.match("src/pkg/sub/b.py")
+    assert not regex.match("src/a.txt")
+    assert not re.match(glob_to_regex("*.py") + "$", "pkg/a.py")
+
+def test_gitignore_rules():
+    """Test anchoring, directory-only patterns and negation."""
+    rules = parse_gitignore("# comment\n*.log\n/build/\n!keep.log\ndocs/*.tmp\n")
+    assert is_ignored(rules, "a/b/debug.log", False)
+    assert not is_ignored(rules, "a/keep.log", False)
+    assert is_ignored(rules, "build", True)
+    assert not is_ignored(rules, "build", False)
+    assert not is_ignored(rules, "src/build", True)
+    assert is_ignored(rules, "docs/x.tmp", False)
+    assert not is_ignored(rules, "other/docs/x.tmp", False)
+
+def test_build_resolve_and_glob(tmp_path):
+    """Test that the index honours .gitignore and resolves names."""
+    make_tree(tmp_path, {
+        ".gitignore": "build/\n*.pyc\n",
+        "src/app/client.py": "x",
+        "src/app/util.py": "y",
+        "tests/client.py": "z",
+        "src/app/util.pyc": "",
+        "build/out.py": "",
+        "sub/.gitignore": "secret.txt\n",
+        "sub/secret.txt": "",
+        "sub/notes.md": "# notes",
+    })
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "config").write_text("")
+    index = WorkspaceIndex(str(tmp_path))
+    index.build()
+
+    root = os.path.realpath(tmp_path)
+    paths = sorted(entry.path for entry in index)
+    assert paths == [".gitignore", "src/app/client.py", "src/app/util.py",
+                     "sub/.gitignore", "sub/notes.md", "tests/client.py"]
+    assert index.get("sub/notes.md").language == "markdown"
+    assert index.resolve("util.py") == [os.path.join(root, "src", "app", "util.py")]
+    assert len(index.resolve("client.py")) == 2
+    assert index.resolve("app/client.py") == [os.path.join(root, "src", "app", "client.py")]
+    assert index.resolve("missing.py") == []
+    assert index.glob("src/**/*.py") == [
+        os.path.join(root, "src", "app", "client.py"),
+        os.path.join(root, "src", "app", "util.py"),
+    ]
+    assert index.glob("**/client.py") == index.resolve("client.py")
+
+def test_refresh_is_incremental(tmp_path):
+    """Test that added, removed and newly ignored files are picked up."""
+    make_tree(tmp_path, {"a/one.py": "", "a/b/two.py": "", "c/three.py": ""})
+    index = WorkspaceIndex(str(tmp_path))
+    index.build()
+    assert not index.refresh()
+
+    (tmp_path / "a" / "b" / "two.py").unlink()
+    (tmp_path / "a" / "b" / "new.py").write_text("")
+    bump_mtime(tmp_path / "a" / "b")
+    (tmp_path / "a" / "d").mkdir()
+    (tmp_path / "a" / "d" / "deep.py").write_text("")
+    bump_mtime(tmp_path / "a")
+    assert index.refresh()
+    assert sorted(entry.path for entry in index) == ["a/b/new.py", "a/d/deep.py", "a/one.py", "c/three.py"]
+
+    (tmp_path / ".gitignore").write_text("c/\n")
+    bump_mtime(tmp_path)
+    assert index.refresh()
+    assert "c/three.py" not in index
+
+def test_limits_on_files_and_depth(tmp_path):
+    """Test that the scan stops at the file cap and the depth cap."""
+    make_tree(tmp_path, {f"f{i}.py": "" for i in range(5)})
+    make_tree(tmp_path, {"a/b/c/deep.py": "", "a/shallow.py": ""})
+    index = WorkspaceIndex(str(tmp_path), max_depth=2)
+    index.build()
+    assert index.truncated
+    assert "a/shallow.py" in index
+    assert "a/b/c/deep.py" not in index
+
+    capped = WorkspaceIndex(str(tmp_path), max_files=3)
+    capped.build()
+    assert capped.truncated
+    assert len(capped) == 3
+
+def test_rebuild_scans_without_lock(tmp_path, monkeypatch):
+    """Test that a .gitignore rebuild leaves the index readable while it scans."""
+    make_tree(tmp_path, {"a.py": "", ".gitignore": ""})
+    index = WorkspaceIndex(str(tmp_path))
+    index.build()
+    (tmp_path / ".gitignore").write_text("b/\n")
+    bump_mtime(tmp_path / ".gitignore")
+
+    acquired = []
+    scan_tree = WorkspaceIndex._scan_tree
+
+    def probe():
+        acquired.append(index._lock.acquire(timeout=1))
+        if acquired[-1]:
+            index._lock.release()
+
+    def checked_scan(self, directory, inherited):
+        if directory == "":
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+        scan_tree(self, directory, inherited)
+
+    monkeypatch.setattr(WorkspaceIndex, "_scan_tree", checked_scan)
+    assert index.refresh()
+    assert acquired == [True]
+
+def test_changes_since(tmp_path):
+    """Test that refresh reports the paths it added, modified or removed."""
+    make_tree(tmp_path, {"a/one.py": "", "a/two.py": "", "b/three.py": ""})
+    index = WorkspaceIndex(str(tmp_path))
+    index.build()
+    start = index.generation
+    assert index.changes_since(start) == set()
+
+    (tmp_path / "a" / "two.py").unlink()
+    (tmp_path / "a" / "new.py").write_text("")
+    bump_mtime(tmp_path / "a")
+    index.refresh()
+    assert index.changes_since(start) == {"a/two.py", "a/new.py"}
+    assert index.changes_since(index.generation) == set()
+
+    (tmp_path / ".gitignore").write_text("b/\n")
+    bump_mtime(tmp_path)
+    index.refresh()
+    assert index.changes_since(start) is None